@@ -1,17 +1,25 @@
 # app_state.py
 import threading
-import queue
-from collections import deque
+
+from context_window import ContextWindow
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, CONTEXT_MAX_UTTERANCES
 
 # Recording state
 is_recording = False
 stop_event = threading.Event()
-audio_queue = queue.Queue()
+shutdown_event = threading.Event()  # set when the app exits; Stop only ends capture, queued chunks still finish
 stream = None
+pipeline = None  # ChunkPipeline of the current recording, for queue/drop monitoring
 
 # GUI widgets
-row_widgets = []
+results_table = None  # ResultsTable created by main.py
+
+# Session history
+history = None  # HistoryStore opened by main.py (None when HISTORY_PATH is empty)
 
 # Context
-recent_utterances = deque(maxlen=2)
-max_context_limit = 5
+context_window = ContextWindow(
+    budget_tokens=CONTEXT_TOKEN_BUDGET,
+    summary_tokens=CONTEXT_SUMMARY_TOKENS,
+    max_utterances=CONTEXT_MAX_UTTERANCES,
+)
@@ -0,0 +1,175 @@
+# assemblyai_client.py
+import json
+import threading
+import time
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from transcription import iter_wav_bytes
+
+REALTIME_ENGINE = "AssemblyAI (realtime)"
+
+
+class AssemblyAIError(Exception):
+    pass
+
+
+class TranscriptionTimeout(AssemblyAIError):
+    pass
+
+
+class TranscriptionCancelled(AssemblyAIError):
+    pass
+
+
+class AssemblyAIClient:
+    """Upload → create transcript → poll, over one pooled keep-alive session.
+
+    Polling starts at poll_initial_s and backs off by poll_backoff up to poll_max_s, so short
+    chunks come back in a fraction of a second without hammering the API on long ones.
+    Every call honours an overall deadline and a cancel_event (e.g. the app's shutdown_event).
+    """
+
+    def __init__(self, api_key, base_url="https://api.assemblyai.com/v2", poll_initial_s=0.15,
+                 poll_max_s=1.5, poll_backoff=1.5, timeout_s=10, pool_size=4):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.poll_initial_s = poll_initial_s
+        self.poll_max_s = poll_max_s
+        self.poll_backoff = poll_backoff
+        self.timeout_s = timeout_s
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["authorization"] = api_key or ""
+        self.polls = 0
+
+    def _timeout(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TranscriptionTimeout("AssemblyAI deadline exceeded")
+        return min(self.timeout_s, remaining)
+
+    def upload(self, audio, deadline):
+        # ndarray chunks are streamed as WAV; anything else is treated as a file path.
+        if isinstance(audio, np.ndarray):
+            res = self.session.post(f"{self.base_url}/upload", data=iter_wav_bytes(audio),
+                                    timeout=self._timeout(deadline))
+        else:
+            with open(audio, "rb") as f:
+                res = self.session.post(f"{self.base_url}/upload", data=f, timeout=self._timeout(deadline))
+        res.raise_for_status()
+        return res.json()["upload_url"]
+
+    def create_transcript(self, audio_url, deadline, language_code="en"):
+        res = self.session.post(f"{self.base_url}/transcript",
+                                json={"audio_url": audio_url, "language_code": language_code},
+                                timeout=self._timeout(deadline))
+        res.raise_for_status()
+        return res.json()["id"]
+
+    def wait_for_transcript(self, transcript_id, deadline, cancel_event):
+        delay = self.poll_initial_s
+        while True:
+            res = self.session.get(f"{self.base_url}/transcript/{transcript_id}", timeout=self._timeout(deadline))
+            res.raise_for_status()
+            self.polls += 1
+            body = res.json()
+            if body["status"] == "completed":
+                return body.get("text") or ""
+            if body["status"] == "error":
+                raise AssemblyAIError(body.get("error", "transcription failed"))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TranscriptionTimeout(f"AssemblyAI transcript {transcript_id} not ready before deadline")
+            if cancel_event.wait(min(delay, remaining)):
+                raise TranscriptionCancelled(f"AssemblyAI transcript {transcript_id} cancelled")
+            delay = min(delay * self.poll_backoff, self.poll_max_s)
+
+    def transcribe(self, audio, deadline_s=30, cancel_event=None):
+        cancel_event = cancel_event or threading.Event()
+        deadline = time.monotonic() + deadline_s
+        if cancel_event.is_set():
+            raise TranscriptionCancelled("Recording already stopped")
+        audio_url = self.upload(audio, deadline)
+        transcript_id = self.create_transcript(audio_url, deadline)
+        return self.wait_for_transcript(transcript_id, deadline, cancel_event)
+
+
+class RealtimeSession:
+    """Streaming transcription over AssemblyAI's WebSocket API (v3 "Turn" messages).
+
+    send_audio() takes float32/int16 mono blocks of 50-1000 ms. on_partial(text) fires as a
+    turn is being spoken, on_final(text) once per finished (formatted) turn; both run on
+    the reader thread. Needs the optional websocket-client package.
+    """
+
+    def __init__(self, api_key, url, sample_rate, on_partial, on_final, timeout_s=10):
+        self.api_key = api_key
+        self.url = url
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.timeout_s = timeout_s
+        self._ws = None
+        self._reader = None
+        self.error = None
+
+    def connect(self):
+        import websocket  # optional: only needed for the realtime engine
+
+        separator = "&" if "?" in self.url else "?"
+        url = f"{self.url}{separator}sample_rate={self.sample_rate}&encoding=pcm_s16le&format_turns=true"
+        self._ws = websocket.create_connection(url, header={"Authorization": self.api_key or ""},
+                                               timeout=self.timeout_s)
+        # Only the handshake is time-limited; turns can be minutes apart.
+        self._ws.settimeout(None)
+        self._reader = threading.Thread(target=self._read_loop, name="assemblyai-realtime", daemon=True)
+        self._reader.start()
+        return self
+
+    def send_audio(self, audio):
+        samples = np.asarray(audio).reshape(-1)
+        if samples.dtype != np.int16:
+            samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        self._ws.send_binary(samples.astype("<i2", copy=False).tobytes())
+
+    def close(self):
+        # Asks the server to finish the last turn, waits for it, then drops the socket.
+        if self._ws is None:
+            return
+        try:
+            self._ws.send(json.dumps({"type": "Terminate"}))
+            self._reader.join(self.timeout_s)
+        except Exception as e:
+            print("⚠️ AssemblyAI realtime close failed:", e)
+        finally:
+            ws, self._ws = self._ws, None
+            ws.close()
+
+    def _read_loop(self):
+        try:
+            while True:
+                message = self._ws.recv()
+                if not message:
+                    return
+                event = json.loads(message)
+                kind = event.get("type")
+                if kind == "Turn":
+                    text = event.get("transcript", "").strip()
+                    if event.get("end_of_turn") and event.get("turn_is_formatted"):
+                        if text:
+                            self.on_final(text)
+                    elif not event.get("end_of_turn"):
+                        self.on_partial(text)
+                elif kind == "Termination":
+                    return
+                elif kind == "Error" or "error" in event:
+                    raise AssemblyAIError(event.get("error", event))
+        except Exception as e:
+            if self._ws is not None:
+                self.error = e
+                print("❌ AssemblyAI realtime stream failed:", e)
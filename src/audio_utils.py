@@ -1,81 +1,246 @@
 # audio_utils.py
-import wave
 import numpy as np
-import spacy
 
 from transcription import transcribe_with_assemblyai, transcribe_with_whisper
-from text_utils import extract_clean_concepts, extract_named_entities
-from rowlogic import insert_row
+from nlp_stage import analyze_text
+from rowlogic import insert_row, update_live_row
+from streaming_transcription import StreamingTranscriber, STREAMING_ENGINE
+from assemblyai_client import RealtimeSession, REALTIME_ENGINE
+from ring_buffer import RingBuffer
+from pipeline import ChunkPipeline
+from vad import VoiceActivitySegmenter, contains_speech, FRAME_SAMPLES
+from tracing import new_trace, maybe_span
+from config import (
+    SAMPLE_RATE,
+    CHUNK_SAMPLES,
+    CAPTURE_DTYPE,
+    CAPTURE_BUFFER_SECONDS,
+    SEGMENTATION,
+    VAD_MAX_UTTERANCE_S,
+    STREAMING_STEP_S,
+    PIPELINE_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_QUEUE_POLICY,
+    ASSEMBLYAI_API_KEY,
+    ASSEMBLYAI_REALTIME_URL,
+)
 
-import queue
-import threading
-import sounddevice as sd
+import app_state
 
 stream = None  # Local stream handle
 
-nlp = spacy.load("en_core_web_sm")
-
-def process_audio_chunk(chunk, engine_name, scrollable_frame, header, row_widgets, canvas, root):
+def process_audio_chunk(chunk, engine_name, trace=None):
     try:
-        path = "temp_chunk.wav"
-        with wave.open(path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(16000)
-            wf.writeframes((chunk * 32767).astype(np.int16).tobytes())
-
-        if engine_name == "AssemblyAI":
-            text = transcribe_with_assemblyai(path)
-        elif engine_name == "Whisper":
-            text = transcribe_with_whisper(path)
-        else:
-            print("⚠️ Unknown engine selected")
-            return
+        # Each chunk is an owned copy taken out of the ring buffer, so concurrent
+        # chunks never share a buffer; reshape(-1) is a view, not a copy.
+        audio = np.ascontiguousarray(chunk, dtype=np.float32).reshape(-1)
+
+        with maybe_span(trace, "transcription", engine=engine_name, audio_s=round(len(audio) / SAMPLE_RATE, 2)) as span:
+            if engine_name == "AssemblyAI":
+                # Chunks queued before Stop (and the final VAD flush) still get transcribed;
+                # only closing the app abandons the poll.
+                text = transcribe_with_assemblyai(audio, cancel_event=app_state.shutdown_event)
+            elif engine_name == "Whisper":
+                text = transcribe_with_whisper(audio)
+            else:
+                print("⚠️ Unknown engine selected")
+                return None
+            span["chars"] = len(text or "")
 
         if text:
-            doc = nlp(text)
-            concepts = extract_clean_concepts(doc)
-            entities = extract_named_entities(doc)
-            root.after(0, lambda: insert_row(text, concepts, entities, engine_name, scrollable_frame, header, row_widgets, canvas))
+            with maybe_span(trace, "nlp"):
+                concepts, entities = analyze_text(text)
+            return text, concepts, entities, engine_name
     except Exception as e:
         print("❌ process_audio_chunk failed:", e)
+    return None
+
+
+def show_pipeline_status(status_label, pipeline, stop_event):
+    # Chunks still finishing after Stop mustn't overwrite "Idle".
+    if stop_event.is_set():
+        return
+    stats = pipeline.stats()
+    status_label.config(
+        text=f"Recording... queue {stats['queue_depth']}/{pipeline.max_queue} · "
+             f"in flight {stats['in_flight']} · dropped {stats['dropped']}"
+    )
+
+
+# Both iterators yield owned audio chunks; with_positions=True yields (start, end, chunk)
+# with absolute ring positions instead, for latency measurements.
+def iter_fixed_chunks(ring, stop_event, with_positions=False):
+    while not stop_event.is_set():
+        if not ring.wait_for(CHUNK_SAMPLES, timeout=0.25):
+            continue
+        start = ring.read_pos
+        chunk = ring.consume(CHUNK_SAMPLES)
+        if contains_speech(chunk):
+            yield (start, start + CHUNK_SAMPLES, chunk) if with_positions else chunk
+
+
+def iter_vad_segments(ring, stop_event, with_positions=False):
+    segmenter = VoiceActivitySegmenter()
+    block = FRAME_SAMPLES * 4
+    scan = ring.write_pos
+    while not stop_event.is_set():
+        if not ring.wait_until(scan + block, timeout=0.25):
+            continue
+        end = scan + (ring.write_pos - scan) // FRAME_SAMPLES * FRAME_SAMPLES
+        try:
+            for start, stop in segmenter.feed(ring.read(scan, end - scan), scan):
+                chunk = ring.read(start, stop - start)
+                yield (start, stop, chunk) if with_positions else chunk
+        except ValueError:
+            # Fell further behind than the ring holds; resync at the write head.
+            print("⚠️ Segmenter fell behind the capture buffer, resyncing")
+            segmenter.reset()
+            end = ring.write_pos
+        scan = end
+        ring.advance(segmenter.keep_from())
+    for start, stop in segmenter.flush():
+        chunk = ring.read(start, stop - start)
+        yield (start, stop, chunk) if with_positions else chunk
+
+
+def stream_whisper(ring, stop_event, on_update, on_utterance):
+    # Re-transcribes [buffer_start, write head) every STREAMING_STEP_S; on_update gets
+    # (committed, provisional) after each pass, on_utterance each finished utterance.
+    transcriber = StreamingTranscriber()
+    transcriber.reset(ring.write_pos)
+    step = int(STREAMING_STEP_S * SAMPLE_RATE)
+    scanned = ring.write_pos
+    while not stop_event.is_set():
+        if not ring.wait_until(scanned + step, timeout=0.25):
+            continue
+        scanned = ring.write_pos
+        try:
+            audio = ring.read(transcriber.buffer_start, scanned - transcriber.buffer_start)
+        except ValueError:
+            print("⚠️ Streaming transcriber fell behind the capture buffer, resyncing")
+            for text in transcriber.flush():
+                on_utterance(text)
+            transcriber.reset(ring.write_pos)
+            scanned = ring.write_pos
+            continue
+        if not contains_speech(audio) and not transcriber.pending and not transcriber.previous:
+            # Nothing said and nothing waiting: skip the model and slide the window.
+            transcriber.reset(scanned)
+            ring.advance(scanned)
+            continue
+        for text in transcriber.update(audio):
+            on_utterance(text)
+        on_update(transcriber.pending_text, transcriber.provisional_text)
+        ring.advance(transcriber.buffer_start)
+    for text in transcriber.flush():
+        on_utterance(text)
+    on_update("", "")
+
+
+def stream_assemblyai(ring, stop_event, on_update, on_utterance):
+    # Forwards capture audio to AssemblyAI's realtime API in ~100 ms messages; turns come
+    # back on the session's reader thread as partial (live row) and final (table row) text.
+    def final(text):
+        on_update("", "")
+        on_utterance(text)
 
+    session = RealtimeSession(
+        ASSEMBLYAI_API_KEY, ASSEMBLYAI_REALTIME_URL, SAMPLE_RATE,
+        on_partial=lambda text: on_update("", text),
+        on_final=final,
+    ).connect()
+    block = SAMPLE_RATE // 10
+    sent = ring.write_pos
+    try:
+        while not stop_event.is_set():
+            if not ring.wait_until(sent + block, timeout=0.25):
+                continue
+            if session.error:
+                raise session.error
+            end = min(ring.write_pos, sent + SAMPLE_RATE)  # the API takes at most 1 s per message
+            try:
+                session.send_audio(ring.read(sent, end - sent))
+            except ValueError:
+                print("⚠️ Realtime sender fell behind the capture buffer, resyncing")
+                end = ring.write_pos
+            sent = end
+            ring.advance(sent)
+    finally:
+        session.close()
+        on_update("", "")
 
 
+def record_audio(device_index, stop_event, status_label,
+                 process_audio_chunk, engine_var, table, root):
+    # Imported here so headless tools (batch.py, benchmark.py) can use this module without PortAudio.
+    import sounddevice as sd
 
-def record_audio(device_index, stop_event, audio_queue, status_label,
-                 process_audio_chunk, engine_var, scrollable_frame, header,
-                 row_widgets, canvas, root):
     global stream
     stop_event.clear()
-    audio_queue.queue.clear()
     status_label.config(text="Recording...")
+    max_segment = int(VAD_MAX_UTTERANCE_S * SAMPLE_RATE) if SEGMENTATION == "vad" else CHUNK_SAMPLES
+    engine_name = engine_var.get()
+    streaming = engine_name in (STREAMING_ENGINE, REALTIME_ENGINE)
+    ring = RingBuffer(max(CAPTURE_BUFFER_SECONDS * SAMPLE_RATE, 2 * max_segment), dtype=CAPTURE_DTYPE)
+    segments = iter_vad_segments if SEGMENTATION == "vad" else iter_fixed_chunks
+
+    def deliver(item):
+        result, trace = item
+        trace.mark_delivered()
+        root.after(0, lambda: insert_row(*result, table, trace=trace))
+        root.after(0, lambda: show_pipeline_status(status_label, pipeline, stop_event))
+
+    def work(job):
+        # job = (audio chunk or streamed utterance text, trace); returns (row values, trace).
+        payload, trace = job
+        trace.add_span("queue", trace.start, trace.now())
+        if streaming:
+            # Streaming utterances arrive already transcribed; only the NLP stage is left.
+            with trace.span("nlp"):
+                result = (payload, *analyze_text(payload), engine_name)
+        else:
+            result = process_audio_chunk(payload, engine_name, trace=trace)
+        if result is None:
+            trace.release(status="empty")
+            return None
+        return result, trace
+
+    # Results reach insert_row in capture order even though chunks finish out of order.
+    pipeline = ChunkPipeline(
+        work=work,
+        deliver=deliver,
+        workers=PIPELINE_WORKERS,
+        max_queue=PIPELINE_QUEUE_SIZE,
+        policy=PIPELINE_QUEUE_POLICY,
+        name="chunk-worker",
+        # A dropped chunk's trace still finishes, so drops show up in the trace file and metrics.
+        on_drop=lambda job: job[1].release(status="dropped"),
+    )
+    app_state.pipeline = pipeline
 
     def callback(indata, frames, time_info, status):
         if status:
             print(f"⚠️ Stream status: {status}")
-        audio_queue.put(indata.copy())
+        ring.write(indata)
 
     try:
-        stream = sd.InputStream(device=device_index, callback=callback, channels=1, samplerate=16000)
+        stream = sd.InputStream(device=device_index, callback=callback, channels=1,
+                                samplerate=SAMPLE_RATE, dtype=CAPTURE_DTYPE)
         stream.start()
-        buffer = []
 
-        while not stop_event.is_set():
-            try:
-                data = audio_queue.get(timeout=0.25)
-                buffer.append(data)
-                total_samples = sum(len(chunk) for chunk in buffer)
-                if total_samples >= 160000:
-                    chunk_audio = np.concatenate(buffer, axis=0)
-                    buffer = []
-                    threading.Thread(
-                        target=process_audio_chunk,
-                        args=(chunk_audio, engine_var.get(), scrollable_frame, header, row_widgets, canvas, root),
-                        daemon=True
-                    ).start()
-            except queue.Empty:
-                continue
+        if streaming:
+            stream_engine = stream_whisper if engine_name == STREAMING_ENGINE else stream_assemblyai
+            stream_engine(
+                ring, stop_event,
+                on_update=lambda committed, provisional: root.after(0, lambda: update_live_row(
+                    committed, provisional, table)),
+                on_utterance=lambda text: pipeline.submit((text, new_trace(engine=engine_name))),
+            )
+        else:
+            for chunk_audio in segments(ring, stop_event):
+                trace = new_trace(engine=engine_name, audio_s=round(len(chunk_audio) / SAMPLE_RATE, 2))
+                pipeline.submit((chunk_audio, trace))
+                root.after(0, lambda: show_pipeline_status(status_label, pipeline, stop_event))
     except Exception as e:
         print("❌ record_audio failed:", e)
     finally:
@@ -83,4 +248,9 @@ def record_audio(device_index, stop_event, audio_queue, status_label,
             stream.stop()
             stream.close()
             stream = None
+        pipeline.close()
+        if pipeline.dropped:
+            print(f"⚠️ Pipeline dropped {pipeline.dropped} chunks that could not keep up")
+        if ring.overruns:
+            print(f"⚠️ Capture buffer overran, dropped {ring.overruns} samples")
         status_label.config(text="Idle")
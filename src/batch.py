@@ -0,0 +1,207 @@
+# batch.py
+# Headless batch mode: runs recorded audio files through the same pipeline as the GUI
+# (segmentation → transcription → concepts/entities → definitions → LLM enrichment)
+# and writes one JSON line per utterance.
+# Usage: python src/batch.py meeting.wav recordings/ -o rows.jsonl [--workers 4] [--engine Whisper]
+# Progress and the real-time factor (processing time / audio duration) go to stderr.
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config import SAMPLE_RATE, CHUNK_SAMPLES, SEGMENTATION
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, CONTEXT_MAX_UTTERANCES
+from context_window import ContextWindow
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+
+
+def find_audio_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                files.extend(os.path.join(dirpath, n) for n in sorted(names) if n.lower().endswith(AUDIO_EXTENSIONS))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"⚠️ Skipping {path}: not found")
+    return sorted(files)
+
+
+def load_audio(path):
+    # Mono float32 at SAMPLE_RATE. PCM WAV is read with the standard library; anything
+    # else (FLAC, odd WAV encodings) goes through faster-whisper's decoder.
+    try:
+        with wave.open(path, "rb") as f:
+            width, channels, rate = f.getsampwidth(), f.getnchannels(), f.getframerate()
+            frames = f.readframes(f.getnframes())
+        if width != 2:
+            raise wave.Error(f"{width * 8}-bit WAV")
+    except (wave.Error, EOFError):
+        from faster_whisper.audio import decode_audio
+        return decode_audio(path, sampling_rate=SAMPLE_RATE)
+    audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        duration = len(audio) / rate
+        target = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        audio = np.interp(target, np.arange(len(audio)) / rate, audio).astype(np.float32)
+    return audio
+
+
+def segment_audio(audio, segmentation=SEGMENTATION):
+    # (start, end) sample ranges, cut the same way the live recorder would.
+    if segmentation == "fixed":
+        from vad import contains_speech
+        ranges = [(start, min(start + CHUNK_SAMPLES, len(audio))) for start in range(0, len(audio), CHUNK_SAMPLES)]
+        return [(start, end) for start, end in ranges if contains_speech(audio[start:end])]
+    from vad import VoiceActivitySegmenter, FRAME_SAMPLES
+    segmenter = VoiceActivitySegmenter()
+    usable = len(audio) // FRAME_SAMPLES * FRAME_SAMPLES
+    return segmenter.feed(audio[:usable], 0) + segmenter.flush()
+
+
+def init_worker(engine, with_nlp):
+    # Runs once per worker process: load the heavy models before the first file arrives.
+    from models import get_model
+    if with_nlp:
+        get_model("spacy")
+    if engine == "Whisper":
+        get_model("whisper")
+
+
+def transcribe(audio, engine):
+    from transcription import transcribe_with_whisper, transcribe_with_assemblyai
+    if engine == "Whisper":
+        return transcribe_with_whisper(audio)
+    return transcribe_with_assemblyai(audio)
+
+
+def enrich(text, window, definitions=True, llm=True):
+    # Adds text to the context window and fills the row's cells synchronously; which cells
+    # a row gets is decided by rowlogic.plan_row, as for the GUI table.
+    from rowlogic import plan_row
+    _, ambiguous, hesitant, cells = plan_row(text, window, definitions=definitions, llm=llm)
+    row = {"definitions": None, "suggestion": None, "support": None, "ambiguous": ambiguous, "hesitant": hesitant}
+    for fields, _, fn, args, _ in cells:
+        values = fn(*args)
+        row.update(zip(fields, (values,) if len(fields) == 1 else values))
+    return row
+
+
+def process_file(path, engine, segmentation=SEGMENTATION, with_nlp=True, definitions=True, llm=True):
+    # Returns (rows, stats) for one file; runs inside a worker process.
+    start = time.perf_counter()
+    audio = load_audio(path)
+    ranges = segment_audio(audio, segmentation)
+    texts = []
+    for seg_start, seg_end in ranges:
+        texts.append(transcribe(audio[seg_start:seg_end], engine))
+    transcribed = [(r, t) for r, t in zip(ranges, texts) if t]
+
+    analyses = [("", "")] * len(transcribed)
+    if with_nlp and transcribed:
+        from nlp_stage import analyze_texts
+        analyses = analyze_texts([t for _, t in transcribed])
+
+    rows = []
+    window = ContextWindow(CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, CONTEXT_MAX_UTTERANCES)
+    for i, (((seg_start, seg_end), text), (concepts, entities)) in enumerate(zip(transcribed, analyses)):
+        row = {
+            "file": path,
+            "segment": i,
+            "start_s": round(seg_start / SAMPLE_RATE, 2),
+            "end_s": round(seg_end / SAMPLE_RATE, 2),
+            "engine": engine,
+            "text": text,
+            "concepts": concepts,
+            "entities": entities,
+        }
+        row.update(enrich(text, window, definitions=definitions, llm=llm))
+        rows.append(row)
+
+    elapsed = time.perf_counter() - start
+    audio_s = len(audio) / SAMPLE_RATE
+    stats = {
+        "file": path,
+        "audio_s": audio_s,
+        "processing_s": elapsed,
+        "rtf": elapsed / audio_s if audio_s else 0.0,
+        "segments": len(ranges),
+        "rows": len(rows),
+    }
+    return rows, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process audio files through the full pipeline without the GUI")
+    parser.add_argument("inputs", nargs="+", help="WAV/FLAC files or directories")
+    # The pipeline modules log to stdout, so rows always go to a file.
+    parser.add_argument("-o", "--output", required=True, help="JSONL output path")
+    parser.add_argument("--engine", choices=["Whisper", "AssemblyAI"], default="Whisper")
+    parser.add_argument("--segmentation", choices=["vad", "fixed"], default=SEGMENTATION)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-nlp", action="store_true", help="skip concepts/entities")
+    parser.add_argument("--no-definitions", action="store_true")
+    parser.add_argument("--no-llm", action="store_true")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.inputs)
+    if not files:
+        print("❌ No audio files found", file=sys.stderr)
+        return 1
+    workers = max(1, min(args.workers, len(files)))
+    if args.engine == "Whisper" and "WHISPER_CPU_THREADS" not in os.environ:
+        # Split the cores between worker processes instead of oversubscribing them.
+        os.environ["WHISPER_CPU_THREADS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+    options = {
+        "segmentation": args.segmentation,
+        "with_nlp": not args.no_nlp,
+        "definitions": not args.no_definitions,
+        "llm": not args.no_llm,
+    }
+    total_audio = 0.0
+    total_rows = 0
+    failed = 0
+    start = time.perf_counter()
+    # spawn: workers re-read config (WHISPER_CPU_THREADS) and don't inherit our threads.
+    with open(args.output, "w", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(args.engine, options["with_nlp"]),
+    ) as pool:
+        futures = {pool.submit(process_file, path, args.engine, **options): path for path in files}
+        for future in as_completed(futures):
+            try:
+                rows, stats = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ {futures[future]} failed:", e, file=sys.stderr)
+                continue
+            for row in rows:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            out.flush()
+            total_audio += stats["audio_s"]
+            total_rows += stats["rows"]
+            print(f"✅ {stats['file']}: {stats['rows']} rows, {stats['audio_s']:.1f}s audio "
+                  f"in {stats['processing_s']:.1f}s (RTF {stats['rtf']:.2f})", file=sys.stderr)
+    wall = time.perf_counter() - start
+
+    rtf = wall / total_audio if total_audio else 0.0
+    print(f"📊 {len(files) - failed}/{len(files)} files, {total_rows} rows, {total_audio:.1f}s audio in "
+          f"{wall:.1f}s with {workers} workers → RTF {rtf:.3f} ({1 / rtf if rtf else 0:.1f}x real time)",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# bench_nlp.py
+# Micro-benchmark for the spaCy stage on a fixed transcript corpus:
+#   before = default pipeline, one nlp(text) per transcript (the old process_audio_chunk path)
+#   after  = trimmed pipeline, transcripts batched through nlp.pipe (nlp_stage.analyze_texts)
+# Usage: python src/bench_nlp.py [--docs 400] [--batch 8]
+import argparse
+import time
+
+import spacy
+
+from config import SPACY_MODEL, NLP_BATCH_SIZE
+from models import get_nlp
+from nlp_stage import analyze_texts
+from text_utils import extract_clean_concepts, extract_named_entities
+
+CORPUS = [
+    "So I was talking to Maria at Google about the new retrieval pipeline they shipped last quarter.",
+    "Um, what's it called, the thing that stores vectors so you can search them quickly?",
+    "The latency budget for the whole call is about two hundred milliseconds end to end.",
+    "We moved the Kubernetes cluster from Frankfurt to Dublin because of the data residency rules.",
+    "I can't remember the word for it, it's kind of like a cache but for whole responses.",
+    "Honestly the quarterly numbers look fine, revenue is up and churn is down a bit.",
+    "You know, uh, the thing with the gradient that keeps vanishing in deep networks.",
+    "Einstein's theory of general relativity predicted gravitational waves a century before LIGO saw them.",
+    "Let's schedule the design review for Thursday and invite the platform team.",
+    "The ephemeral containers are idempotent, so retrying the deployment is harmless.",
+    "She said the quixotic plan to rewrite everything in Rust was, well, not sure about it.",
+    "Our onboarding flow loses most people at the payment step on mobile.",
+]
+
+
+def bench(label, fn, texts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - start)
+    rate = len(texts) / best
+    print(f"{label:<40} {rate:10.1f} docs/sec  ({best * 1000:.1f} ms for {len(texts)} docs)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the spaCy concept/entity stage")
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--batch", type=int, default=NLP_BATCH_SIZE)
+    args = parser.parse_args()
+    texts = [CORPUS[i % len(CORPUS)] for i in range(args.docs)]
+
+    full = spacy.load(SPACY_MODEL)
+    trimmed = get_nlp()
+    print(f"full pipeline:    {full.pipe_names}")
+    print(f"trimmed pipeline: {trimmed.pipe_names}\n")
+
+    def before(batch):
+        for text in batch:
+            doc = full(text)
+            extract_clean_concepts(doc)
+            extract_named_entities(doc)
+
+    def after(batch):
+        for i in range(0, len(batch), args.batch):
+            analyze_texts(batch[i:i + args.batch])
+
+    before(CORPUS)
+    after(CORPUS)
+    base = bench("before: full pipeline, one doc at a time", before, texts)
+    new = bench(f"after: trimmed, nlp.pipe batch={args.batch}", after, texts)
+    print(f"\nspeedup: {new / base:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
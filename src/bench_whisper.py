@@ -0,0 +1,104 @@
+# bench_whisper.py
+# Throughput vs latency of batched Whisper inference. --callers threads (standing in for
+# pipeline workers or server sessions) each transcribe their share of the utterances back to
+# back; every batch size × wait pair sends the same utterances through its own scheduler.
+#   batch=1 is the unbatched baseline: calls are serialized, one model.transcribe() each
+#   batch>1 decodes whatever is waiting (up to the batch size) in one BatchedInferencePipeline pass
+# Usage: python src/bench_whisper.py [--audio talk.wav] [--callers 8] [--batch 1,2,4,8] [--wait-ms 0,5,20]
+import argparse
+import json
+import threading
+import time
+
+from benchmark import synthetic_audio, percentiles
+from batch import load_audio, segment_audio
+from config import SAMPLE_RATE, WHISPER_MODEL
+from models import get_model
+from pipeline import MicroBatcher
+from transcription import transcribe_whisper_batch
+
+
+def load_utterances(args):
+    audio = load_audio(args.audio) if args.audio else synthetic_audio(args.utterances, seed=args.seed)
+    chunks = [audio[start:end] for start, end in segment_audio(audio)]
+    if args.utterances:
+        chunks = chunks[:args.utterances]
+    return chunks
+
+
+def run_config(chunks, callers, max_batch, wait_ms):
+    batcher = MicroBatcher(transcribe_whisper_batch, max_batch=max_batch, max_wait_s=wait_ms / 1000,
+                           name=f"bench-b{max_batch}-w{wait_ms:g}")
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(i):
+        for chunk in chunks[i::callers]:
+            start = time.perf_counter()
+            batcher(chunk)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    audio_s = sum(len(chunk) for chunk in chunks) / SAMPLE_RATE
+    return {
+        "batch": max_batch,
+        "wait_ms": wait_ms,
+        "wall_s": round(wall, 2),
+        "chunks_per_s": round(len(chunks) / wall, 2),
+        "audio_x_realtime": round(audio_s / wall, 1),
+        "mean_batch": round(batcher.stats()["mean_batch"], 2),
+        "latency": percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs unbatched Whisper transcription")
+    parser.add_argument("--audio", help="WAV/FLAC to cut into utterances instead of synthetic speech")
+    parser.add_argument("--utterances", type=int, default=48, help="utterances to transcribe per run (0 = all of --audio)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--callers", type=int, default=8, help="concurrent transcribe calls")
+    parser.add_argument("--batch", default="1,2,4,8", help="comma-separated max batch sizes")
+    parser.add_argument("--wait-ms", default="0,5,20", help="comma-separated max batch waits")
+    parser.add_argument("--out", help="save all runs as JSON")
+    args = parser.parse_args()
+
+    chunks = load_utterances(args)
+    audio_s = sum(len(chunk) for chunk in chunks) / SAMPLE_RATE
+    print(f"🎙️ {len(chunks)} utterances, {audio_s:.1f}s of audio, {args.callers} callers, model {WHISPER_MODEL}")
+    get_model("whisper")
+    get_model("whisper_batched")
+    transcribe_whisper_batch(chunks[:2])  # first-call allocations stay out of the timings
+
+    runs = []
+    print(f"\n{'batch':>6}{'wait':>7}{'chunks/s':>10}{'× rt':>7}{'mean b':>8}{'p50':>9}{'p95':>9}")
+    for max_batch in [int(b) for b in args.batch.split(",")]:
+        # The wait only matters once there is a batch to wait for.
+        waits = [0.0] if max_batch == 1 else [float(w) for w in args.wait_ms.split(",")]
+        for wait_ms in waits:
+            result = run_config(chunks, args.callers, max_batch, wait_ms)
+            runs.append(result)
+            latency = result["latency"]
+            print(f"{max_batch:>6}{wait_ms:>5g}ms{result['chunks_per_s']:>10.2f}{result['audio_x_realtime']:>6.1f}x"
+                  f"{result['mean_batch']:>8.2f}{latency['p50_ms']:>7.0f}ms{latency['p95_ms']:>7.0f}ms")
+
+    baseline = runs[0]
+    best = max(runs, key=lambda r: r["chunks_per_s"])
+    print(f"\n📊 Best: batch={best['batch']} wait={best['wait_ms']:g}ms → "
+          f"{best['chunks_per_s'] / baseline['chunks_per_s']:.2f}x the throughput of batch={baseline['batch']}, "
+          f"p95 {baseline['latency']['p95_ms']:.0f} → {best['latency']['p95_ms']:.0f} ms")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"model": WHISPER_MODEL, "utterances": len(chunks), "audio_s": round(audio_s, 1),
+                       "callers": args.callers, "runs": runs}, f, indent=2)
+        print(f"💾 Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
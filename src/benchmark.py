@@ -0,0 +1,345 @@
+# benchmark.py
+# End-to-end latency benchmark. Deterministic synthetic speech (or a recording) is replayed
+# into the capture RingBuffer in real time (or faster with --speed) and runs through the
+# same path as record_audio: segmentation → ChunkPipeline → transcription → NLP, then the
+# definitions and LLM cells like insert_row. The dictionary API, the LLM providers and
+# AssemblyAI are replaced by local stubs (stub_servers.py) with configurable latency and
+# failure rates. Reports p50/p95/p99 per stage and end to end, and saves them as JSON.
+# Usage: python src/benchmark.py [--utterances 40] [--speed 2] [--llm-latency 0.3] [--out bench.json] [--compare old.json]
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from stub_servers import start_dictionary_stub, start_llm_stub, start_assemblyai_stub
+
+SAMPLE_RATE = 16000
+STAGES = ("segmentation", "queue_wait", "transcription", "nlp", "definitions", "llm_first_token", "llm", "end_to_end")
+TRANSCRIPTS = [
+    "So I was talking to Maria at Google about the new retrieval pipeline they shipped last quarter.",
+    "Um, what's it called, the thing that stores vectors so you can search them quickly?",
+    "The latency budget for the whole call is about two hundred milliseconds end to end.",
+    "I can't remember the word for it, it's kind of like a cache but for whole responses.",
+    "You know, uh, the thing with the gradient that keeps vanishing in deep networks.",
+    "The ephemeral containers are idempotent, so retrying the deployment is harmless.",
+    "Let's schedule the design review for Thursday and invite the platform team.",
+    "She said the quixotic plan to rewrite everything in Rust was, well, not sure about it.",
+]
+
+
+def synthetic_audio(utterances, seed=0):
+    # Voiced-like bursts (a few harmonics with syllable-rate modulation) separated by pauses
+    # long enough for the VAD to close each one. Same seed, same audio.
+    rng = np.random.default_rng(seed)
+    parts = [np.zeros(int(0.5 * SAMPLE_RATE), dtype=np.float32)]
+    for _ in range(utterances):
+        duration = rng.uniform(1.0, 3.0)
+        t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = rng.uniform(110, 220)
+        voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 4))
+        syllables = 0.6 + 0.4 * np.sin(2 * np.pi * rng.uniform(3, 5) * t)
+        parts.append((0.2 * voice * syllables).astype(np.float32))
+        parts.append(np.zeros(int(rng.uniform(0.9, 1.5) * SAMPLE_RATE), dtype=np.float32))
+    audio = np.concatenate(parts)
+    return audio + rng.normal(0, 0.001, len(audio)).astype(np.float32)
+
+
+def start_stubs(args):
+    # Starts the stubs and points the app's settings at them. Must run before any module
+    # that reads config is imported.
+    _, dictionary_url = start_dictionary_stub(latency_s=args.dict_latency, failure_rate=args.dict_failure)
+    _, llm_url = start_llm_stub(latency_s=args.llm_latency, failure_rate=args.llm_failure,
+                                token_delay_s=args.llm_token_delay)
+    # A second, slower provider gives the router something to hedge to.
+    _, backup_llm_url = start_llm_stub(latency_s=args.llm_latency * 2, failure_rate=args.llm_failure,
+                                       token_delay_s=args.llm_token_delay)
+    _, assemblyai_url, _ = start_assemblyai_stub(processing_s=args.asr_latency, failure_rate=args.asr_failure,
+                                                 transcript_text=TRANSCRIPTS)
+    os.environ.update({
+        "DICTIONARY_API_URL": dictionary_url,
+        "DEFINITION_CACHE_PATH": "",
+        "OPENROUTER_KEY": "benchmark", "OPENROUTER_URL": llm_url,
+        "GROQ_KEY": "benchmark", "GROQ_URL": backup_llm_url,
+        "GEMINI_KEY": "",
+        "ASSEMBLYAI_API_KEY": "benchmark", "ASSEMBLYAI_URL": assemblyai_url,
+        "LLM_CACHE_PATH": "",
+    })
+    if args.cold:
+        os.environ.update({"LLM_CACHE_SIZE": "0", "DEFINITION_CACHE_SIZE": "0"})
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": round(float(arr.mean()), 1),
+        "p50_ms": round(float(np.percentile(arr, 50)), 1),
+        "p95_ms": round(float(np.percentile(arr, 95)), 1),
+        "p99_ms": round(float(np.percentile(arr, 99)), 1),
+        "max_ms": round(float(arr.max()), 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    # Imported after start_stubs() so config picks up the stub URLs.
+    import config
+    from ring_buffer import RingBuffer
+    from pipeline import ChunkPipeline
+    from audio_utils import iter_vad_segments, iter_fixed_chunks
+    from transcription import transcribe_with_assemblyai, transcribe_with_whisper
+    from rowlogic import plan_row
+    from context_window import ContextWindow
+
+    if args.audio:
+        from batch import load_audio
+        audio = load_audio(args.audio)
+    else:
+        audio = synthetic_audio(args.utterances, args.seed)
+    # Trailing silence lets the segmenter close the last utterance.
+    audio = np.concatenate([audio, np.zeros(2 * SAMPLE_RATE, dtype=np.float32)])
+    if not args.no_nlp:
+        from nlp_stage import analyze_text
+        from models import get_nlp
+        get_nlp()
+    if args.engine == "Whisper":
+        from models import get_whisper_model
+        get_whisper_model()
+
+    ring = RingBuffer(max(config.CAPTURE_BUFFER_SECONDS * SAMPLE_RATE, 2 * config.CHUNK_SAMPLES))
+    stop_event = threading.Event()
+    block = int(0.02 * SAMPLE_RATE)
+    clock = {}
+
+    def written_at(position):
+        # Wall time at which the replay wrote sample `position` (blocks land on schedule).
+        block_end = -(-position // block) * block
+        return clock["start"] + block_end / (SAMPLE_RATE * args.speed)
+
+    def replay():
+        clock["start"] = time.perf_counter()
+        for start in range(0, len(audio), block):
+            delay = clock["start"] + (start + block) / (SAMPLE_RATE * args.speed) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            ring.write(audio[start:start + block])
+        stop_event.set()
+
+    samples = {stage: [] for stage in STAGES}
+    counts = {"segments": 0, "empty_transcripts": 0, "definition_errors": 0, "llm_errors": 0, "rows": 0}
+    lock = threading.Lock()
+
+    def record(timings):
+        with lock:
+            for stage, value in timings.items():
+                if stage in samples:
+                    samples[stage].append(value)
+
+    def work(job):
+        chunk, timings = job
+        started = time.perf_counter()
+        timings["queue_wait"] = started - timings["_submitted"]
+        if args.engine == "Whisper":
+            text = transcribe_with_whisper(chunk)
+        else:
+            text = transcribe_with_assemblyai(chunk)
+        timings["transcription"] = time.perf_counter() - started
+        if not text:
+            with lock:
+                counts["empty_transcripts"] += 1
+            record(timings)
+            return None
+        if not args.no_nlp:
+            started = time.perf_counter()
+            analyze_text(text)
+            timings["nlp"] = time.perf_counter() - started
+        return text, timings
+
+    cell_pool = ThreadPoolExecutor(max_workers=config.ENRICHMENT_WORKERS, thread_name_prefix="bench-cell")
+    row_pool = ThreadPoolExecutor(max_workers=config.ENRICHMENT_WORKERS, thread_name_prefix="bench-row")
+    window = ContextWindow(config.CONTEXT_TOKEN_BUDGET, config.CONTEXT_SUMMARY_TOKENS, config.CONTEXT_MAX_UTTERANCES)
+    row_futures = []
+    last_done = {"t": 0.0}
+
+    def timed(fn, *fn_args, **kwargs):
+        started = time.perf_counter()
+        return fn(*fn_args, **kwargs), time.perf_counter() - started
+
+    def enrich(cells, timings):
+        # Runs plan_row's cells concurrently, like insert_row.
+        started = time.perf_counter()
+        definitions = None
+        llm = []
+        first_token = []
+
+        def on_partial(_):
+            if not first_token:
+                first_token.append(time.perf_counter() - started)
+
+        # Each call reports a failure (all providers down) in its info dict; "—" alone is
+        # also the normal placeholder for an empty column, so the replies can't tell.
+        infos = []
+        for fields, _, fn, fn_args, is_llm in cells:
+            if not is_llm:
+                definitions = cell_pool.submit(timed, fn, *fn_args)
+                continue
+            infos.append({})
+            kwargs = {"on_partial": on_partial} if len(fields) == 1 else {}
+            llm.append(cell_pool.submit(timed, fn, *fn_args, info=infos[-1], **kwargs))
+        errors = {"definition_errors": 0, "llm_errors": 0}
+        if definitions is not None:
+            value, timings["definitions"] = definitions.result()
+            errors["definition_errors"] = int(value.startswith("❌"))
+        if llm:
+            for future in llm:
+                future.result()
+            timings["llm"] = time.perf_counter() - started
+            errors["llm_errors"] = sum(1 for info in infos if info.get("error"))
+            if first_token:
+                timings["llm_first_token"] = first_token[0]
+        now = time.perf_counter()
+        timings["end_to_end"] = now - timings["_end_written"]
+        record(timings)
+        with lock:
+            counts["rows"] += 1
+            for key, n in errors.items():
+                counts[key] += n
+            last_done["t"] = max(last_done["t"], now)
+
+    def deliver(result):
+        # Called in capture order, like insert_row, so the context window matches the app.
+        text, timings = result
+        _, _, _, cells = plan_row(text, window)
+        row_futures.append(row_pool.submit(enrich, cells, timings))
+
+    pipeline = ChunkPipeline(
+        work=work,
+        deliver=deliver,
+        workers=config.PIPELINE_WORKERS,
+        max_queue=config.PIPELINE_QUEUE_SIZE,
+        policy=config.PIPELINE_QUEUE_POLICY,
+        name="bench-chunk",
+    )
+    segments = iter_vad_segments if config.SEGMENTATION == "vad" else iter_fixed_chunks
+    feeder = threading.Thread(target=replay, name="bench-replay", daemon=True)
+    feeder.start()
+    while "start" not in clock:
+        time.sleep(0.001)
+    for start, end, chunk in segments(ring, stop_event, with_positions=True):
+        now = time.perf_counter()
+        end_written = written_at(end)
+        pipeline.submit((chunk, {"segmentation": max(0.0, now - end_written),
+                                 "_end_written": end_written, "_submitted": now}))
+        counts["segments"] += 1
+    feeder.join()
+    pipeline.close(wait=True)
+    for future in list(row_futures):
+        future.result()
+    cell_pool.shutdown()
+    row_pool.shutdown()
+
+    audio_s = len(audio) / SAMPLE_RATE
+    wall = (last_done["t"] or time.perf_counter()) - clock["start"]
+    counts["dropped_chunks"] = pipeline.dropped
+    counts["capture_overruns"] = ring.overruns
+    counts["context_tokens"] = window.stats()["total_tokens"]
+    counts["context_tokens_saved"] = window.stats()["tokens_saved"]
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            **{key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+            "segmentation": config.SEGMENTATION,
+            "pipeline_workers": config.PIPELINE_WORKERS,
+            "pipeline_queue_size": config.PIPELINE_QUEUE_SIZE,
+            "pipeline_queue_policy": config.PIPELINE_QUEUE_POLICY,
+            "enrichment_workers": config.ENRICHMENT_WORKERS,
+            "llm_combined_mode": config.LLM_COMBINED_MODE,
+            "llm_streaming": config.LLM_STREAMING,
+            "context_token_budget": config.CONTEXT_TOKEN_BUDGET,
+        },
+        "stages": {stage: percentiles(samples[stage]) for stage in STAGES},
+        "throughput": {
+            "audio_s": round(audio_s, 2),
+            "wall_s": round(wall, 2),
+            "rows_per_s": round(counts["rows"] / wall, 3) if wall else 0.0,
+            "realtime_factor": round(wall / audio_s, 3),
+        },
+        "counts": counts,
+    }
+
+
+def print_report(results, baseline=None):
+    print(f"\n📊 Benchmark @ {results['commit'] or 'unknown commit'}")
+    header = f"{'stage':<16}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δp95':>9}{'Δp99':>9}"
+    print(header)
+    for stage, stats in results["stages"].items():
+        if not stats["count"]:
+            continue
+        line = f"{stage:<16}{stats['count']:>5}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+        old = (baseline or {}).get("stages", {}).get(stage, {})
+        if baseline and old.get("count"):
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                delta = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                line += f"{delta:>+8.0f}%"
+        print(line)
+    throughput = results["throughput"]
+    print(f"\n{results['counts']['rows']} rows from {throughput['audio_s']}s of audio in {throughput['wall_s']}s "
+          f"({throughput['rows_per_s']} rows/s, RTF {throughput['realtime_factor']})")
+    print("counts:", results["counts"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark against local API stubs")
+    parser.add_argument("--audio", help="WAV/FLAC to replay instead of synthetic speech")
+    parser.add_argument("--utterances", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 1 = real time")
+    parser.add_argument("--engine", choices=["AssemblyAI", "Whisper"], default="AssemblyAI",
+                        help="AssemblyAI uses the local stub; Whisper runs the real model")
+    parser.add_argument("--no-nlp", action="store_true", help="skip the spaCy stage")
+    parser.add_argument("--cold", action="store_true", help="disable the LLM and definition caches")
+    parser.add_argument("--asr-latency", type=float, default=0.3, help="AssemblyAI stub processing time (s)")
+    parser.add_argument("--asr-failure", type=float, default=0.0)
+    parser.add_argument("--dict-latency", type=float, default=0.05)
+    parser.add_argument("--dict-failure", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-failure", type=float, default=0.0)
+    parser.add_argument("--llm-token-delay", type=float, default=0.01)
+    parser.add_argument("--out", default="benchmark.json", help="where to save the results")
+    parser.add_argument("--compare", help="earlier results JSON to show deltas against")
+    args = parser.parse_args()
+
+    start_stubs(args)
+    results = run(args)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print(f"💾 Saved to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,3 +8,117 @@ OPENROUTER_KEY = os.getenv("OPENROUTER_KEY")
 GROQ_KEY = os.getenv("GROQ_KEY")
 GEMINI_KEY = os.getenv("GEMINI_KEY")
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+
+# AssemblyAI: pooled session, polls start fast and back off; each chunk gives up after ASSEMBLYAI_DEADLINE_S
+ASSEMBLYAI_URL = os.getenv("ASSEMBLYAI_URL", "https://api.assemblyai.com/v2")
+ASSEMBLYAI_REALTIME_URL = os.getenv("ASSEMBLYAI_REALTIME_URL", "wss://streaming.assemblyai.com/v3/ws")
+ASSEMBLYAI_DEADLINE_S = float(os.getenv("ASSEMBLYAI_DEADLINE_S", "30"))
+ASSEMBLYAI_POLL_INITIAL_S = float(os.getenv("ASSEMBLYAI_POLL_INITIAL_S", "0.15"))
+ASSEMBLYAI_POLL_MAX_S = float(os.getenv("ASSEMBLYAI_POLL_MAX_S", "1.5"))
+
+# Models (loaded lazily by models.py; MODEL_WARMUP=1 preloads them in the background at startup)
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_COMPONENTS = ("tok2vec", "transformer", "tagger", "attribute_ruler", "lemmatizer", "parser", "ner")
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "8"))
+NLP_BATCH_WAIT_MS = float(os.getenv("NLP_BATCH_WAIT_MS", "0"))  # 0 = batch only what is already queued
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "tiny")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "auto")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = faster-whisper's default
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))  # concurrent transcribe() calls (or batches) on the shared model
+# Chunks waiting for Whisper at the same time are decoded as one batch (WHISPER_BATCH_SIZE=1 turns this off)
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+WHISPER_BATCH_WAIT_MS = float(os.getenv("WHISPER_BATCH_WAIT_MS", "5"))
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "")  # "" = detect per chunk; "en" skips detection
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+# Audio
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 160000  # ~10 s at SAMPLE_RATE
+CAPTURE_DTYPE = os.getenv("CAPTURE_DTYPE", "float32")  # "int16" halves capture memory
+CAPTURE_BUFFER_SECONDS = int(os.getenv("CAPTURE_BUFFER_SECONDS", "30"))
+
+# Segmentation: "vad" cuts at pauses in speech, "fixed" keeps the old CHUNK_SAMPLES windows
+SEGMENTATION = os.getenv("SEGMENTATION", "vad")
+VAD_FRAME_MS = 30
+VAD_MIN_UTTERANCE_S = float(os.getenv("VAD_MIN_UTTERANCE_S", "0.4"))
+VAD_MAX_UTTERANCE_S = float(os.getenv("VAD_MAX_UTTERANCE_S", "10"))
+VAD_SILENCE_TIMEOUT_S = float(os.getenv("VAD_SILENCE_TIMEOUT_S", "0.6"))
+VAD_ENERGY_MARGIN_DB = float(os.getenv("VAD_ENERGY_MARGIN_DB", "10"))
+VAD_MIN_ENERGY_DB = float(os.getenv("VAD_MIN_ENERGY_DB", "-50"))
+VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", "0.35"))
+
+# "Whisper (streaming)": re-transcribe a sliding window every STREAMING_STEP_S and commit the
+# words two consecutive passes agree on; the rest is shown as provisional text
+STREAMING_STEP_S = float(os.getenv("STREAMING_STEP_S", "0.75"))
+STREAMING_MAX_WINDOW_S = float(os.getenv("STREAMING_MAX_WINDOW_S", "12"))
+STREAMING_BEAM_SIZE = int(os.getenv("STREAMING_BEAM_SIZE", "1"))
+STREAMING_MAX_UTTERANCE_WORDS = int(os.getenv("STREAMING_MAX_UTTERANCE_WORDS", "40"))
+
+# Chunk processing pool: "drop_oldest" keeps the table near real time, "block" never loses audio
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+PIPELINE_QUEUE_POLICY = os.getenv("PIPELINE_QUEUE_POLICY", "drop_oldest")
+
+# Row enrichment (definitions + LLM calls) runs off the Tk thread
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "6"))
+CELL_FLUSH_MS = int(os.getenv("CELL_FLUSH_MS", "100"))
+
+# Results table: only TABLE_VISIBLE_ROWS rows have widgets; the newest TABLE_MAX_ROWS rows stay scrollable
+TABLE_VISIBLE_ROWS = int(os.getenv("TABLE_VISIBLE_ROWS", "10"))
+TABLE_MAX_ROWS = int(os.getenv("TABLE_MAX_ROWS", "2000"))
+
+# Dictionary lookups: in-memory LRU backed by SQLite (set DEFINITION_CACHE_PATH= to keep it in memory only)
+DEFINITION_CACHE_PATH = os.path.expanduser(os.getenv("DEFINITION_CACHE_PATH", "~/.speech_companion/definitions.sqlite3"))
+DEFINITION_CACHE_SIZE = int(os.getenv("DEFINITION_CACHE_SIZE", "2048"))
+DEFINITION_TTL_DAYS = float(os.getenv("DEFINITION_TTL_DAYS", "30"))
+DEFINITION_NEGATIVE_TTL_HOURS = float(os.getenv("DEFINITION_NEGATIVE_TTL_HOURS", "24"))
+DICTIONARY_API_URL = os.getenv("DICTIONARY_API_URL", "https://api.dictionaryapi.dev/api/v2/entries/en")
+DEFINITION_WORKERS = int(os.getenv("DEFINITION_WORKERS", "8"))
+DEFINITION_DEADLINE_S = float(os.getenv("DEFINITION_DEADLINE_S", "3"))
+# Offline dictionary index (built with python src/dict_index.py); the API is only asked about words it lacks
+DICTIONARY_INDEX_PATH = os.path.expanduser(os.getenv("DICTIONARY_INDEX_PATH", "~/.speech_companion/dictionary.idx"))
+
+# LLM providers: ranked by rolling latency/error rate, hedged once the leader passes its percentile latency
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+GROQ_URL = os.getenv("GROQ_URL", "https://api.groq.com/openai/v1/chat/completions")
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "10"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+# Ask for suggestions + ambiguity/hesitation support in one JSON call when both columns are needed
+LLM_COMBINED_MODE = os.getenv("LLM_COMBINED_MODE", "1") == "1"
+# Stream single-purpose LLM replies into their table cells as tokens arrive
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+
+# LLM response cache keyed on normalized context + prompt variant (LLM_CACHE_PATH enables persistence)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_MAX_AGE_S = float(os.getenv("LLM_CACHE_MAX_AGE_S", "3600"))
+LLM_CACHE_PATH = os.path.expanduser(os.getenv("LLM_CACHE_PATH", ""))
+
+# Tracing: Prometheus text metrics on 127.0.0.1:METRICS_PORT/metrics (0 disables), optional JSONL trace log
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+TRACE_FILE = os.path.expanduser(os.getenv("TRACE_FILE", ""))
+STATS_PANEL = os.getenv("STATS_PANEL", "1") == "1"
+
+# Ambiguity/hesitation signal patterns (JSON: {"ambiguity": {name: regex}, "hesitation": {...}})
+DETECTION_PATTERNS_PATH = os.getenv(
+    "DETECTION_PATTERNS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "detection_patterns.json")
+)
+
+# Session history: every row saved to SQLite with full-text search (set HISTORY_PATH= to disable)
+HISTORY_PATH = os.path.expanduser(os.getenv("HISTORY_PATH", "~/.speech_companion/history.sqlite3"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "64"))
+HISTORY_FLUSH_S = float(os.getenv("HISTORY_FLUSH_S", "1.0"))
+
+# LLM context: token budget for every prompt's context; older utterances are summarized into CONTEXT_SUMMARY_TOKENS
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "256"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "64"))
+CONTEXT_MAX_UTTERANCES = int(os.getenv("CONTEXT_MAX_UTTERANCES", "5"))
+
+# Server mode (python src/server.py): WebSocket clients share one set of models
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8770"))
+SERVER_INFERENCE_WORKERS = int(os.getenv("SERVER_INFERENCE_WORKERS", "0"))  # 0 = WHISPER_NUM_WORKERS × WHISPER_BATCH_SIZE for Whisper, SERVER_ENRICHMENT_WORKERS for AssemblyAI
+SERVER_ENRICHMENT_WORKERS = int(os.getenv("SERVER_ENRICHMENT_WORKERS", "16"))
+SERVER_SESSION_QUEUE = int(os.getenv("SERVER_SESSION_QUEUE", "4"))  # utterances waiting per client before dropping
+SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "64"))
@@ -0,0 +1,178 @@
+# context_window.py
+import math
+import re
+import threading
+from collections import Counter, deque
+
+from wordfreq import word_frequency
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_WORDS = re.compile(r"[a-z][a-z'-]+")
+
+
+def count_tokens(text):
+    # Close to what BPE tokenizers give for English: one token per short word or punctuation
+    # mark, one more per ~6 extra letters. Cheap enough to run on every utterance.
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECES.findall(text))
+
+
+def truncate_tokens(text, max_tokens, keep="head"):
+    # Whole words only; keep="tail" keeps the end of the text instead of the start.
+    words = text.split()
+    if keep == "tail":
+        words = words[::-1]
+    kept = []
+    used = 1  # the ellipsis
+    for word in words:
+        used += count_tokens(word)
+        if used > max_tokens:
+            break
+        kept.append(word)
+    if len(kept) == len(words):
+        return text
+    if keep == "tail":
+        return "… " + " ".join(reversed(kept))
+    return " ".join(kept) + " …"
+
+
+def _rarity(word):
+    # 0 for everyday words, up to ~4 for rare ones: rare words carry the topic.
+    return max(0.0, min(8.0, -math.log10(word_frequency(word, "en") or 1e-8)) - 4.0)
+
+
+class ContextWindow:
+    """Fixed token budget for the context that goes into every LLM prompt.
+
+    The newest utterances (at most max_utterances) are kept verbatim in
+    budget_tokens - summary_tokens. Older ones are folded into a rolling extractive summary
+    of at most summary_tokens: each folded utterance is scored once (rare and recurring
+    words), existing scores decay, and the lowest-scoring sentences are dropped until the
+    summary fits. Nothing is ever re-summarized, so a fold costs the same at hour eight as
+    at minute one.
+    """
+
+    def __init__(self, budget_tokens=256, summary_tokens=64, max_utterances=5, decay=0.85, max_topics=6):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = min(summary_tokens, budget_tokens // 2)
+        self.max_utterances = max_utterances
+        self.decay = decay
+        self.max_topics = max_topics
+        self._lock = threading.Lock()
+        self._recent = deque()        # (text, tokens), oldest first
+        self._recent_tokens = 0
+        self._sentences = []          # [score, seq, text, tokens] kept in the summary
+        self._topics = Counter()      # word -> decayed weight, scaled by _topic_scale
+        self._topic_scale = 1.0
+        self._summary = ""
+        self._summary_token_count = 0
+        self.seen = 0
+        self.folded = 0
+        self.input_tokens = 0
+        self.folded_tokens = 0
+
+    @property
+    def recent_budget(self):
+        return self.budget_tokens - self.summary_tokens
+
+    def add(self, utterance):
+        utterance = " ".join(utterance.split())
+        if not utterance:
+            return
+        with self._lock:
+            tokens = count_tokens(utterance)
+            self.seen += 1
+            self.input_tokens += tokens
+            if tokens > self.recent_budget:
+                # One very long utterance: keep its end, the part the next suggestion is about.
+                utterance = truncate_tokens(utterance, self.recent_budget, keep="tail")
+                tokens = count_tokens(utterance)
+            self._recent.append((utterance, tokens))
+            self._recent_tokens += tokens
+            while len(self._recent) > self.max_utterances or self._recent_tokens > self.recent_budget:
+                old, old_tokens = self._recent.popleft()
+                self._recent_tokens -= old_tokens
+                self._fold(old, old_tokens)
+
+    def _fold(self, text, tokens):
+        self.folded += 1
+        self.folded_tokens += tokens
+        words = set(_WORDS.findall(text.lower()))
+        rarity = {w: _rarity(w) for w in words}
+        content = [w for w in words if rarity[w] > 0]
+
+        # Decayed topic counts: bump the scale instead of touching every entry.
+        self._topic_scale /= self.decay
+        for word in content:
+            self._topics[word] += self._topic_scale
+        if self._topic_scale > 1e6 or len(self._topics) > 200:
+            self._topics = Counter({w: c / self._topic_scale for w, c in self._topics.most_common(50)})
+            self._topic_scale = 1.0
+
+        recurring = sum(self._topics[w] / self._topic_scale for w in content)
+        score = (sum(rarity.values()) + recurring) / math.sqrt(max(tokens, 1))
+        for sentence in self._sentences:
+            sentence[0] *= self.decay
+        self._sentences.append([score, self.folded, truncate_tokens(text, self.summary_tokens // 2), 0])
+        self._sentences[-1][3] = count_tokens(self._sentences[-1][2])
+        self._rebuild_summary()
+
+    def _rebuild_summary(self):
+        # Only the handful of kept sentences and topic words are touched here.
+        topics = [w for w, _ in self._topics.most_common(self.max_topics) if self._topics[w] > self._topic_scale]
+        topic_text = f"Topics: {', '.join(topics)}." if topics else ""
+        while True:
+            parts = [s[2] for s in sorted(self._sentences, key=lambda s: s[1])]
+            summary = (("Earlier: " + " … ".join(parts)) if parts else "") + (" " + topic_text if topic_text else "")
+            summary = summary.strip()
+            tokens = count_tokens(summary) + 2  # render()'s parentheses
+            if tokens <= self.summary_tokens or not self._sentences:
+                break
+            self._sentences.remove(min(self._sentences, key=lambda s: s[0]))
+        self._summary = summary if tokens <= self.summary_tokens else ""
+        self._summary_token_count = tokens if self._summary else 0
+
+    @property
+    def utterances(self):
+        # The verbatim window, oldest first (what detection runs over).
+        with self._lock:
+            return [text for text, _ in self._recent]
+
+    @property
+    def summary(self):
+        return self._summary
+
+    def render(self):
+        # The context string for prompts: summary of older speech, then the recent utterances.
+        with self._lock:
+            recent = " ".join(text for text, _ in self._recent)
+            return f"({self._summary}) {recent}" if self._summary else recent
+
+    def stats(self):
+        with self._lock:
+            total = self._summary_token_count + self._recent_tokens
+            return {
+                "budget_tokens": self.budget_tokens,
+                "total_tokens": total,
+                "recent_tokens": self._recent_tokens,
+                "summary_tokens": self._summary_token_count,
+                "recent_utterances": len(self._recent),
+                "utterances_seen": self.seen,
+                "utterances_summarized": self.folded,
+                "input_tokens": self.input_tokens,
+                "tokens_saved": self.input_tokens - total,
+            }
+
+    def reset(self):
+        # A fresh conversation: empty windows and zeroed counters, so stats() and `seen` start over.
+        with self._lock:
+            self._recent.clear()
+            self._recent_tokens = 0
+            self._sentences = []
+            self._topics = Counter()
+            self._topic_scale = 1.0
+            self._summary = ""
+            self._summary_token_count = 0
+            self.seen = 0
+            self.folded = 0
+            self.input_tokens = 0
+            self.folded_tokens = 0
@@ -20,12 +20,8 @@ def toggle_recording(
     engine_menu,
     status_label,
     stop_event,
-    audio_queue,
     engine_var,
-    scrollable_frame,
-    header,
-    row_widgets,
-    canvas,
+    table,
     root,
     record_audio,
     process_audio_chunk
@@ -39,9 +35,8 @@ def toggle_recording(
             is_recording_state[0] = True
             threading.Thread(
                 target=record_audio,
-                args=(device_index, stop_event, audio_queue, status_label,
-                      process_audio_chunk, engine_var, scrollable_frame, header,
-                      row_widgets, canvas, root),
+                args=(device_index, stop_event, status_label,
+                      process_audio_chunk, engine_var, table, root),
                 daemon=True
             ).start()
         except Exception as e:
@@ -49,7 +44,7 @@ def toggle_recording(
     else:
         stop_event.set()
         start_button.config(text="Start")
-        start_button.config(bg="blue" if engine_var.get() == "AssemblyAI" else "green")
+        start_button.config(bg="blue" if engine_var.get().startswith("AssemblyAI") else "green")
         mic_menu.config(state="readonly")
         engine_menu.config(state="readonly")
         status_label.config(text="Idle")
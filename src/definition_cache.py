@@ -0,0 +1,128 @@
+# definition_cache.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class DefinitionCache:
+    """In-process LRU in front of a SQLite store of dictionary lookups.
+
+    A stored definition of None is a negative entry ("the dictionary has no such word"),
+    kept for a shorter TTL so typos and jargon aren't re-requested on every mention.
+    """
+
+    def __init__(self, path=None, max_entries=2048, ttl_s=30 * 86400, negative_ttl_s=86400):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS definitions ("
+                "word TEXT PRIMARY KEY, definition TEXT, fetched_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _expired(self, definition, fetched_at, now):
+        ttl = self.ttl_s if definition is not None else self.negative_ttl_s
+        return now - fetched_at > ttl
+
+    def _remember(self, key, definition, fetched_at):
+        self._lru[key] = (definition, fetched_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, word, default=_MISSING):
+        # Returns the cached definition (possibly None for a negative entry) or `default` on a miss.
+        key = word.lower()
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and not self._expired(entry[0], entry[1], now):
+                self._lru.move_to_end(key)
+            else:
+                entry = None
+                if self._db is not None:
+                    row = self._db.execute(
+                        "SELECT definition, fetched_at FROM definitions WHERE word = ?", (key,)
+                    ).fetchone()
+                    if row is not None and not self._expired(row[0], row[1], now):
+                        entry = row
+                        self._remember(key, row[0], row[1])
+                        self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            if entry[0] is None:
+                self.negative_hits += 1
+            return entry[0]
+
+    def put(self, word, definition):
+        key = word.lower()
+        now = time.time()
+        with self._lock:
+            self._remember(key, definition, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO definitions (word, definition, fetched_at) VALUES (?, ?, ?)",
+                    (key, definition, now),
+                )
+                self._db.commit()
+
+    def get_or_fetch(self, word, fetch):
+        # fetch(word) returns a definition or None (not found); it raises on transient
+        # failures, which are deliberately not cached.
+        definition = self.get(word)
+        if definition is not _MISSING:
+            return definition
+        try:
+            definition = fetch(word)
+        except Exception:
+            return None
+        self.put(word, definition)
+        return definition
+
+    def prewarm(self, words, fetch):
+        # Returns how many words had to be fetched.
+        misses_before = self.misses
+        for word in words:
+            word = word.strip()
+            if word:
+                self.get_or_fetch(word, fetch)
+        return self.misses - misses_before
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._lru),
+            }
+
+
+if __name__ == "__main__":
+    # python src/definition_cache.py words.txt  — fetch and store one word per line
+    import sys
+    from text_utils import prewarm_definitions, definition_cache
+
+    with open(sys.argv[1], encoding="utf-8") as f:
+        fetched = prewarm_definitions(f)
+    print(f"✅ Prewarmed definition cache, fetched {fetched} words:", definition_cache.stats())
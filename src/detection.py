@@ -0,0 +1,76 @@
+# detection.py
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from config import DETECTION_PATTERNS_PATH
+
+KINDS = ("ambiguity", "hesitation")
+
+
+class DetectionEngine:
+    """All ambiguity/hesitation signals compiled into one regex, scanned in a single pass.
+
+    Every signal becomes a named group inside a zero-width lookahead, so overlapping
+    signals ("so like" and "like") are each reported with their own span. If two signals
+    start at the same character, the one listed first in the patterns file wins.
+    Per-utterance results are cached, so a sliding window only scans its newest utterance.
+    """
+
+    def __init__(self, patterns, min_words_for_ambiguity=4, min_hesitation_signals=2, cache_size=256):
+        self.min_words_for_ambiguity = min_words_for_ambiguity
+        self.min_hesitation_signals = min_hesitation_signals
+        self.cache_size = cache_size
+        self._signals = {}  # group name -> (kind, signal name)
+        alternatives = []
+        for kind in KINDS:
+            for i, (name, pattern) in enumerate(patterns.get(kind, {}).items()):
+                group = f"{kind}_{i}"
+                self._signals[group] = (kind, name)
+                alternatives.append(f"(?P<{group}>{pattern})")
+        self.regex = re.compile(f"(?=(?:{'|'.join(alternatives)}))")
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(
+            {kind: config.get(kind, {}) for kind in KINDS},
+            min_words_for_ambiguity=config.get("min_words_for_ambiguity", 4),
+            min_hesitation_signals=config.get("min_hesitation_signals", 2),
+        )
+
+    def scan(self, utterance):
+        # Returns {"ambiguity": [(signal, start, end), ...], "hesitation": [...], "words": n}.
+        with self._lock:
+            hits = self._cache.get(utterance)
+            if hits is not None:
+                self._cache.move_to_end(utterance)
+                return hits
+        text = utterance.lower()
+        hits = {kind: [] for kind in KINDS}
+        for match in self.regex.finditer(text):
+            kind, name = self._signals[match.lastgroup]
+            hits[kind].append((name, match.start(match.lastgroup), match.end(match.lastgroup)))
+        hits["words"] = len(text.split())
+        with self._lock:
+            self._cache[utterance] = hits
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return hits
+
+    def detect(self, utterances):
+        # Window-level verdict over already-split utterances: (ambiguous, hesitant, signals),
+        # where signals maps each kind to the names of the signals that fired.
+        scans = [self.scan(u) for u in utterances]
+        words = sum(s["words"] for s in scans)
+        signals = {kind: sorted({name for s in scans for name, _, _ in s[kind]}) for kind in KINDS}
+        ambiguous = words >= self.min_words_for_ambiguity and bool(signals["ambiguity"])
+        hesitant = len(signals["hesitation"]) >= self.min_hesitation_signals
+        return ambiguous, hesitant, signals
+
+
+engine = DetectionEngine.from_file(DETECTION_PATTERNS_PATH)
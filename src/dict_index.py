@@ -0,0 +1,278 @@
+# dict_index.py
+# Offline dictionary: a sorted, memory-mapped word → definition index.
+# Build it once from WordNet, a Wiktionary (kaikki.org) JSONL dump or a word<TAB>definition file:
+#   python src/dict_index.py ~/wordnet-3.0/dict -o ~/.speech_companion/dictionary.idx
+# and get_definition() answers from it before going to the network.
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"DICTIDX1"
+HEADER = struct.Struct("<8sIQQ")  # magic, entry count, keys offset, definitions offset
+ENTRY = struct.Struct("<IHIH")    # key offset, key length, definition offset, definition length
+MAX_DEFINITION_BYTES = 0xFFFF
+
+# WordNet's detachment rules (morphy), plus doubled consonants and -ly adverbs.
+SUFFIX_RULES = (
+    ("ies", "y"), ("ses", "s"), ("xes", "x"), ("zes", "z"), ("ches", "ch"), ("shes", "sh"),
+    ("men", "man"), ("s", ""),
+    ("ing", ""), ("ing", "e"), ("ied", "y"), ("ed", ""), ("ed", "e"),
+    ("iest", "y"), ("est", ""), ("est", "e"), ("ier", "y"), ("er", ""), ("er", "e"),
+    ("ily", "y"), ("ly", ""),
+)
+
+WORDNET_POS = ("noun", "verb", "adj", "adv")
+
+
+def normalize(word):
+    return " ".join(word.replace("_", " ").lower().split())
+
+
+def lemma_candidates(word):
+    # The word itself first, then every base form the suffix rules allow, most specific rule first.
+    key = normalize(word)
+    candidates = [key]
+    for suffix, ending in SUFFIX_RULES:
+        if key.endswith(suffix) and len(key) - len(suffix) >= 2:
+            base = key[:-len(suffix)] + ending
+            candidates.append(base)
+            if not ending and len(base) > 2 and base[-1] == base[-2] and base[-1] not in "aeiou":
+                candidates.append(base[:-1])  # stopped → stopp → stop
+    return list(dict.fromkeys(candidates))
+
+
+class DictionaryIndex:
+    """Read-only view over an index file built by build_index().
+
+    Opening maps the file and reads a 28-byte header, so startup cost doesn't grow with the
+    dictionary. Lookups binary-search the fixed-size entry table and decode only the one
+    definition they return.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._keys_at, self._defs_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a dictionary index")
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, i):
+        key_at, key_len, _, _ = ENTRY.unpack_from(self._mm, HEADER.size + i * ENTRY.size)
+        start = self._keys_at + key_at
+        return self._mm[start:start + key_len]
+
+    def _find(self, key):
+        target = key.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == target:
+            _, _, def_at, def_len = ENTRY.unpack_from(self._mm, HEADER.size + lo * ENTRY.size)
+            start = self._defs_at + def_at
+            return self._mm[start:start + def_len].decode("utf-8")
+        return None
+
+    def lookup(self, word):
+        # Tries the word as spoken, then its lemma candidates; None if none of them is indexed.
+        for candidate in lemma_candidates(word):
+            definition = self._find(candidate)
+            if definition is not None:
+                self.hits += 1
+                return definition
+        self.misses += 1
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def open_index(path):
+    # None when no index has been built (or it can't be read); callers then use the network only.
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        index = DictionaryIndex(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Dictionary index {path} not loaded:", e)
+        return None
+    print(f"📚 Offline dictionary: {len(index)} entries from {path}")
+    return index
+
+
+# === Building ===
+
+def _first_gloss(gloss):
+    # WordNet glosses are 'definition; "example"; "example"' — keep the definition.
+    return gloss.split('; "')[0].strip().rstrip(";").strip()
+
+
+def read_wordnet(directory):
+    # Most frequent sense per lemma: the first synset listed in index.<pos>, taking the part of
+    # speech with the most sense-tagged uses. Inflections from <pos>.exc become aliases.
+    definitions = {}
+    best = {}
+    for pos in WORDNET_POS:
+        index_path = os.path.join(directory, f"index.{pos}")
+        if not os.path.exists(index_path):
+            continue
+        # Synset glosses keyed by the offset each data line starts with, rather than seeking to
+        # it: copies with rewritten line endings no longer match their byte offsets.
+        glosses = {}
+        with open(os.path.join(directory, f"data.{pos}"), encoding="utf-8") as f:
+            for line in f:
+                if not line.startswith(" ") and " | " in line:
+                    glosses[int(line.split(" ", 1)[0])] = _first_gloss(line.split(" | ", 1)[1])
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(" "):
+                    continue  # license header
+                fields = line.split()
+                pointer_count = int(fields[3])
+                tagged = int(fields[5 + pointer_count])
+                offset = int(fields[6 + pointer_count])
+                lemma = normalize(fields[0])
+                if lemma in best and best[lemma] >= tagged:
+                    continue
+                if offset in glosses:
+                    best[lemma] = tagged
+                    definitions[lemma] = glosses[offset]
+    aliases = {}
+    for pos in WORDNET_POS:
+        exc_path = os.path.join(directory, f"{pos}.exc")
+        if os.path.exists(exc_path):
+            with open(exc_path, encoding="utf-8") as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) >= 2:
+                        aliases.setdefault(normalize(fields[0]), normalize(fields[1]))
+    return definitions, aliases
+
+
+def read_wiktionary(path):
+    # kaikki.org JSONL: one entry per line, first gloss of the first English entry for a word.
+    # "form of" senses (plurals, past tenses, ...) become aliases of their base word.
+    definitions = {}
+    aliases = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("lang_code", "en") != "en" or not entry.get("word"):
+                continue
+            word = normalize(entry["word"])
+            for sense in entry.get("senses", ()):
+                forms = sense.get("form_of") or sense.get("alt_of")
+                if forms and forms[0].get("word"):
+                    aliases.setdefault(word, normalize(forms[0]["word"]))
+                    break
+                if sense.get("glosses"):
+                    definitions.setdefault(word, sense["glosses"][0].strip())
+                    break
+    return definitions, aliases
+
+
+def read_tsv(path):
+    definitions = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            word, sep, definition = line.rstrip("\n").partition("\t")
+            if sep and definition.strip():
+                definitions.setdefault(normalize(word), definition.strip())
+    return definitions, {}
+
+
+def read_source(path):
+    if os.path.isdir(path):
+        return read_wordnet(path)
+    if path.endswith((".jsonl", ".json")):
+        return read_wiktionary(path)
+    return read_tsv(path)
+
+
+def build_index(sources, output):
+    # Earlier sources win on conflicts. Aliases share their target's definition bytes.
+    definitions = {}
+    aliases = {}
+    for source in sources:
+        source_defs, source_aliases = read_source(source)
+        print(f"📖 {source}: {len(source_defs)} definitions, {len(source_aliases)} inflections")
+        for word, definition in source_defs.items():
+            definitions.setdefault(word, definition)
+        for word, base in source_aliases.items():
+            aliases.setdefault(word, base)
+
+    keys_blob = bytearray()
+    defs_blob = bytearray()
+    def_refs = {}
+    for word in sorted(definitions):
+        encoded = definitions[word].encode("utf-8")[:MAX_DEFINITION_BYTES]
+        encoded = encoded.decode("utf-8", "ignore").encode("utf-8")  # don't cut a character in half
+        def_refs[word] = (len(defs_blob), len(encoded))
+        defs_blob += encoded
+    for word, base in aliases.items():
+        if word not in def_refs and base in def_refs:
+            def_refs[word] = def_refs[base]
+
+    entries = []
+    for word in sorted(def_refs, key=lambda w: w.encode("utf-8")):
+        key = word.encode("utf-8")
+        if len(key) > 0xFFFF:
+            continue
+        entries.append(ENTRY.pack(len(keys_blob), len(key), *def_refs[word]))
+        keys_blob += key
+
+    keys_at = HEADER.size + len(entries) * ENTRY.size
+    defs_at = keys_at + len(keys_blob)
+    tmp = output + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries), keys_at, defs_at))
+        f.write(b"".join(entries))
+        f.write(keys_blob)
+        f.write(defs_blob)
+    os.replace(tmp, output)  # a running app keeps its mapping of the old file
+    return len(entries)
+
+
+def main():
+    from config import DICTIONARY_INDEX_PATH
+
+    parser = argparse.ArgumentParser(description="Build the offline dictionary index used for difficult-word definitions")
+    parser.add_argument("sources", nargs="+",
+                        help="WordNet dict/ directory, Wiktionary .jsonl dump or word<TAB>definition file")
+    parser.add_argument("-o", "--output", default=DICTIONARY_INDEX_PATH)
+    parser.add_argument("--check", nargs="*", default=["serendipity", "ephemeral", "obfuscated", "quagmires"],
+                        help="words to look up once built")
+    args = parser.parse_args()
+    if not args.output:
+        parser.error("no output path: pass -o or set DICTIONARY_INDEX_PATH")
+
+    start = time.perf_counter()
+    count = build_index(args.sources, args.output)
+    print(f"✅ {count} entries → {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    index = DictionaryIndex(args.output)
+    for word in args.check:
+        start = time.perf_counter()
+        definition = index.lookup(word)
+        print(f"   {word}: {definition or '—'} ({(time.perf_counter() - start) * 1e6:.0f} µs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# history.py
+# Session history: every enriched row, persisted to SQLite with full-text search.
+#   python src/history.py search "latency budget"
+#   python src/history.py export rows.csv --session 20250101-093000
+import argparse
+import csv
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+FIELDS = ("session_id", "created_at", "updated_at", "engine", "text", "concepts", "entities",
+          "definitions", "suggestion", "support", "ambiguous", "hesitant")
+SEARCHABLE = ("text", "concepts", "entities", "definitions")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    id INTEGER PRIMARY KEY,
+    row_key TEXT UNIQUE NOT NULL,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    engine TEXT,
+    text TEXT,
+    concepts TEXT,
+    entities TEXT,
+    definitions TEXT,
+    suggestion TEXT,
+    support TEXT,
+    ambiguous INTEGER,
+    hesitant INTEGER
+);
+CREATE INDEX IF NOT EXISTS rows_session ON rows (session_id, created_at);
+"""
+
+# External-content FTS5 index kept in step with `rows` by triggers.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS rows_fts USING fts5(
+    text, concepts, entities, definitions, content='rows', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS rows_ai AFTER INSERT ON rows BEGIN
+    INSERT INTO rows_fts (rowid, text, concepts, entities, definitions)
+    VALUES (new.id, new.text, new.concepts, new.entities, new.definitions);
+END;
+CREATE TRIGGER IF NOT EXISTS rows_ad AFTER DELETE ON rows BEGIN
+    INSERT INTO rows_fts (rows_fts, rowid, text, concepts, entities, definitions)
+    VALUES ('delete', old.id, old.text, old.concepts, old.entities, old.definitions);
+END;
+CREATE TRIGGER IF NOT EXISTS rows_au AFTER UPDATE OF text, concepts, entities, definitions ON rows BEGIN
+    INSERT INTO rows_fts (rows_fts, rowid, text, concepts, entities, definitions)
+    VALUES ('delete', old.id, old.text, old.concepts, old.entities, old.definitions);
+    INSERT INTO rows_fts (rowid, text, concepts, entities, definitions)
+    VALUES (new.id, new.text, new.concepts, new.entities, new.definitions);
+END;
+"""
+
+
+def _connect(path):
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")  # searches and exports don't block the writer
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def _fts_query(query):
+    # Plain words, each quoted so FTS5 operators and punctuation in speech can't break the query;
+    # the last word also matches as a prefix.
+    words = query.split()
+    terms = ['"' + w.replace('"', '""') + '"' for w in words]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class HistoryStore:
+    """Append-only row history written by one background thread.
+
+    add() and update() only enqueue, so the GUI thread never touches the disk. The writer
+    drains up to batch_size changes (or whatever arrived within flush_interval_s), merges the
+    changes per row, and commits them in a single transaction. A row is inserted as soon as it
+    is shown; its definition and LLM cells are filled in as they arrive.
+    """
+
+    def __init__(self, path, batch_size=64, flush_interval_s=1.0, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.session_id = time.strftime("%Y%m%d-%H%M%S")
+        self.written = 0
+        self.dropped = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = _connect(path)
+        self._db.executescript(SCHEMA)
+        try:
+            self._db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            print("⚠️ SQLite without FTS5, history search falls back to LIKE:", e)
+            self.fts = False
+        self._db.commit()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="history", daemon=True)
+        self._writer.start()
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # The disk can't keep up; dropping beats growing without bound or blocking the GUI.
+            self.dropped += 1
+
+    def add(self, text, concepts="", entities="", engine="", ambiguous=False, hesitant=False):
+        # Returns the row key for later update() calls.
+        key = uuid.uuid4().hex
+        now = time.time()
+        self._enqueue((key, {
+            "session_id": self.session_id,
+            "created_at": now,
+            "updated_at": now,
+            "engine": engine,
+            "text": text,
+            "concepts": concepts,
+            "entities": entities,
+            "ambiguous": int(bool(ambiguous)),
+            "hesitant": int(bool(hesitant)),
+        }))
+        return key
+
+    def update(self, key, **fields):
+        # e.g. update(key, definitions="...", suggestion="...")
+        fields["updated_at"] = time.time()
+        self._enqueue((key, fields))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # finish this batch, then stop
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except Exception as e:
+                print("❌ History write failed:", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        merged = OrderedDict()
+        for key, fields in batch:
+            merged.setdefault(key, {}).update(fields)
+        with self._db:
+            for key, fields in merged.items():
+                columns = list(fields)
+                if "created_at" in fields:
+                    # New row (possibly with cells that already arrived in the same batch).
+                    self._db.execute(
+                        f"INSERT OR IGNORE INTO rows (row_key, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+                        (key, *fields.values()),
+                    )
+                else:
+                    self._db.execute(
+                        f"UPDATE rows SET {', '.join(f'{c} = ?' for c in columns)} WHERE row_key = ?",
+                        (*fields.values(), key),
+                    )
+        self.written += len(merged)
+
+    def flush(self):
+        # Blocks until everything enqueued so far is on disk.
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._db.close()
+
+    # === Reading (separate connections, safe from any thread) ===
+
+    def search(self, query, limit=50, session_id=None):
+        self.flush()
+        return search(self.path, query, limit=limit, session_id=session_id)
+
+    def export(self, out_path, session_id=None):
+        self.flush()
+        return export(self.path, out_path, session_id=session_id)
+
+    def stats(self):
+        return {"written": self.written, "pending": self._queue.qsize(), "dropped": self.dropped}
+
+
+def _rows(cursor):
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+
+def search(path, query, limit=50, session_id=None):
+    # Best matches first (bm25); newest first when the database was created without FTS5.
+    # An empty query returns every row, newest first, on both paths.
+    columns = ", ".join(f"rows.{f}" for f in FIELDS)
+    session_filter = " AND rows.session_id = ?" if session_id else ""
+    session_args = (session_id,) if session_id else ()
+    match = _fts_query(query)
+    db = _connect(path)
+    try:
+        if match and db.execute("SELECT 1 FROM sqlite_master WHERE name = 'rows_fts'").fetchone():
+            cursor = db.execute(
+                f"SELECT {columns} FROM rows_fts JOIN rows ON rows.id = rows_fts.rowid "
+                f"WHERE rows_fts MATCH ?{session_filter} ORDER BY rank LIMIT ?",
+                (match, *session_args, limit),
+            )
+        else:
+            like = " AND ".join(
+                "(" + " OR ".join(f"rows.{f} LIKE ?" for f in SEARCHABLE) + ")" for _ in query.split()
+            ) or "1"
+            args = [f"%{w}%" for w in query.split() for _ in SEARCHABLE]
+            cursor = db.execute(
+                f"SELECT {columns} FROM rows WHERE {like}{session_filter} ORDER BY rows.created_at DESC LIMIT ?",
+                (*args, *session_args, limit),
+            )
+        return _rows(cursor)
+    finally:
+        db.close()
+
+
+def export(path, out_path, session_id=None):
+    # JSONL or CSV by extension, oldest row first; returns the number of rows written.
+    db = _connect(path)
+    try:
+        where = " WHERE session_id = ?" if session_id else ""
+        cursor = db.execute(f"SELECT {', '.join(FIELDS)} FROM rows{where} ORDER BY created_at",
+                            (session_id,) if session_id else ())
+        count = 0
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            if out_path.lower().endswith(".csv"):
+                writer = csv.writer(f)
+                writer.writerow(FIELDS)
+                for row in cursor:
+                    writer.writerow(row)
+                    count += 1
+            else:
+                for row in cursor:
+                    f.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n")
+                    count += 1
+        return count
+    finally:
+        db.close()
+
+
+def main():
+    from config import HISTORY_PATH
+
+    parser = argparse.ArgumentParser(description="Search or export the session history")
+    parser.add_argument("--db", default=HISTORY_PATH, help="history database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search_cmd = commands.add_parser("search", help="full-text search over past rows")
+    search_cmd.add_argument("query")
+    search_cmd.add_argument("--limit", type=int, default=20)
+    search_cmd.add_argument("--session")
+    export_cmd = commands.add_parser("export", help="write rows as .jsonl or .csv")
+    export_cmd.add_argument("output")
+    export_cmd.add_argument("--session")
+    args = parser.parse_args()
+
+    if not args.db or not os.path.exists(args.db):
+        print(f"❌ No history at {args.db or '(HISTORY_PATH unset)'}")
+        return 1
+    if args.command == "search":
+        for row in search(args.db, args.query, limit=args.limit, session_id=args.session):
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["created_at"]))
+            print(f"🗣️ [{when} · {row['engine']}] {row['text']}")
+            if row["suggestion"]:
+                print(f"   💡 {row['suggestion']}")
+        return 0
+    count = export(args.db, args.output, session_id=args.session)
+    print(f"✅ Exported {count} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
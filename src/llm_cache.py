@@ -0,0 +1,91 @@
+# llm_cache.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_context(text):
+    # Case, punctuation, spacing and stuttered repeats ("the the") don't change the answer.
+    text = text.lower().replace("’", "'")
+    words = re.findall(r"[\w']+", text)
+    deduped = [w for i, w in enumerate(words) if i == 0 or w != words[i - 1]]
+    return " ".join(deduped)
+
+
+def make_cache_key(context, variant):
+    return hashlib.sha1(f"{variant}\0{normalize_context(context)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU of LLM responses with size- and age-based eviction and optional SQLite persistence."""
+
+    def __init__(self, max_entries=512, max_age_s=3600, path=None):
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - max_age_s,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+                (max_entries,),
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, response, created_at FROM responses ORDER BY created_at DESC LIMIT ?",
+                (max_entries,),
+            ).fetchall()
+            for key, response, created_at in reversed(rows):
+                self._entries[key] = (response, created_at)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.max_age_s:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (response, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, now),
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,316 @@
+# llm_router.py
+import abc
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+import google.generativeai as genai
+
+from tracing import metrics
+
+
+class AllProvidersFailed(Exception):
+    pass
+
+
+class ProviderStats:
+    # Rolling window of recent calls; hedging uses prior_latency_s until there is history.
+    def __init__(self, window=50, prior_latency_s=2.0):
+        self.calls = deque(maxlen=window)
+        self.prior_latency_s = prior_latency_s
+        self._lock = threading.Lock()
+
+    def record(self, latency_s, ok):
+        with self._lock:
+            self.calls.append((latency_s, ok))
+
+    def latency_percentile(self, pct):
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self.calls if ok)
+        if not latencies:
+            return self.prior_latency_s
+        index = min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self):
+        with self._lock:
+            if not self.calls:
+                return 0.0
+            return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+    def score(self):
+        # Expected cost of trying this provider first: typical latency, inflated by failures.
+        # Untried providers score 0 so each gets sampled once before ranking settles.
+        if not self.calls:
+            return 0.0
+        return self.latency_percentile(50) * (1 + 4 * self.error_rate())
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive errors; lets one trial call through after `cooldown_s`."""
+
+    def __init__(self, failures=3, cooldown_s=30.0):
+        self.failures = failures
+        self.cooldown_s = cooldown_s
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_s:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                return False
+            if self.state == "half-open":
+                # Re-arm immediately so only a single trial runs per cooldown.
+                self.opened_at = time.monotonic()
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.consecutive_failures = 0
+                self.opened_at = None
+                return
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+class Provider(abc.ABC):
+    def __init__(self, name, key, model, timeout_s=10):
+        self.name = name
+        self.key = key
+        self.model = model
+        self.timeout_s = timeout_s
+        self.stats = ProviderStats()
+        self.breaker = CircuitBreaker()
+
+    @property
+    def configured(self):
+        return bool(self.key)
+
+    @abc.abstractmethod
+    def complete(self, prompt, temperature=0.7, max_tokens=200, json_mode=False):
+        pass
+
+    @abc.abstractmethod
+    def stream(self, prompt, temperature=0.7, max_tokens=200):
+        # Yields text deltas as the provider produces them.
+        pass
+
+
+class OpenAICompatibleProvider(Provider):
+    # OpenRouter, Groq and the local stub all speak the /chat/completions dialect.
+    _session = requests.Session()
+
+    def __init__(self, name, url, key, model, timeout_s=10):
+        super().__init__(name, key, model, timeout_s)
+        self.url = url
+
+    def _payload(self, prompt, temperature, max_tokens):
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+    def complete(self, prompt, temperature=0.7, max_tokens=200, json_mode=False):
+        data = self._payload(prompt, temperature, max_tokens)
+        if json_mode:
+            data["response_format"] = {"type": "json_object"}
+        res = self._session.post(
+            self.url, headers={"Authorization": f"Bearer {self.key}"}, json=data, timeout=self.timeout_s
+        )
+        res.raise_for_status()
+        return res.json()["choices"][0]["message"]["content"].strip()
+
+    def stream(self, prompt, temperature=0.7, max_tokens=200):
+        data = self._payload(prompt, temperature, max_tokens)
+        data["stream"] = True
+        with self._session.post(
+            self.url, headers={"Authorization": f"Bearer {self.key}"}, json=data,
+            timeout=self.timeout_s, stream=True,
+        ) as res:
+            res.raise_for_status()
+            # SSE is always UTF-8; a bare text/event-stream would otherwise decode as ISO-8859-1.
+            res.encoding = "utf-8"
+            # Server-sent events: "data: {json}" lines, terminated by "data: [DONE]".
+            for line in res.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    return
+                delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+
+class GeminiProvider(Provider):
+    def __init__(self, name, key, model, timeout_s=10):
+        super().__init__(name, key, model, timeout_s)
+        if key:
+            genai.configure(api_key=key)
+
+    def complete(self, prompt, temperature=0.7, max_tokens=200, json_mode=False):
+        model = genai.GenerativeModel(self.model)
+        generation_config = {"temperature": temperature, "max_output_tokens": max_tokens}
+        if json_mode:
+            generation_config["response_mime_type"] = "application/json"
+        res = model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options={"timeout": self.timeout_s},
+        )
+        return res.text.strip()
+
+    def stream(self, prompt, temperature=0.7, max_tokens=200):
+        model = genai.GenerativeModel(self.model)
+        res = model.generate_content(
+            prompt,
+            generation_config={"temperature": temperature, "max_output_tokens": max_tokens},
+            request_options={"timeout": self.timeout_s},
+            stream=True,
+        )
+        for chunk in res:
+            if chunk.text:
+                yield chunk.text
+
+
+class ProviderRouter:
+    """Sends each prompt to the provider expected to answer fastest.
+
+    If it hasn't answered within its own hedge_percentile latency, the next-best provider
+    is raced against it and the first success wins. Failures feed per-provider circuit
+    breakers so a dead provider stops being tried until its cooldown elapses.
+    """
+
+    def __init__(self, providers, hedge_percentile=90, min_hedge_delay_s=0.5,
+                 breaker_failures=3, breaker_cooldown_s=30.0, max_workers=8):
+        self.providers = providers
+        for provider in providers:
+            provider.breaker = CircuitBreaker(breaker_failures, breaker_cooldown_s)
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay_s = min_hedge_delay_s
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def ranked(self):
+        # sorted() is stable, so untried providers keep their configured order.
+        candidates = [p for p in self.providers if p.configured and p.breaker.state != "open"]
+        return sorted(candidates, key=lambda p: p.stats.score())
+
+    def hedge_delay(self, provider):
+        delay = provider.stats.latency_percentile(self.hedge_percentile)
+        return min(max(delay, self.min_hedge_delay_s), provider.timeout_s)
+
+    @staticmethod
+    def _record(provider, start, ok):
+        latency = time.perf_counter() - start
+        provider.stats.record(latency, ok)
+        provider.breaker.record(ok)
+        metrics.observe("llm_provider_seconds", latency, provider=provider.name, outcome="ok" if ok else "error")
+
+    def _call(self, provider, prompt, options):
+        start = time.perf_counter()
+        try:
+            result = provider.complete(prompt, **options)
+            if not result:
+                raise ValueError("empty completion")
+        except Exception:
+            self._record(provider, start, False)
+            raise
+        self._record(provider, start, True)
+        return result
+
+    def complete(self, prompt, **options):
+        # Returns (text, provider_name); raises AllProvidersFailed.
+        waiting = self.ranked()
+        launched = {}
+        pending = set()
+        errors = []
+
+        def launch():
+            while waiting:
+                provider = waiting.pop(0)
+                if not provider.breaker.allow():
+                    continue
+                print(f"🌐 Trying {provider.name} API...")
+                future = self._pool.submit(self._call, provider, prompt, options)
+                launched[future] = provider
+                pending.add(future)
+                return provider
+            return None
+
+        latest = launch()
+        if latest is None:
+            raise AllProvidersFailed("No LLM provider is configured and available")
+        while pending:
+            timeout = self.hedge_delay(latest) if waiting else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = launched[future]
+                if future.exception() is None:
+                    return future.result(), provider.name
+                print(f"❌ {provider.name} failed:", future.exception())
+                errors.append(f"{provider.name}: {future.exception()}")
+            if waiting:
+                # Either the current leader is slow (hedge) or something just failed.
+                if not done:
+                    print(f"⏱️ {latest.name} slower than {timeout:.2f}s, hedging")
+                latest = launch() or latest
+        raise AllProvidersFailed("; ".join(errors))
+
+    def stream(self, prompt, on_text, **options):
+        # Streams from the best-ranked provider, calling on_text(text_so_far) per delta.
+        # Returns (text, provider_name, partial). Streams aren't hedged; a provider that fails
+        # before its first token is skipped for the next one, a failure mid-stream keeps what
+        # already arrived and returns it with partial=True.
+        errors = []
+        for provider in self.ranked():
+            if not provider.breaker.allow():
+                continue
+            print(f"🌐 Streaming from {provider.name} API...")
+            start = time.perf_counter()
+            text = ""
+            try:
+                for delta in provider.stream(prompt, **options):
+                    text += delta
+                    on_text(text)
+            except Exception as e:
+                print(f"❌ {provider.name} stream failed:", e)
+                errors.append(f"{provider.name}: {e}")
+                self._record(provider, start, False)
+                if text.strip():
+                    return text.strip(), provider.name, True
+                continue
+            if not text.strip():
+                errors.append(f"{provider.name}: empty stream")
+                self._record(provider, start, False)
+                continue
+            self._record(provider, start, True)
+            return text.strip(), provider.name, False
+        raise AllProvidersFailed("; ".join(errors) or "No LLM provider is configured and available")
+
+    def stats(self):
+        return {
+            p.name: {
+                "p50_s": p.stats.latency_percentile(50),
+                "p90_s": p.stats.latency_percentile(90),
+                "error_rate": p.stats.error_rate(),
+                "breaker": p.breaker.state,
+                "calls": len(p.stats.calls),
+            }
+            for p in self.providers
+        }
@@ -1,10 +1,88 @@
 # llm_utils.py
-import requests
+import json
 import logging
-import google.generativeai as genai
-from config import OPENROUTER_KEY, GROQ_KEY, GEMINI_KEY
+import re
+from config import (
+    OPENROUTER_KEY,
+    GROQ_KEY,
+    GEMINI_KEY,
+    OPENROUTER_URL,
+    GROQ_URL,
+    LLM_TIMEOUT_S,
+    LLM_HEDGE_PERCENTILE,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_COOLDOWN_S,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_MAX_AGE_S,
+    LLM_CACHE_PATH,
+    LLM_STREAMING,
+)
+from llm_cache import ResponseCache, make_cache_key
+from llm_router import (
+    ProviderRouter,
+    OpenAICompatibleProvider,
+    GeminiProvider,
+)
 
-def get_llm_suggestion(context_text):
+# One router shared by every LLM call, so latency/error history and breakers are global.
+router = ProviderRouter(
+    [
+        OpenAICompatibleProvider("OpenRouter", OPENROUTER_URL, OPENROUTER_KEY, "mistralai/mistral-7b-instruct", LLM_TIMEOUT_S),
+        OpenAICompatibleProvider("GROQ", GROQ_URL, GROQ_KEY, "llama3-8b-8192", LLM_TIMEOUT_S),
+        GeminiProvider("Gemini", GEMINI_KEY, "gemini-1.5-flash", LLM_TIMEOUT_S),
+    ],
+    hedge_percentile=LLM_HEDGE_PERCENTILE,
+    breaker_failures=LLM_BREAKER_FAILURES,
+    breaker_cooldown_s=LLM_BREAKER_COOLDOWN_S,
+)
+
+response_cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_MAX_AGE_S, LLM_CACHE_PATH or None)
+
+def _complete(prompt, mode="", cache_key=None, info=None, on_partial=None):
+    # info, if given, is filled with {"cache_hit": bool, "provider": name} for this call,
+    # plus "error" when every provider failed and the "—" placeholder was returned, and
+    # "partial" when a stream broke off midway (such replies are returned but never cached).
+    # on_partial(text_so_far), if given and LLM_STREAMING is on, receives the reply as it streams in.
+    if info is None:
+        info = {}
+    info["cache_hit"] = False
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            print(f"♻️ LLM{mode} cache hit")
+            info.update(cache_hit=True, provider="cache")
+            return cached
+    try:
+        partial = False
+        if on_partial is not None and LLM_STREAMING:
+            result, provider, partial = router.stream(prompt, on_partial)
+        else:
+            result, provider = router.complete(prompt)
+        info["provider"] = provider
+        if partial:
+            print(f"⚠️ {provider}{mode} stream cut off, keeping partial reply:\n", result)
+            info["partial"] = True
+            return result
+        print(f"✅ {provider}{mode} Success:\n", result)
+        if cache_key is not None:
+            response_cache.put(cache_key, result)
+        return result
+    except Exception as e:
+        print(f"❌ All{mode} LLMs failed:", e)
+        logging.exception(f"❌ All{mode} LLMs failed")
+        info["error"] = str(e)
+        return "—"
+
+def get_prompt_variant(ambiguous=False, hesitant=False):
+    if ambiguous and hesitant:
+        return "recall+clarify"
+    if ambiguous:
+        return "recall"
+    if hesitant:
+        return "clarify"
+    return "enhance"
+
+def get_llm_suggestion(context_text, info=None, on_partial=None):
     print("🧠 Entering get_llm_suggestion()")
     logging.debug("🧠 Context Text: %s", context_text)
 
@@ -25,104 +103,109 @@ Respond using clean markdown bullet points only. No intro, no explanation, no la
 [/INST]
 """.strip()
 
-    messages = [{"role": "user", "content": prompt}]
-    
-    try:
-        print("🌐 Trying OpenRouter API...")
-        headers = {"Authorization": f"Bearer {OPENROUTER_KEY}"}
-        data = {
-            "model": "mistralai/mistral-7b-instruct",
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 200
-        }
-        res = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=10)
-        result = res.json()["choices"][0]["message"]["content"].strip()
-        print("✅ OpenRouter Success:\n", result)
-        return result
-    except Exception as e:
-        print("❌ OpenRouter failed:", e)
-
-    try:
-        print("🌐 Trying GROQ API...")
-        headers = {"Authorization": f"Bearer {GROQ_KEY}"}
-        data = {
-            "model": "llama3-8b-8192",
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 200
-        }
-        res = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=data, timeout=10)
-        result = res.json()["choices"][0]["message"]["content"].strip()
-        print("✅ GROQ Success:\n", result)
-        return result
-    except Exception as e2:
-        print("❌ GROQ failed:", e2)
-
-    try:
-        print("🌐 Trying Gemini API...")
-        genai.configure(api_key=GEMINI_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        res = model.generate_content(prompt)
-        result = res.text.strip()
-        print("✅ Gemini Success:\n", result)
-        return result
-    except Exception as e3:
-        print("❌ Gemini failed:", e3)
-        logging.exception("❌ All LLMs failed")
-        return "—"
+    return _complete(prompt, cache_key=make_cache_key(context_text, "suggestion"), info=info, on_partial=on_partial)
 
-def get_llm_support_response(prompt):
+def get_llm_support_response(prompt, cache_key=None, info=None, on_partial=None):
+    # Callers that know the raw context should pass make_cache_key(context, get_prompt_variant(...));
+    # otherwise the normalized prompt itself is the key.
     print("🧠 Entering get_llm_support_response()")
     logging.debug("📨 Prompt for support LLM:\n%s", prompt)
+    if cache_key is None:
+        cache_key = make_cache_key(prompt, "support")
+    return _complete(prompt, " (Support)", cache_key=cache_key, info=info, on_partial=on_partial)
 
-    messages = [{"role": "user", "content": prompt}]
+def get_combined_prompt(context, ambiguous=False, hesitant=False):
+    if ambiguous and hesitant:
+        support_task = "3–5 terms or concepts the user may be trying to recall while speaking hesitantly, each with a brief description"
+    elif ambiguous:
+        support_task = "3–5 terms the user may be trying to remember, each with a short description"
+    else:
+        support_task = "2–3 clarifying suggestions or possible interpretations of what the unsure user means"
+    return f"""[INST]
+You are a real-time conversation enhancer.
 
-    try:
-        print("🌐 Trying OpenRouter API (Support Mode)...")
-        headers = {"Authorization": f"Bearer {OPENROUTER_KEY}"}
-        data = {
-            "model": "mistralai/mistral-7b-instruct",
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 200
-        }
-        res = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=10)
-        result = res.json()["choices"][0]["message"]["content"].strip()
-        print("✅ OpenRouter Support Success:\n", result)
-        return result
-    except Exception as e:
-        print("❌ OpenRouter (Support) failed:", e)
+Input: {context}
 
-    try:
-        print("🌐 Trying GROQ API (Support Mode)...")
-        headers = {"Authorization": f"Bearer {GROQ_KEY}"}
-        data = {
-            "model": "llama3-8b-8192",
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 200
-        }
-        res = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=data, timeout=10)
-        result = res.json()["choices"][0]["message"]["content"].strip()
-        print("✅ GROQ Support Success:\n", result)
-        return result
-    except Exception as e2:
-        print("❌ GROQ (Support) failed:", e2)
+Your task:
+- Do NOT repeat or reference the input.
+- jargon: domain-relevant jargon (short buzzwords only)
+- glossary: compact glossary terms (noun phrases)
+- followup: follow-up ideas (noun phrases or fragments)
+- support: {support_task}
 
-    try:
-        print("🌐 Trying Gemini API (Support Mode)...")
-        genai.configure(api_key=GEMINI_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        res = model.generate_content(prompt)
-        result = res.text.strip()
-        print("✅ Gemini Support Success:\n", result)
-        return result
-    except Exception as e3:
-        print("❌ Gemini (Support) failed:", e3)
-        logging.exception("❌ All support LLMs failed")
+Respond with a single JSON object and nothing else, matching this schema:
+{{"jargon": [string], "glossary": [string], "followup": [string],
+  "support": [{{"term": string, "description": string}}]}}
+[/INST]""".strip()
 
-    return "—"
+def parse_combined_response(text):
+    # Returns the validated dict; raises ValueError on anything that doesn't match the schema.
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in response")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("Response is not a JSON object")
+    for field in ("jargon", "glossary", "followup"):
+        items = data.get(field, [])
+        if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+            raise ValueError(f"'{field}' must be a list of strings")
+    support = data.get("support")
+    if not isinstance(support, list) or not support:
+        raise ValueError("'support' must be a non-empty list")
+    for item in support:
+        if not isinstance(item, dict) or not isinstance(item.get("term"), str) or not isinstance(item.get("description", ""), str):
+            raise ValueError("'support' items need string 'term' and 'description'")
+    if not any(data.get(field) for field in ("jargon", "glossary", "followup")):
+        raise ValueError("No suggestions in response")
+    return data
+
+def format_combined_response(data):
+    # Splits the parsed object into the two table cells, in the same bullet style as the two-call path.
+    suggestion = "\n\n".join(
+        "\n".join(f"- {item.strip()}" for item in data.get(field, []) if item.strip())
+        for field in ("jargon", "glossary", "followup")
+        if data.get(field)
+    )
+    support = "\n".join(
+        f"- {item['term'].strip()}: {item.get('description', '').strip()}".rstrip(": ")
+        for item in data["support"]
+    )
+    return suggestion or "—", support or "—"
+
+def get_llm_combined_response(context, ambiguous=False, hesitant=False, info=None):
+    # One structured round trip for both the suggestion and the support column.
+    # Returns (suggestion, support); falls back to the two separate calls if the reply won't parse.
+    print("🧠 Entering get_llm_combined_response()")
+    if info is None:
+        info = {}
+    info["cache_hit"] = False
+    cache_key = make_cache_key(context, "combined:" + get_prompt_variant(ambiguous, hesitant))
+    cached = response_cache.get(cache_key)
+    try:
+        if cached is not None:
+            print("♻️ LLM (Combined) cache hit")
+            info.update(cache_hit=True, provider="cache")
+            return format_combined_response(parse_combined_response(cached))
+        prompt = get_combined_prompt(context, ambiguous, hesitant)
+        result, provider = router.complete(prompt, max_tokens=400, json_mode=True)
+        parsed = parse_combined_response(result)
+        print(f"✅ {provider} (Combined) Success:\n", result)
+        info["provider"] = provider
+        response_cache.put(cache_key, result)
+        return format_combined_response(parsed)
+    except Exception as e:
+        print("⚠️ Combined LLM call failed, falling back to separate calls:", e)
+    info["fallback"] = True
+    support_prompt = get_ambiguous_or_hesitant_prompt(context, ambiguous, hesitant)
+    support_key = make_cache_key(context, get_prompt_variant(ambiguous, hesitant))
+    suggestion_info, support_info = {}, {}
+    suggestion = get_llm_suggestion(context, info=suggestion_info)
+    support = get_llm_support_response(support_prompt, cache_key=support_key, info=support_info)
+    error = suggestion_info.get("error") or support_info.get("error")
+    if error:
+        info["error"] = error
+    return suggestion, support
 
 def get_ambiguous_or_hesitant_prompt(context, ambiguous=False, hesitant=False):
     if ambiguous and hesitant:
@@ -0,0 +1,134 @@
+# load_test.py
+# How many concurrent audio streams can one server sustain? Runs rounds of N simulated
+# clients (N from --ramp), each streaming deterministic synthetic speech in real time to
+# server.py, and measures end of utterance → row latency and dropped utterances per round.
+# A round passes when nothing was dropped and p95 row latency stays under --p95-limit.
+# Usage: python src/server.py --stubs --engine AssemblyAI &   (or a real server)
+#        python src/load_test.py --url ws://127.0.0.1:8770 --ramp 1,2,4,8,16,32 --utterances 8
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmark import synthetic_audio, percentiles, SAMPLE_RATE
+
+
+async def run_client(url, audio, frame_s, timeout_s):
+    # Streams `audio` paced in real time; returns per-client stats.
+    import websockets
+
+    stats = {"rows": 0, "cells": 0, "dropped": 0, "row_latency": [], "complete_latency": [], "error": None}
+    pending = {}  # row -> (audio_end_s, cells still to come)
+    frame = int(frame_s * SAMPLE_RATE)
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    try:
+        async with websockets.connect(url, max_size=2 ** 20, open_timeout=timeout_s) as ws:
+            ready = json.loads(await asyncio.wait_for(ws.recv(), timeout_s))
+            assert ready["type"] == "ready", ready
+            started = time.perf_counter()
+
+            async def send_audio():
+                for i, offset in enumerate(range(0, len(pcm), frame)):
+                    await ws.send(pcm[offset:offset + frame].tobytes())
+                    # Real-time pacing against the wall clock, so slow sends don't accumulate drift.
+                    delay = started + (i + 1) * frame_s - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await ws.send(json.dumps({"type": "stop"}))
+
+            sender = asyncio.ensure_future(send_audio())
+            async for message in ws:
+                event = json.loads(message)
+                now = time.perf_counter() - started
+                if event["type"] == "row":
+                    stats["rows"] += 1
+                    # The utterance's last sample left the client at audio_end_s on the stream clock.
+                    stats["row_latency"].append(now - event["audio_end_s"])
+                    if event["pending"]:
+                        pending[event["row"]] = [event["audio_end_s"], len(event["pending"])]
+                    else:
+                        stats["complete_latency"].append(now - event["audio_end_s"])
+                elif event["type"] == "cell":
+                    stats["cells"] += 1
+                    entry = pending.get(event["row"])
+                    if entry:
+                        entry[1] -= 1
+                        if entry[1] == 0:
+                            stats["complete_latency"].append(now - entry[0])
+                            del pending[event["row"]]
+                elif event["type"] == "dropped":
+                    stats["dropped"] = event["chunks"]
+                elif event["type"] == "done":
+                    stats["dropped"] = event["dropped"]
+                    break
+            await sender
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+    return stats
+
+
+async def run_round(url, clients, utterances, frame_s, timeout_s):
+    # Different seeds so clients don't send identical audio in lockstep.
+    audios = [synthetic_audio(utterances, seed=i) for i in range(clients)]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_client(url, audio, frame_s, timeout_s) for audio in audios))
+    wall = time.perf_counter() - started
+    row_latency = [v for r in results for v in r["row_latency"]]
+    complete_latency = [v for r in results for v in r["complete_latency"]]
+    return {
+        "clients": clients,
+        "audio_s": round(sum(len(a) for a in audios) / SAMPLE_RATE, 1),
+        "wall_s": round(wall, 1),
+        "rows": sum(r["rows"] for r in results),
+        "dropped": sum(r["dropped"] for r in results),
+        "errors": [r["error"] for r in results if r["error"]],
+        "row": percentiles(row_latency),
+        "complete": percentiles(complete_latency),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find how many concurrent streams a server.py instance sustains")
+    parser.add_argument("--url", default="ws://127.0.0.1:8770")
+    parser.add_argument("--ramp", default="1,2,4,8,16", help="comma-separated client counts, one round each")
+    parser.add_argument("--utterances", type=int, default=8, help="utterances per client per round")
+    parser.add_argument("--frame-ms", type=float, default=100, help="audio per WebSocket message")
+    parser.add_argument("--p95-limit", type=float, default=3.0,
+                        help="max p95 end of utterance → row latency (s) for a round to pass")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", help="save all rounds as JSON")
+    args = parser.parse_args()
+
+    rounds = []
+    sustained = 0
+    print(f"{'clients':>8}{'rows':>7}{'dropped':>9}{'row p50':>9}{'row p95':>9}{'done p95':>10}  verdict")
+    for clients in [int(n) for n in args.ramp.split(",")]:
+        result = asyncio.run(run_round(args.url, clients, args.utterances, args.frame_ms / 1000, args.timeout))
+        row, complete = result["row"], result["complete"]
+        ok = (not result["errors"] and not result["dropped"] and row.get("count")
+              and row["p95_ms"] / 1000 <= args.p95_limit)
+        result["passed"] = bool(ok)
+        rounds.append(result)
+        print(f"{clients:>8}{result['rows']:>7}{result['dropped']:>9}"
+              f"{row.get('p50_ms', 0) / 1000:>8.2f}s{row.get('p95_ms', 0) / 1000:>8.2f}s"
+              f"{complete.get('p95_ms', 0) / 1000:>9.2f}s  {'✅' if ok else '❌'}"
+              + (f" {result['errors'][0]}" if result["errors"] else ""))
+        if not ok:
+            break
+        sustained = clients
+
+    print(f"\n📊 Sustained {sustained} concurrent real-time streams "
+          f"(no drops, p95 end of utterance → row ≤ {args.p95_limit:.1f}s)")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "p95_limit_s": args.p95_limit, "sustained": sustained, "rounds": rounds}, f,
+                      indent=2)
+        print(f"💾 Saved to {args.out}")
+    return 0 if sustained else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,33 @@
 # main.py
 import tkinter as tk
 from tkinter import ttk
-import threading
-import queue
-import numpy as np
-import wave
-import sounddevice as sd
-import spacy
-import os
-from collections import deque
-from faster_whisper import WhisperModel
-
-from config import OPENROUTER_KEY, GROQ_KEY, GEMINI_KEY, ASSEMBLYAI_API_KEY
-
-from llm_utils import (
-    get_llm_suggestion,
-    get_llm_support_response,
-    get_ambiguous_or_hesitant_prompt,
-)
-from text_utils import (
-    extract_clean_concepts,
-    extract_named_entities,
-    extract_difficult_definitions,
-    detect_ambiguity,
-    detect_hesitation,
-)
+
+from config import MODEL_WARMUP, TABLE_VISIBLE_ROWS, TABLE_MAX_ROWS, STATS_PANEL
+from config import HISTORY_PATH, HISTORY_BATCH_SIZE, HISTORY_FLUSH_S
 
 # === Global State ===
-from app_state import is_recording, stop_event, audio_queue, stream, row_widgets, recent_utterances, max_context_limit
+from app_state import stop_event, context_window
+import app_state
 
-from transcription import transcribe_with_whisper, transcribe_with_assemblyai
+from transcription import whisper_batcher
 
 from audio_utils import process_audio_chunk, record_audio
 
-from rowlogic import insert_row, set_context_handler
+from rowlogic import set_context_handler
+from results_table import ResultsTable
 
 from controls import list_mics, toggle_recording
 
+from models import warm_up
 
-set_context_handler(recent_utterances, max_context_limit)
+from tracing import metrics, start_metrics_server, stats_line
 
-print("✅ App is starting...")
+from history import HistoryStore
 
-# === Load Models ===
-nlp = spacy.load("en_core_web_sm")
-try:
-    whisper_model = WhisperModel("tiny", compute_type="auto")
-    print("✅ WhisperModel loaded")
-except Exception as e:
-    print("❌ Failed to load WhisperModel:", e)
-    whisper_model = None
+
+set_context_handler(context_window)
+
+print("✅ App is starting...")
 
 # === GUI ===
 root = tk.Tk()
@@ -68,7 +46,7 @@ mic_menu.pack(side=tk.LEFT, padx=10)
 tk.Label(top_frame, text="Engine:", fg="white", bg="black").pack(side=tk.LEFT, padx=(20, 5))
 engine_var = tk.StringVar(value="AssemblyAI")
 engine_menu = ttk.Combobox(top_frame, textvariable=engine_var, width=15, state="readonly")
-engine_menu["values"] = ["AssemblyAI", "Whisper"]
+engine_menu["values"] = ["AssemblyAI", "AssemblyAI (realtime)", "Whisper", "Whisper (streaming)"]
 engine_menu.pack(side=tk.LEFT)
 
 start_button = tk.Button(top_frame, text="Start", bg="blue", fg="black", width=10)
@@ -77,28 +55,28 @@ start_button.pack(side=tk.LEFT, padx=10)
 status_label = tk.Label(root, text="Idle", fg="lightgray", bg="black")
 status_label.pack()
 
+stats_label = tk.Label(root, text="", fg="gray", bg="black", font=("Arial", 9))
+if STATS_PANEL:
+    stats_label.pack()
+
 def update_theme(event=None):
     engine = engine_var.get()
-    if engine == "Whisper":
+    if engine.startswith("Whisper"):
         start_button.config(bg="green")
-    elif engine == "AssemblyAI":
+    elif engine.startswith("AssemblyAI"):
         start_button.config(bg="blue")
 
 engine_menu.bind("<<ComboboxSelected>>", update_theme)
 update_theme()
 
-canvas_frame = tk.Frame(root, bg="black")
-canvas_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+table_frame = tk.Frame(root, bg="black")
+table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-canvas = tk.Canvas(canvas_frame, bg="white")
-scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical", command=canvas.yview)
-scrollable_frame = tk.Frame(canvas, bg="white")
+# The scrollbar pages through ResultsTable's row model; only the visible rows have widgets.
+scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
+scrollable_frame = tk.Frame(table_frame, bg="white")
 
-scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-canvas.configure(yscrollcommand=scrollbar.set)
-
-canvas.pack(side="left", fill="both", expand=True)
+scrollable_frame.pack(side="left", fill="both", expand=True)
 scrollbar.pack(side="right", fill="y")
 
 header = tk.Frame(scrollable_frame, bg="white")
@@ -112,6 +90,17 @@ for i, text in enumerate(header_columns):
     ).grid(row=0, column=i, sticky="nsew")
 header.columnconfigure(tuple(range(5)), weight=1)
 
+table = ResultsTable(scrollable_frame, scrollbar, visible_rows=TABLE_VISIBLE_ROWS, max_rows=TABLE_MAX_ROWS)
+app_state.results_table = table
+
+# Rows older than TABLE_MAX_ROWS leave the table but stay searchable in the history.
+if HISTORY_PATH:
+    try:
+        app_state.history = HistoryStore(HISTORY_PATH, batch_size=HISTORY_BATCH_SIZE, flush_interval_s=HISTORY_FLUSH_S)
+        print(f"🗂️ Saving session {app_state.history.session_id} to {HISTORY_PATH}")
+    except Exception as e:
+        print("⚠️ Session history disabled:", e)
+
 
 is_recording_state = [False]  # using list as a mutable bool container
 
@@ -123,12 +112,8 @@ start_button.config(command=lambda: toggle_recording(
     engine_menu,
     status_label,
     stop_event,
-    audio_queue,
     engine_var,
-    scrollable_frame,
-    header,
-    row_widgets,
-    canvas,
+    table,
     root,
     record_audio,
     process_audio_chunk
@@ -136,4 +121,39 @@ start_button.config(command=lambda: toggle_recording(
 
 list_mics(mic_menu, mic_var)
 
+# === Load Models ===
+# Models load lazily on first use; warming them up here overlaps loading with the window coming up.
+def show_model_status(message):
+    print("🧠", message)
+    if not is_recording_state[0]:
+        root.after(0, lambda: status_label.config(text=message))
+
+# === Metrics ===
+def pipeline_stat(key):
+    # Gauges read the current recording's pipeline; nothing is exported while idle.
+    return app_state.pipeline.stats()[key] if app_state.pipeline else None
+
+for key in ("queue_depth", "in_flight", "dropped"):
+    metrics.gauge(f"speech_pipeline_{key}", lambda key=key: pipeline_stat(key))
+for key in ("queued", "mean_batch"):
+    metrics.gauge(f"whisper_batch_{key}", lambda key=key: whisper_batcher.stats()[key])
+for key in ("total_tokens", "summary_tokens", "tokens_saved"):
+    metrics.gauge(f"llm_context_{key}", lambda key=key: context_window.stats()[key])
+start_metrics_server()
+
+def refresh_stats():
+    context = context_window.stats()
+    stats_label.config(text=f"{stats_line()} · context {context['total_tokens']}/{context['budget_tokens']} tok")
+    root.after(1000, refresh_stats)
+
+if STATS_PANEL:
+    refresh_stats()
+
+if MODEL_WARMUP:
+    root.after(100, lambda: warm_up(show_model_status))
+
 root.mainloop()
+
+app_state.shutdown_event.set()  # abandon in-flight AssemblyAI polls
+if app_state.history is not None:
+    app_state.history.close()  # writes whatever is still queued
@@ -0,0 +1,94 @@
+# models.py
+# Load-once registry for the heavy models. Nothing is loaded at import time; the first
+# get_*() call (or warm_up()) loads the model, and every module shares that instance.
+import threading
+import time
+
+from config import SPACY_MODEL, SPACY_COMPONENTS, WHISPER_MODEL, WHISPER_COMPUTE_TYPE, WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS
+
+
+def _load_spacy():
+    import spacy
+    nlp = spacy.load(SPACY_MODEL)
+    # Concepts/entities only need tagging, lemmas, noun_chunks and NER; anything else
+    # the configured model ships (senter, textcat, ...) stays switched off.
+    unused = [name for name in nlp.pipe_names if name not in SPACY_COMPONENTS]
+    if unused:
+        nlp.select_pipes(disable=unused)
+    return nlp
+
+
+def _load_whisper():
+    from faster_whisper import WhisperModel
+    return WhisperModel(WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=WHISPER_CPU_THREADS,
+                        num_workers=WHISPER_NUM_WORKERS)
+
+
+def _load_whisper_batched():
+    # Batched decoding over the shared model; no second copy of the weights. Needs faster-whisper
+    # >= 1.2: 1.1 reads clip_timestamps as sample indices rather than seconds.
+    import faster_whisper
+    from faster_whisper import BatchedInferencePipeline
+    if tuple(int(part) for part in faster_whisper.__version__.split(".")[:2]) < (1, 2):
+        raise RuntimeError(f"batched transcription needs faster-whisper >= 1.2, found {faster_whisper.__version__}")
+    return BatchedInferencePipeline(model=get_model("whisper"))
+
+
+_loaders = {"spacy": _load_spacy, "whisper": _load_whisper, "whisper_batched": _load_whisper_batched}
+_locks = {name: threading.Lock() for name in _loaders}
+_models = {}
+_failures = {}
+load_times = {}  # model name -> seconds spent loading
+
+
+def get_model(name):
+    model = _models.get(name)
+    if model is not None:
+        return model
+    # Per-model locks: a slow Whisper load doesn't hold up spaCy.
+    with _locks[name]:
+        if name in _models:
+            return _models[name]
+        if name in _failures:
+            raise RuntimeError(f"{name} failed to load earlier: {_failures[name]}")
+        start = time.perf_counter()
+        try:
+            model = _loaders[name]()
+        except Exception as e:
+            _failures[name] = e
+            print(f"❌ Failed to load {name}:", e)
+            raise
+        load_times[name] = time.perf_counter() - start
+        _models[name] = model
+        print(f"✅ {name} loaded in {load_times[name]:.2f}s")
+        return model
+
+
+def get_nlp():
+    return get_model("spacy")
+
+
+def get_whisper_model():
+    return get_model("whisper")
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def warm_up(on_status=print, names=("spacy", "whisper")):
+    # Loads models on a background thread; on_status gets human-readable progress.
+    def run():
+        for name in names:
+            on_status(f"Loading {name} model...")
+            try:
+                get_model(name)
+            except Exception:
+                on_status(f"❌ {name} model failed to load")
+                return
+        timings = ", ".join(f"{name} {load_times[name]:.1f}s" for name in names)
+        on_status(f"Idle · models ready ({timings})")
+
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,23 @@
+# nlp_stage.py
+# One spaCy parse per transcript feeds both extractors, and transcripts that are waiting
+# at the same time go through nlp.pipe together.
+from models import get_nlp
+from pipeline import MicroBatcher
+from text_utils import extract_clean_concepts, extract_named_entities
+from config import NLP_BATCH_SIZE, NLP_BATCH_WAIT_MS
+
+
+def analyze_texts(texts):
+    # Returns [(concepts, entities), ...] in the same order as texts.
+    return [
+        (extract_clean_concepts(doc), extract_named_entities(doc))
+        for doc in get_nlp().pipe(texts, batch_size=NLP_BATCH_SIZE)
+    ]
+
+
+nlp_batcher = MicroBatcher(analyze_texts, max_batch=NLP_BATCH_SIZE,
+                           max_wait_s=NLP_BATCH_WAIT_MS / 1000, name="nlp")
+
+
+def analyze_text(text):
+    return nlp_batcher(text)
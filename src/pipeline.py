@@ -0,0 +1,200 @@
+# pipeline.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+_DROPPED = object()
+
+
+class ChunkPipeline:
+    """Fixed pool of workers behind a bounded queue that delivers results in submit order.
+
+    policy="drop_oldest" discards the stalest waiting chunk when the queue is full (keeps
+    the table close to real time) and hands it to on_drop, if given; policy="block" makes
+    submit() wait for a free slot.
+    """
+
+    def __init__(self, work, deliver, workers=2, max_queue=4, policy="drop_oldest", name="pipeline", on_drop=None):
+        if policy not in ("drop_oldest", "block"):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.work = work
+        self.deliver = deliver
+        self.on_drop = on_drop
+        self.max_queue = max_queue
+        self.policy = policy
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._deliver_lock = threading.Lock()
+        self._results = {}
+        self._next_seq = 0
+        self._next_delivery = 0
+        self._closed = False
+        self.in_flight = 0
+        self.completed = 0
+        self.dropped = 0
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, item):
+        dropped = _DROPPED
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Pipeline is closed")
+            if self.policy == "block":
+                self._cond.wait_for(lambda: len(self._queue) < self.max_queue or self._closed)
+                if self._closed:
+                    raise RuntimeError("Pipeline is closed")
+            elif len(self._queue) >= self.max_queue:
+                dropped_seq, dropped = self._queue.popleft()
+                self._results[dropped_seq] = _DROPPED
+                self.dropped += 1
+            seq = self._next_seq
+            self._next_seq += 1
+            self._queue.append((seq, item))
+            self._cond.notify_all()
+        if dropped is not _DROPPED and self.on_drop is not None:
+            try:
+                self.on_drop(dropped)
+            except Exception as e:
+                print("❌ Pipeline drop handler failed:", e)
+        self._flush()
+        return seq
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "in_flight": self.in_flight,
+                "submitted": self._next_seq,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "awaiting_delivery": len(self._results),
+            }
+
+    def close(self, wait=False):
+        # Stop accepting work; already queued chunks still run and get delivered.
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                seq, item = self._queue.popleft()
+                self.in_flight += 1
+                self._cond.notify_all()
+            try:
+                result = self.work(item)
+            except Exception as e:
+                print("❌ Pipeline worker failed:", e)
+                result = None
+            with self._cond:
+                self.in_flight -= 1
+                self.completed += 1
+                self._results[seq] = result
+            self._flush()
+
+    def _flush(self):
+        # Only one thread delivers at a time, and only the next sequence number in line.
+        with self._deliver_lock:
+            while True:
+                with self._cond:
+                    if self._next_delivery not in self._results:
+                        return
+                    result = self._results.pop(self._next_delivery)
+                    self._next_delivery += 1
+                if result is not _DROPPED and result is not None:
+                    try:
+                        self.deliver(result)
+                    except Exception as e:
+                        print("❌ Pipeline delivery failed:", e)
+
+
+class MicroBatcher:
+    """Runs single-item requests through a batch function on background threads.
+
+    The first waiting item opens a batch; more items are collected until max_batch or
+    until max_wait_s has passed (0 means "whatever is already queued"), then
+    process_batch(items) runs once and each caller's Future gets its own result.
+    With workers > 1, up to that many batches run at the same time.
+    """
+
+    def __init__(self, process_batch, max_batch=8, max_wait_s=0.0, name="batcher", workers=1):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self.name = name
+        self.workers = max(1, workers)
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        future = Future()
+        with self._cond:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._queue.append((item, future))
+            self._cond.notify_all()
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch": self.items / self.batches if self.batches else 0.0,
+            }
+
+    def _take_batch(self):
+        with self._cond:
+            while True:
+                self._cond.wait_for(lambda: self._queue)
+                deadline = time.monotonic() + self.max_wait_s
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        break
+                # Another worker may have taken everything while this one waited.
+                count = min(len(self._queue), self.max_batch)
+                if count:
+                    return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.process_batch(items))
+                if len(results) != len(items):
+                    # zip() would leave the unmatched callers waiting forever.
+                    raise RuntimeError(f"{self.name}: {len(results)} results for a batch of {len(items)}")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._cond:
+                self.batches += 1
+                self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,144 @@
+# results_table.py
+import tkinter as tk
+from collections import deque
+
+COLUMNS = 5
+
+
+class RowRecord:
+    # One table row as plain data; widgets only exist for the rows currently on screen.
+    __slots__ = ("values", "color")
+
+    def __init__(self, values, color):
+        self.values = list(values)
+        self.color = color
+
+
+class ResultsTable:
+    """Virtualized results table: a fixed pool of row widgets over a bounded row model.
+
+    Rows live newest-first in a deque capped at max_rows, so inserting is O(1) and memory
+    stays bounded. Only visible_rows rows of labels are ever created; scrolling (scrollbar
+    or mouse wheel) moves a row offset and re-fills the same widgets. While the view is at
+    the top, new rows appear there; when scrolled down, the view stays on the rows shown.
+    """
+
+    def __init__(self, parent, scrollbar, visible_rows=10, max_rows=2000):
+        self.parent = parent
+        self.scrollbar = scrollbar
+        self.visible_rows = visible_rows
+        self.rows = deque(maxlen=max_rows)
+        self.offset = 0
+        self._shown = {}  # RowRecord -> pool slot index currently displaying it
+
+        self._live_frame = tk.Frame(parent, bg="black")
+        self._live_label = tk.Label(
+            self._live_frame,
+            font=("Arial", 11, "italic"),
+            fg="lightgray",
+            bg="black",
+            wraplength=1500,
+            justify="left",
+            anchor="w",
+            padx=5,
+            pady=5,
+        )
+        self._live_label.pack(fill="x")
+        self._body = tk.Frame(parent, bg="white")
+        self._body.pack(fill="both", expand=True)
+        self._pool = [self._make_row() for _ in range(visible_rows)]
+        self._packed = [False] * visible_rows
+
+        scrollbar.config(command=self.yview)
+        for widget in [parent, self._body] + [w for row, cells in self._pool for w in [row, *cells]]:
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+            widget.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        self._update_scrollbar()
+
+    def _make_row(self):
+        row = tk.Frame(self._body, bg="white")
+        cells = []
+        for i in range(COLUMNS):
+            lbl = tk.Label(
+                row,
+                font=("Arial", 11),
+                fg="white",
+                wraplength=300,
+                justify="left",
+                anchor="w",
+                width=35,
+                padx=5,
+                pady=5,
+                relief="solid",
+                borderwidth=1
+            )
+            lbl.grid(row=0, column=i, sticky="nsew")
+            row.columnconfigure(i, weight=1)
+            cells.append(lbl)
+        return row, cells
+
+    def after(self, ms, fn, *args):
+        return self.parent.after(ms, fn, *args)
+
+    def insert(self, values, color):
+        record = RowRecord(values, color)
+        self.rows.appendleft(record)
+        if self.offset:
+            # Scrolled down: keep showing the same rows instead of jumping.
+            self.offset = min(self.offset + 1, len(self.rows) - 1)
+        self.render()
+        return record
+
+    def set_cell(self, record, column, value):
+        record.values[column] = value
+        slot = self._shown.get(record)
+        if slot is not None:
+            self._pool[slot][1][column].config(text=value)
+
+    def set_live(self, text):
+        was_shown = bool(self._live_label.cget("text"))
+        self._live_label.config(text=text)
+        if text and not was_shown:
+            self._live_frame.pack(fill="x", before=self._body)
+        elif not text and was_shown:
+            self._live_frame.pack_forget()
+
+    def render(self):
+        self._shown = {}
+        for slot, (row, cells) in enumerate(self._pool):
+            index = self.offset + slot
+            if index < len(self.rows):
+                record = self.rows[index]
+                self._shown[record] = slot
+                row.config(bg=record.color)
+                for lbl, value in zip(cells, record.values):
+                    lbl.config(text=value, bg=record.color)
+                if not self._packed[slot]:
+                    row.pack(fill="x", anchor="w", pady=2)
+                    self._packed[slot] = True
+            elif self._packed[slot]:
+                row.pack_forget()
+                self._packed[slot] = False
+        self._update_scrollbar()
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units" | "pages").
+        if not self.rows:
+            return
+        if args[0] == "moveto":
+            offset = int(float(args[1]) * len(self.rows))
+        else:
+            step = int(args[1]) * (self.visible_rows if args[2] == "pages" else 1)
+            offset = self.offset + step
+        offset = max(0, min(offset, len(self.rows) - 1))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def _on_wheel(self, event):
+        self.yview("scroll", -1 if event.delta > 0 else 1, "units")
+
+    def _update_scrollbar(self):
+        total = max(len(self.rows), 1)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
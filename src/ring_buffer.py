@@ -0,0 +1,82 @@
+# ring_buffer.py
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated mono sample buffer that the sounddevice callback writes into directly.
+
+    Positions are absolute sample counts since the stream opened, so consumers can
+    address windows without caring where the write head has wrapped to.
+    """
+
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(self.capacity, dtype=self.dtype)
+        self._ready = threading.Condition(threading.Lock())
+        self.write_pos = 0  # total samples ever written
+        self.read_pos = 0   # first sample not yet consumed
+        self.overruns = 0   # samples overwritten before anyone consumed them
+
+    def __len__(self):
+        return self.write_pos - self.read_pos
+
+    def write(self, block):
+        samples = np.asarray(block).reshape(-1)
+        n = len(samples)
+        with self._ready:
+            if n >= self.capacity:
+                self.write_pos += n - self.capacity
+                samples = samples[n - self.capacity:]
+                n = self.capacity
+            start = self.write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self.write_pos += n
+            lost = self.write_pos - self.read_pos - self.capacity
+            if lost > 0:
+                self.overruns += lost
+                self.read_pos += lost
+            self._ready.notify_all()
+
+    def wait_for(self, n, timeout=None):
+        with self._ready:
+            return self._ready.wait_for(lambda: self.write_pos - self.read_pos >= n, timeout)
+
+    def wait_until(self, pos, timeout=None):
+        with self._ready:
+            return self._ready.wait_for(lambda: self.write_pos >= pos, timeout)
+
+    def views(self, start, n):
+        # Zero-copy window [start, start + n) as one or two slices of the backing array.
+        # The slices alias live memory: copy them before the writer can lap them.
+        with self._ready:
+            if start < self.write_pos - self.capacity or start + n > self.write_pos:
+                raise ValueError(f"Window [{start}, {start + n}) is not in the buffer")
+        offset = start % self.capacity
+        first = min(n, self.capacity - offset)
+        if first == n:
+            return (self._data[offset:offset + n],)
+        return (self._data[offset:], self._data[:n - first])
+
+    def read(self, start, n):
+        # Owned float32 copy of a window, safe to hand to another thread.
+        out = np.empty(n, dtype=np.float32)
+        filled = 0
+        for part in self.views(start, n):
+            out[filled:filled + len(part)] = part
+            filled += len(part)
+        if self.dtype == np.int16:
+            out /= 32768.0
+        return out
+
+    def consume(self, n):
+        chunk = self.read(self.read_pos, n)
+        self.advance(self.read_pos + n)
+        return chunk
+
+    def advance(self, pos):
+        with self._ready:
+            self.read_pos = max(self.read_pos, min(pos, self.write_pos))
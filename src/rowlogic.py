@@ -1,90 +1,185 @@
 # rowlogic.py
-import tkinter as tk
-from collections import deque
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from text_utils import (
-    extract_difficult_definitions,
-    detect_ambiguity,
-    detect_hesitation,
-)
+from text_utils import extract_difficult_definitions
+from detection import engine as detection_engine
 from llm_utils import (
     get_llm_suggestion,
     get_llm_support_response,
     get_ambiguous_or_hesitant_prompt,
+    get_prompt_variant,
+    get_llm_combined_response,
 )
+from llm_cache import make_cache_key
+from tracing import maybe_span
+import app_state
+from config import ENRICHMENT_WORKERS, CELL_FLUSH_MS, LLM_COMBINED_MODE
 
 # This variable will be injected from main.py
-recent_utterances = None
-max_context_limit = None
-
-def set_context_handler(_recent_utterances, _max_context_limit):
-    global recent_utterances, max_context_limit
-    recent_utterances = _recent_utterances
-    max_context_limit = _max_context_limit
-
-def update_recent_utterances(new_utterance):
-    global recent_utterances
-    if recent_utterances.maxlen < max_context_limit:
-        items = list(recent_utterances)
-        recent_utterances = deque(items, maxlen=recent_utterances.maxlen + 1)
-    recent_utterances.append(new_utterance)
-
-def insert_row(text, concepts, entities, engine_name, scrollable_frame, header, row_widgets, canvas):
+context_window = None
+
+PENDING = "⏳"
+# Cell (and history field) → table column for the cells filled in the background.
+CELL_COLUMNS = {"definitions": 2, "suggestion": 3, "support": 4}
+HISTORY_FIELDS = {column: field for field, column in CELL_COLUMNS.items()}
+
+# Slow enrichment (dictionary + LLM calls) runs here; finished cells come back through
+# _cell_updates and are applied in batches by a Tk-side flush loop.
+_enrichment_pool = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS, thread_name_prefix="enrich")
+_cell_updates = queue.Queue()
+# Streaming text is coalesced per cell, so a cell repaints at most once per flush.
+_partial_updates = {}
+_partial_lock = threading.Lock()
+_flush_loop_started = False
+
+def set_context_handler(_context_window):
+    global context_window
+    context_window = _context_window
+
+def _post_partial(record, column, text):
+    with _partial_lock:
+        _partial_updates[(record, column)] = text + " ▌"
+
+def _flush_cell_updates(table):
+    with _partial_lock:
+        partials = list(_partial_updates.items())
+        _partial_updates.clear()
+    for (record, column), value in partials:
+        table.set_cell(record, column, value)
     try:
-        row_color = "green" if engine_name == "Whisper" else "blue"
-        row = tk.Frame(scrollable_frame, bg=row_color)
-        update_recent_utterances(text)
+        while True:
+            record, column, value = _cell_updates.get_nowait()
+            table.set_cell(record, column, value)
+    except queue.Empty:
+        pass
+    table.after(CELL_FLUSH_MS, _flush_cell_updates, table)
 
-        llm_response = "—"
-        if len(recent_utterances) >= 2:
-            context = " ".join(recent_utterances)
-            ambiguous = detect_ambiguity(context)
-            hesitant = detect_hesitation(context)
+def _ensure_flush_loop(table):
+    global _flush_loop_started
+    if not _flush_loop_started:
+        _flush_loop_started = True
+        table.after(CELL_FLUSH_MS, _flush_cell_updates, table)
 
-            if ambiguous or hesitant:
-                prompt = get_ambiguous_or_hesitant_prompt(context, ambiguous, hesitant)
-                llm_response = get_llm_support_response(prompt)
+def _fill_cells_async(record, columns, fn, *args, fallback="—", stream=False, trace=None, span=None, with_info=False,
+                      history_key=None):
+    # fn returns one value per column (a bare value when there is a single column).
+    # With stream=True, fn also gets on_partial= for progressive updates of the single column.
+    # Cells are addressed by row record, so updates land even if the row has scrolled off screen.
+    # With a history_key, the final values are also saved to the session history.
+    # With a trace, the call is timed as `span`; with_info=True passes info= to fn and copies
+    # what it reports (provider, cache_hit, ...) onto the span. A reply reported as partial
+    # (a stream that broke off) is shown and saved marked as incomplete.
+    info = {}
 
-            llm_suggestion = get_llm_suggestion(context)
-        else:
-            llm_suggestion = "—"
+    def run():
+        if with_info:
+            kwargs["info"] = info
+        with maybe_span(trace, span or fn.__name__) as attrs:
+            result = fn(*args, **kwargs)
+            attrs.update(info)
+        return result
 
+    def done(future):
         try:
-            defs = extract_difficult_definitions(text)
+            values = future.result()
+            if len(columns) == 1:
+                values = (values,)
         except Exception as e:
-            print("❌ Error in extract_difficult_definitions:", e)
-            defs = "❌ Error extracting definitions"
-
-        all_values = [text or "—", concepts or "—", defs or "❌ Error", llm_suggestion or "—", llm_response or "—"]
-
-        for i, val in enumerate(all_values):
-            lbl = tk.Label(
-                row,
-                text=str(val),
-                font=("Arial", 11),
-                fg="white",
-                bg=row_color,
-                wraplength=300,
-                justify="left",
-                anchor="w",
-                width=35,
-                padx=5,
-                pady=5,
-                relief="solid",
-                borderwidth=1
-            )
-            lbl.grid(row=0, column=i, sticky="nsew")
-
-        for i in range(5):
-            row.columnconfigure(i, weight=1)
-
-        row_widgets.insert(0, row)
-        for widget in scrollable_frame.winfo_children():
-            if widget != header:
-                widget.pack_forget()
-        for r in row_widgets:
-            r.pack(fill="x", anchor="w", pady=2)
-        canvas.yview_moveto(0)
+            print(f"❌ Enrichment for {fn.__name__} failed:", e)
+            values = (fallback,) * len(columns)
+        if info.get("partial"):
+            values = tuple(f"{value} … (incomplete)" if value else value for value in values)
+        with _partial_lock:
+            for column in columns:
+                _partial_updates.pop((record, column), None)
+        for column, value in zip(columns, values):
+            _cell_updates.put((record, column, str(value or fallback)))
+        if history_key is not None:
+            fields = {HISTORY_FIELDS[column]: str(value or fallback) for column, value in zip(columns, values)}
+            app_state.history.update(history_key, **fields)
+        if trace is not None:
+            trace.release()
+    kwargs = {"on_partial": lambda text: _post_partial(record, columns[0], text)} if stream else {}
+    if trace is not None:
+        trace.hold()
+    _enrichment_pool.submit(run).add_done_callback(done)
+
+def update_live_row(committed, provisional, table):
+    # committed words are final but their utterance isn't finished yet; provisional words
+    # may still be revised by the next pass. Both empty hides the row.
+    try:
+        table.set_live(" ".join(part for part in (committed, provisional and f"{provisional} …") if part))
+    except Exception as e:
+        print("❌ Error in update_live_row:", e)
+
+def get_support_for_context(context, ambiguous, hesitant, on_partial=None, info=None):
+    prompt = get_ambiguous_or_hesitant_prompt(context, ambiguous, hesitant)
+    cache_key = make_cache_key(context, get_prompt_variant(ambiguous, hesitant))
+    return get_llm_support_response(prompt, cache_key=cache_key, info=info, on_partial=on_partial)
+
+def plan_row(text, window, definitions=True, llm=True):
+    # Decides which cells an utterance's row gets; the GUI table, batch mode, the benchmark
+    # and the server all go through here so their rows can't disagree.
+    # Adds text to the context window and returns (context, ambiguous, hesitant, cells).
+    # Each cell is (fields, span, fn, args, is_llm): fn(*args) returns one value per field
+    # ("definitions", "suggestion", "support"), a bare value for a single field. LLM cells
+    # also accept info= and, when they fill a single field, on_partial= for streaming.
+    # The LLM context is token-budgeted: recent utterances verbatim, older ones summarized,
+    # and earlier utterances' detection results come from the engine's per-utterance cache.
+    window.add(text)
+    context = None
+    ambiguous = hesitant = False
+    if window.seen >= 2:
+        context = window.render()
+        ambiguous, hesitant, _ = detection_engine.detect(window.utterances)
+
+    cells = []
+    if definitions:
+        cells.append((["definitions"], "definitions", extract_difficult_definitions, (text,), False))
+    if llm:
+        if (ambiguous or hesitant) and LLM_COMBINED_MODE:
+            # One structured call fills both LLM columns.
+            cells.append((["suggestion", "support"], "llm.combined", get_llm_combined_response,
+                          (context, ambiguous, hesitant), True))
+        else:
+            if context:
+                cells.append((["suggestion"], "llm.suggestion", get_llm_suggestion, (context,), True))
+            if ambiguous or hesitant:
+                cells.append((["support"], "llm.support", get_support_for_context,
+                              (context, ambiguous, hesitant), True))
+    return context, ambiguous, hesitant, cells
+
+def insert_row(text, concepts, entities, engine_name, table, trace=None):
+    # trace (optional) follows the chunk through the cells below and finishes with the last one.
+    try:
+        row_color = "green" if engine_name.startswith("Whisper") else "blue"
+        _ensure_flush_loop(table)
+
+        # Deciding the cells is cheap, so the row knows up front which cells to wait for.
+        context, ambiguous, hesitant, cells = plan_row(text, context_window)
+        pending = {field for fields, _, _, _, _ in cells for field in fields}
+        all_values = [text or "—", concepts or "—"] + [PENDING if field in pending else "—" for field in CELL_COLUMNS]
+        record = table.insert([str(val) for val in all_values], row_color)
+        history_key = None
+        if app_state.history is not None:
+            # The table only keeps the newest rows; the history keeps all of them.
+            history_key = app_state.history.add(text, concepts=concepts, entities=entities, engine=engine_name,
+                                                ambiguous=ambiguous, hesitant=hesitant)
+        if trace is not None and trace.delivered_at is not None:
+            trace.add_span("render", trace.delivered_at, trace.now())
+
+        # Each cell fills in on its own as soon as its call returns.
+        for fields, span, fn, args, is_llm in cells:
+            fallback = "—" if is_llm else "❌ Error extracting definitions"
+            _fill_cells_async(record, [CELL_COLUMNS[field] for field in fields], fn, *args, fallback=fallback,
+                              stream=is_llm and len(fields) == 1, trace=trace, span=span, with_info=is_llm,
+                              history_key=history_key)
 
     except Exception as e:
         print("❌ Error in insert_row:", e)
+    finally:
+        if trace is not None:
+            # The pipeline's reference; the trace ends when the last cell above is filled.
+            trace.release()
@@ -0,0 +1,326 @@
+# server.py
+# Server mode: many clients stream microphone audio over WebSocket to one box, which runs
+# the same segmentation → transcription → NLP → definitions/LLM path as the desktop app and
+# streams the rows back as JSON. Whisper and spaCy are loaded once and shared by all sessions.
+# Usage: python src/server.py [--host 0.0.0.0] [--port 8770] [--engine Whisper] [--no-nlp]
+#
+# Protocol, one WebSocket per audio stream (ws://host:port/?format=s16le|f32le):
+#   client → server  binary frames: 16 kHz mono PCM, little-endian int16 (or float32 with format=f32le)
+#                    {"type": "stop"}: finish the last utterance and its cells, then close
+#   server → client  {"type": "ready", "session": id, "sample_rate": 16000, "engine": ...}
+#                    {"type": "row", "row": n, "text", "concepts", "entities", "ambiguous", "hesitant",
+#                     "audio_start_s", "audio_end_s", "pending": [columns still coming]}
+#                    {"type": "cell", "row": n, "column": "definitions" | "suggestion" | "support", "value"}
+#                    {"type": "dropped", "chunks": total}: audio arrived faster than it could be transcribed
+#                    {"type": "done", "rows": n, "dropped": total}
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+ENGINES = ("Whisper", "AssemblyAI")
+
+
+def transcribe_and_analyze(audio, engine, cancel_event, with_nlp, trace):
+    # Runs on the shared inference pool; returns (text, concepts, entities) or None.
+    from transcription import transcribe_with_whisper, transcribe_with_assemblyai
+    from tracing import maybe_span
+
+    with maybe_span(trace, "transcription", engine=engine, audio_s=round(len(audio) / SAMPLE_RATE, 2)):
+        if engine == "Whisper":
+            text = transcribe_with_whisper(audio)
+        else:
+            text = transcribe_with_assemblyai(audio, cancel_event=cancel_event)
+    if not text:
+        return None
+    concepts = entities = ""
+    if with_nlp:
+        from nlp_stage import analyze_text
+        with maybe_span(trace, "nlp"):
+            concepts, entities = analyze_text(text)
+    return text, concepts, entities
+
+
+class Session:
+    """One client stream: its own ring buffer, VAD, context window and chunk queue.
+
+    Audio is segmented on the event loop as it arrives (VAD is a few numpy ops per block).
+    Utterances wait in a bounded queue for the shared inference pool and are transcribed
+    one at a time, so rows go out in speech order. When a client sends faster than its
+    utterances can be transcribed, the oldest waiting utterance is dropped and the client is
+    told, instead of the backlog (and its latency) growing without bound. Sends await the
+    socket, so a client that stops reading only stalls its own session.
+    """
+
+    def __init__(self, server, ws, sample_format):
+        from config import CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, CONTEXT_MAX_UTTERANCES, VAD_MAX_UTTERANCE_S
+        from context_window import ContextWindow
+        from ring_buffer import RingBuffer
+        from vad import VoiceActivitySegmenter
+
+        self.server = server
+        self.ws = ws
+        self.id = uuid.uuid4().hex[:8]
+        self.dtype = np.dtype("<f4") if sample_format == "f32le" else np.dtype("<i2")
+        # Float32 whatever the wire format: feed() converts, so VAD and models see one scale.
+        self.ring = RingBuffer(int(4 * VAD_MAX_UTTERANCE_S * SAMPLE_RATE), dtype=np.float32)
+        self.segmenter = VoiceActivitySegmenter()
+        self.scan = 0
+        self.window = ContextWindow(CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_TOKENS, CONTEXT_MAX_UTTERANCES)
+        self.chunks = asyncio.Queue(maxsize=server.session_queue)
+        self.cancel = threading.Event()
+        self.rows = 0
+        self.dropped = 0
+        self.cells = set()
+        self._send_lock = asyncio.Lock()
+        self._leftover = b""
+
+    async def send(self, message):
+        async with self._send_lock:
+            await self.ws.send(json.dumps(message, ensure_ascii=False))
+
+    def feed(self, data):
+        from transcription import as_float32_mono
+        from vad import FRAME_SAMPLES
+
+        # Frames may split a sample; keep the odd bytes for the next message.
+        data = self._leftover + data
+        usable = len(data) // self.dtype.itemsize * self.dtype.itemsize
+        self._leftover = data[usable:]
+        self.ring.write(as_float32_mono(np.frombuffer(data[:usable], dtype=self.dtype)))
+        end = self.scan + (self.ring.write_pos - self.scan) // FRAME_SAMPLES * FRAME_SAMPLES
+        if end > self.scan:
+            for start, stop in self.segmenter.feed(self.ring.read(self.scan, end - self.scan), self.scan):
+                self._enqueue(start, stop)
+            self.scan = end
+            self.ring.advance(self.segmenter.keep_from())
+
+    def flush(self):
+        for start, stop in self.segmenter.flush():
+            self._enqueue(start, stop)
+
+    def _enqueue(self, start, stop):
+        from tracing import new_trace, metrics
+
+        item = (start, stop, self.ring.read(start, stop - start),
+                new_trace(engine=self.server.engine, session=self.id, audio_s=round((stop - start) / SAMPLE_RATE, 2)))
+        if self.chunks.full():
+            _, _, _, old_trace = self.chunks.get_nowait()
+            old_trace.release(status="dropped")
+            self.dropped += 1
+            metrics.inc("server_chunks_dropped_total")
+            asyncio.ensure_future(self.send({"type": "dropped", "chunks": self.dropped}))
+        self.chunks.put_nowait(item)
+
+    async def transcribe_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.chunks.get()
+            if item is None:
+                return
+            start, stop, audio, trace = item
+            trace.add_span("queue", trace.start, trace.now())
+            try:
+                result = await loop.run_in_executor(
+                    self.server.inference_pool, transcribe_and_analyze,
+                    audio, self.server.engine, self.cancel, self.server.with_nlp, trace,
+                )
+            except Exception as e:
+                print(f"❌ [{self.id}] transcription failed:", e)
+                result = None
+            if result is None:
+                trace.release(status="empty")
+                continue
+            try:
+                await self.emit_row(*result, start, stop, trace)
+            finally:
+                trace.release()
+
+    async def emit_row(self, text, concepts, entities, start, stop, trace):
+        # rowlogic.plan_row decides the cells, as for the GUI table; each is sent when its call returns.
+        from rowlogic import plan_row
+
+        _, ambiguous, hesitant, cells = plan_row(text, self.window)
+        row = self.rows
+        self.rows += 1
+
+        await self.send({
+            "type": "row",
+            "row": row,
+            "text": text,
+            "concepts": concepts,
+            "entities": entities,
+            "ambiguous": ambiguous,
+            "hesitant": hesitant,
+            "audio_start_s": round(start / SAMPLE_RATE, 3),
+            "audio_end_s": round(stop / SAMPLE_RATE, 3),
+            "pending": [column for columns, _, _, _, _ in cells for column in columns],
+        })
+        for columns, span, fn, args, _ in cells:
+            trace.hold()
+            task = asyncio.ensure_future(self.fill_cells(row, columns, span, fn, args, trace))
+            self.cells.add(task)
+            task.add_done_callback(self.cells.discard)
+
+    async def fill_cells(self, row, columns, span, fn, args, trace):
+        from tracing import maybe_span
+
+        def run():
+            with maybe_span(trace, span):
+                return fn(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            values = await loop.run_in_executor(self.server.enrichment_pool, run)
+        except Exception as e:
+            print(f"❌ [{self.id}] {span} failed:", e)
+            values = None
+        finally:
+            trace.release()
+        if len(columns) == 1:
+            values = (values,)
+        elif values is None:
+            values = (None,) * len(columns)
+        for column, value in zip(columns, values):
+            await self.send({"type": "cell", "row": row, "column": column, "value": value or "—"})
+
+    def close(self):
+        # Connection gone: stop AssemblyAI polling and forget about unsent cells.
+        self.cancel.set()
+        for task in list(self.cells):
+            task.cancel()
+
+
+class SpeechServer:
+    def __init__(self, engine="Whisper", with_nlp=True, inference_workers=0, enrichment_workers=16,
+                 session_queue=4, max_sessions=64):
+        from config import WHISPER_NUM_WORKERS, WHISPER_BATCH_SIZE
+
+        self.engine = engine
+        self.with_nlp = with_nlp
+        self.session_queue = session_queue
+        self.max_sessions = max_sessions
+        # Shared by every session. Whisper is CPU-bound: as many concurrent calls as the model
+        # has workers, or as many as fill one batch per model worker when batching is on (the
+        # calls then mostly wait on the batcher). AssemblyAI calls mostly wait on the network, like dictionary/LLM calls.
+        if not inference_workers:
+            if engine == "Whisper":
+                inference_workers = WHISPER_NUM_WORKERS * max(1, WHISPER_BATCH_SIZE)
+            else:
+                inference_workers = enrichment_workers
+        self.inference_workers = inference_workers
+        self.inference_pool = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="inference")
+        self.enrichment_pool = ThreadPoolExecutor(max_workers=enrichment_workers, thread_name_prefix="server-enrich")
+        self.sessions = {}
+
+    def load_models(self):
+        # Everything a row needs is loaded up front: a first-use import or data load inside a
+        # coroutine would stall every session's event loop, not just the first row.
+        from models import get_model
+        from wordfreq import word_frequency
+        import text_utils, llm_utils, rowlogic, transcription  # noqa: F401
+        if self.with_nlp:
+            import nlp_stage  # noqa: F401
+            get_model("spacy")
+        if self.engine == "Whisper":
+            get_model("whisper")
+        word_frequency("warm", "en")
+
+    async def handle(self, ws, path=None):
+        # websockets ≥ 13 passes only the connection; older versions also pass the path.
+        request = getattr(ws, "request", None)
+        path = request.path if request is not None else (path or getattr(ws, "path", "/"))
+        query = parse_qs(urlparse(path).query)
+        sample_format = query.get("format", ["s16le"])[0]
+        if len(self.sessions) >= self.max_sessions:
+            await ws.close(1013, "server full")
+            return
+        session = Session(self, ws, sample_format)
+        self.sessions[session.id] = session
+        print(f"🔌 [{session.id}] connected ({len(self.sessions)} sessions)")
+        worker = asyncio.ensure_future(session.transcribe_loop())
+        finished = False
+        try:
+            await session.send({"type": "ready", "session": session.id, "sample_rate": SAMPLE_RATE,
+                                "engine": self.engine, "format": sample_format})
+            async for message in ws:
+                if isinstance(message, bytes):
+                    session.feed(message)
+                elif json.loads(message).get("type") == "stop":
+                    break
+            session.flush()
+            await session.chunks.put(None)
+            await worker
+            if session.cells:
+                await asyncio.gather(*session.cells, return_exceptions=True)
+            await session.send({"type": "done", "rows": session.rows, "dropped": session.dropped})
+            finished = True
+        except Exception as e:
+            if not finished:
+                print(f"⚠️ [{session.id}] session ended early:", e)
+        finally:
+            worker.cancel()
+            session.close()
+            del self.sessions[session.id]
+            print(f"👋 [{session.id}] {session.rows} rows, {session.dropped} dropped ({len(self.sessions)} sessions)")
+
+    async def serve(self, host, port):
+        import websockets  # optional: only needed for server mode
+
+        from tracing import metrics
+        metrics.gauge("server_sessions", lambda: len(self.sessions))
+        metrics.gauge("server_queued_chunks", lambda: sum(s.chunks.qsize() for s in list(self.sessions.values())))
+        async with websockets.serve(self.handle, host, port, max_size=2 ** 20):
+            print(f"🎧 Listening on ws://{host}:{port} ({self.engine}, "
+                  f"{self.inference_workers} inference workers)")
+            await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the speech pipeline to many WebSocket clients")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--engine", choices=ENGINES, default="Whisper")
+    parser.add_argument("--no-nlp", action="store_true", help="skip concepts/entities")
+    parser.add_argument("--stubs", action="store_true",
+                        help="point the dictionary, LLM and AssemblyAI at local stubs (for load tests)")
+    args = parser.parse_args()
+
+    if args.stubs:
+        # Must run before config is imported, like the benchmark.
+        from benchmark import start_stubs
+        start_stubs(argparse.Namespace(dict_latency=0.05, dict_failure=0.0, llm_latency=0.3, llm_failure=0.0,
+                                       llm_token_delay=0.01, asr_latency=0.3, asr_failure=0.0, cold=False))
+
+    from config import (
+        SERVER_HOST, SERVER_PORT, SERVER_INFERENCE_WORKERS, SERVER_ENRICHMENT_WORKERS,
+        SERVER_SESSION_QUEUE, SERVER_MAX_SESSIONS,
+    )
+    from tracing import start_metrics_server
+
+    server = SpeechServer(
+        engine=args.engine,
+        with_nlp=not args.no_nlp,
+        inference_workers=SERVER_INFERENCE_WORKERS,
+        enrichment_workers=SERVER_ENRICHMENT_WORKERS,
+        session_queue=SERVER_SESSION_QUEUE,
+        max_sessions=SERVER_MAX_SESSIONS,
+    )
+    server.load_models()
+    start_metrics_server()
+    try:
+        asyncio.run(server.serve(args.host or SERVER_HOST, args.port or SERVER_PORT))
+    except KeyboardInterrupt:
+        print("🛑 Server stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
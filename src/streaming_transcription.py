@@ -0,0 +1,127 @@
+# streaming_transcription.py
+import re
+
+from models import get_whisper_model
+from transcription import as_float32_mono
+from config import (
+    SAMPLE_RATE,
+    STREAMING_MAX_WINDOW_S,
+    STREAMING_BEAM_SIZE,
+    STREAMING_MAX_UTTERANCE_WORDS,
+)
+
+STREAMING_ENGINE = "Whisper (streaming)"
+
+
+def whisper_words(audio, prompt=""):
+    # [(word, start_s, end_s), ...] relative to the start of audio.
+    segments, _ = get_whisper_model().transcribe(
+        as_float32_mono(audio),
+        beam_size=STREAMING_BEAM_SIZE,
+        word_timestamps=True,
+        condition_on_previous_text=False,
+        initial_prompt=prompt or None,
+    )
+    return [(w.word, w.start, w.end) for seg in segments for w in (seg.words or [])]
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def join_words(words):
+    # faster-whisper words carry their own leading space.
+    return "".join(w for w, _, _ in words).strip()
+
+
+class StreamingTranscriber:
+    """Local-agreement streaming on top of faster-whisper.
+
+    update() re-transcribes the audio window [buffer_start, now) each step. Words that two
+    consecutive hypotheses agree on (longest common prefix) are committed; the rest of the
+    newest hypothesis is provisional and may still change. Committed words are grouped into
+    utterances at sentence ends, silences or STREAMING_MAX_UTTERANCE_WORDS, and the window
+    is trimmed to the last commit so it never grows past STREAMING_MAX_WINDOW_S.
+    Positions are absolute sample indices, matching RingBuffer.
+    """
+
+    def __init__(self, transcribe=whisper_words, max_window_s=STREAMING_MAX_WINDOW_S,
+                 max_utterance_words=STREAMING_MAX_UTTERANCE_WORDS, prompt_chars=200):
+        self.transcribe = transcribe
+        self.max_window = int(max_window_s * SAMPLE_RATE)
+        self.max_utterance_words = max_utterance_words
+        self.prompt_chars = prompt_chars
+        self.reset(0)
+
+    def reset(self, position):
+        self.buffer_start = position   # absolute sample of audio[0] in the next update()
+        self.committed_end = position  # absolute end of the last committed word
+        self.previous = []             # provisional words from the last hypothesis
+        self.pending = []              # committed words not yet emitted as an utterance
+        self.prompt = ""               # tail of committed text, fed back as initial_prompt
+
+    @property
+    def pending_text(self):
+        return join_words(self.pending)
+
+    @property
+    def provisional_text(self):
+        return join_words(self.previous)
+
+    def update(self, audio):
+        # Returns the list of utterances finished by this step.
+        tolerance = int(0.1 * SAMPLE_RATE)
+        audio_start = self.buffer_start
+        hypothesis = [
+            (word, audio_start + int(start * SAMPLE_RATE), audio_start + int(end * SAMPLE_RATE))
+            for word, start, end in self.transcribe(audio, self.prompt)
+        ]
+        hypothesis = [w for w in hypothesis if w[1] >= self.committed_end - tolerance]
+        hypothesis = self._drop_repeated_prefix(hypothesis)
+
+        agreed = 0
+        while (agreed < min(len(hypothesis), len(self.previous))
+               and _norm(hypothesis[agreed][0]) == _norm(self.previous[agreed][0])):
+            agreed += 1
+        committed, self.previous = hypothesis[:agreed], hypothesis[agreed:]
+        if committed:
+            self.pending.extend(committed)
+            self.committed_end = committed[-1][2]
+            self.prompt = (self.prompt + "".join(w for w, _, _ in committed))[-self.prompt_chars:]
+
+        finished = []
+        sentence_end = self.pending and self.pending[-1][0].rstrip().endswith((".", "?", "!"))
+        silence = self.pending and not hypothesis
+        if sentence_end or silence or len(self.pending) >= self.max_utterance_words:
+            finished.append(self.pending_text)
+            self.pending = []
+            # Nothing before the emitted utterance is needed again.
+            self.buffer_start = max(self.buffer_start, self.committed_end)
+
+        window_end = audio_start + len(audio)
+        if window_end - self.buffer_start > self.max_window:
+            if self.committed_end > self.buffer_start:
+                self.buffer_start = self.committed_end
+            else:
+                # No agreement for a whole window: drop the oldest audio and start over.
+                self.buffer_start = window_end - self.max_window // 2
+                self.previous = []
+        return [text for text in finished if text]
+
+    def flush(self):
+        # End of stream: whatever is committed or provisional becomes the last utterance.
+        text = join_words(self.pending + self.previous)
+        self.pending = []
+        self.previous = []
+        return [text] if text else []
+
+    def _drop_repeated_prefix(self, hypothesis):
+        # Whisper often re-emits the last committed words right after the commit point, with
+        # shifted timestamps; drop up to a 5-word overlap with what was already committed.
+        if not hypothesis or hypothesis[0][1] - self.committed_end > SAMPLE_RATE:
+            return hypothesis
+        committed_tail = [_norm(w) for w in re.findall(r"\S+", self.prompt)][-5:]
+        for n in range(min(5, len(committed_tail), len(hypothesis)), 0, -1):
+            if [_norm(w) for w, _, _ in hypothesis[:n]] == committed_tail[-n:]:
+                return hypothesis[n:]
+        return hypothesis
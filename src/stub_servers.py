@@ -0,0 +1,301 @@
+# stub_servers.py
+# Local stand-ins for the external APIs so the pipeline can be exercised offline.
+# Point the app at them through the *_URL settings in .env, e.g.
+#   DICTIONARY_API_URL=http://127.0.0.1:8765/api/v2/entries/en
+import base64
+import hashlib
+import itertools
+import json
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+SAMPLE_DEFINITIONS = {
+    "ephemeral": "Lasting for a very short time.",
+    "heuristic": "A practical method that is not guaranteed to be optimal.",
+    "idempotent": "Producing the same result however many times it is applied.",
+    "quixotic": "Exceedingly idealistic; unrealistic and impractical.",
+    "serendipity": "The occurrence of events by chance in a happy way.",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Shared behaviour for every stub: injected latency and failures, quiet logging and
+    # JSON replies. failure_rate is the fraction of requests answered with HTTP 500.
+    protocol_version = "HTTP/1.1"
+    latency_s = 0.0
+    failure_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def _fail_randomly(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._send_json(500, {"error": {"message": "injected failure"}})
+            return True
+        return False
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DictionaryStubHandler(StubHandler):
+    # Mimics GET https://api.dictionaryapi.dev/api/v2/entries/en/<word>
+    definitions = SAMPLE_DEFINITIONS
+
+    def do_GET(self):
+        self._delay()
+        if self._fail_randomly():
+            return
+        word = unquote(self.path.rstrip("/").rsplit("/", 1)[-1]).lower()
+        definition = self.definitions.get(word)
+        if definition is None:
+            self._send_json(404, {"title": "No Definitions Found"})
+            return
+        self._send_json(200, [{"word": word, "meanings": [{"definitions": [{"definition": definition}]}]}])
+
+
+class OpenAIStubHandler(StubHandler):
+    # Mimics POST /chat/completions of OpenRouter/Groq.
+    # Requests with "stream": true get the reply word by word as server-sent events;
+    # JSON-mode requests (the combined prompt) get json_reply.
+    reply = "- jargon: latency budget\n- glossary: tail latency\n- followup: hedged requests"
+    json_reply = json.dumps({
+        "jargon": ["latency budget"], "glossary": ["tail latency"], "followup": ["hedged requests"],
+        "support": [{"term": "p99", "description": "the latency 99% of requests stay under"}],
+    })
+    token_delay_s = 0.02
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self._delay()
+        if self._fail_randomly():
+            return
+        if request.get("stream"):
+            self._stream_reply()
+            return
+        json_mode = request.get("response_format", {}).get("type") == "json_object"
+        content = self.json_reply if json_mode else self.reply
+        self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    def _stream_reply(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in re.findall(r"\S+\s*", self.reply):
+            event = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            time.sleep(self.token_delay_s)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class AssemblyAIStubHandler(StubHandler):
+    # Mimics AssemblyAI: POST /v2/upload, POST /v2/transcript, GET /v2/transcript/<id>
+    # (status "processing" for processing_s, then "completed"), and the v3 realtime
+    # WebSocket at /v3/ws, which turns every half second of received audio into one more
+    # word of a partial turn and closes the turn after words_per_turn words.
+    # transcript_text may be a list; transcripts then cycle through it.
+    transcript_text = "so the latency budget was mostly spent waiting on the network"
+    processing_s = 0.5
+    words_per_turn = 6
+    transcripts = None  # id -> created_at, shared per server (set by start_assemblyai_stub)
+    _ids = itertools.count(1)
+
+    def do_POST(self):
+        body = self._read_body()
+        self._delay()
+        if self._fail_randomly():
+            return
+        if self.path.endswith("/upload"):
+            upload_url = f"http://{self.headers.get('Host')}/uploads/{len(body)}"
+            self._send_json(200, {"upload_url": upload_url})
+        elif self.path.endswith("/transcript"):
+            transcript_id = f"stub-{next(self._ids)}"
+            self.transcripts[transcript_id] = time.monotonic()
+            self._send_json(200, {"id": transcript_id, "status": "queued"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_GET(self):
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            self._realtime()
+            return
+        self._delay()
+        if self._fail_randomly():
+            return
+        transcript_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        created_at = self.transcripts.get(transcript_id)
+        if created_at is None:
+            self._send_json(404, {"error": "transcript not found"})
+        elif time.monotonic() - created_at < self.processing_s:
+            self._send_json(200, {"id": transcript_id, "status": "processing"})
+        else:
+            self._send_json(200, {"id": transcript_id, "status": "completed", "text": self._text(transcript_id)})
+
+    def _text(self, transcript_id):
+        if isinstance(self.transcript_text, str):
+            return self.transcript_text
+        return self.transcript_text[int(transcript_id.rsplit("-", 1)[-1]) % len(self.transcript_text)]
+
+    def _read_body(self):
+        # requests streams generator bodies with chunked transfer encoding.
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b""
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if size == 0:
+                self.rfile.readline()
+                return body
+            body += self.rfile.read(size)
+            self.rfile.readline()
+
+    def _realtime(self):
+        accept = base64.b64encode(hashlib.sha1(
+            self.headers["Sec-WebSocket-Key"].encode() + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+        ).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.close_connection = True
+        self._ws_send_json({"type": "Begin", "id": f"stub-{next(self._ids)}", "expires_at": int(time.time()) + 600})
+        words = " ".join([self.transcript_text] if isinstance(self.transcript_text, str) else self.transcript_text).split()
+        received = 0
+        turn_order = 0
+        turn = []
+        while True:
+            opcode, payload = self._ws_recv()
+            if opcode == 0x8:
+                return
+            if opcode == 0x2:
+                received += len(payload)
+                # One word per 0.5 s of 16 kHz 16-bit audio.
+                while received >= 16000:
+                    received -= 16000
+                    turn.append(words[(turn_order * self.words_per_turn + len(turn)) % len(words)])
+                    self._ws_send_turn(turn_order, turn, end_of_turn=False)
+                    if len(turn) >= self.words_per_turn:
+                        self._end_turn(turn_order, turn)
+                        turn_order, turn = turn_order + 1, []
+            elif opcode == 0x1 and json.loads(payload).get("type") == "Terminate":
+                if turn:
+                    self._end_turn(turn_order, turn)
+                self._ws_send_json({"type": "Termination", "audio_duration_seconds": 0})
+                self._ws_send(0x8, b"")
+                return
+
+    def _end_turn(self, turn_order, turn):
+        self._ws_send_turn(turn_order, turn, end_of_turn=True)
+        self._ws_send_turn(turn_order, turn, end_of_turn=True, formatted=True)
+
+    def _ws_send_turn(self, turn_order, turn, end_of_turn, formatted=False):
+        transcript = " ".join(turn)
+        if formatted:
+            transcript = transcript.capitalize() + "."
+        self._ws_send_json({
+            "type": "Turn", "turn_order": turn_order, "end_of_turn": end_of_turn,
+            "turn_is_formatted": formatted, "transcript": transcript,
+        })
+
+    def _ws_send_json(self, payload):
+        self._ws_send(0x1, json.dumps(payload).encode("utf-8"))
+
+    def _ws_send(self, opcode, data):
+        header = bytes([0x80 | opcode])
+        if len(data) < 126:
+            header += bytes([len(data)])
+        elif len(data) < 1 << 16:
+            header += bytes([126]) + struct.pack(">H", len(data))
+        else:
+            header += bytes([127]) + struct.pack(">Q", len(data))
+        self.wfile.write(header + data)
+        self.wfile.flush()
+
+    def _ws_recv(self):
+        # Client frames are always masked; fragmentation isn't used by the client.
+        first, second = self.rfile.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if second & 0x80 else b"\0\0\0\0"
+        payload = self.rfile.read(length)
+        return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def start_stub_server(handler_cls, port=0, **attrs):
+    # Serves a subclass of handler_cls with attrs overridden; returns (server, base_url).
+    handler = type(handler_cls.__name__, (handler_cls,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_dictionary_stub(definitions=None, port=0, latency_s=0.0, failure_rate=0.0):
+    server, base_url = start_stub_server(
+        DictionaryStubHandler, port,
+        definitions=definitions if definitions is not None else SAMPLE_DEFINITIONS,
+        latency_s=latency_s,
+        failure_rate=failure_rate,
+    )
+    return server, f"{base_url}/api/v2/entries/en"
+
+
+def start_llm_stub(reply=None, port=0, latency_s=0.0, failure_rate=0.0, token_delay_s=0.02):
+    attrs = {"latency_s": latency_s, "failure_rate": failure_rate, "token_delay_s": token_delay_s}
+    if reply is not None:
+        attrs["reply"] = reply
+    server, base_url = start_stub_server(OpenAIStubHandler, port, **attrs)
+    return server, f"{base_url}/v1/chat/completions"
+
+
+def start_assemblyai_stub(port=0, latency_s=0.0, processing_s=0.5, transcript_text=None, failure_rate=0.0):
+    # Returns (server, base_url, realtime_url) for ASSEMBLYAI_URL / ASSEMBLYAI_REALTIME_URL.
+    attrs = {"latency_s": latency_s, "processing_s": processing_s, "transcripts": {}, "failure_rate": failure_rate}
+    if transcript_text is not None:
+        attrs["transcript_text"] = transcript_text
+    server, base_url = start_stub_server(AssemblyAIStubHandler, port, **attrs)
+    return server, f"{base_url}/v2", f"{base_url.replace('http://', 'ws://')}/v3/ws"
+
+
+if __name__ == "__main__":
+    servers = []
+    server, url = start_dictionary_stub(port=8765)
+    servers.append(server)
+    print(f"📖 Dictionary stub at {url}")
+    server, url = start_llm_stub(port=8766, latency_s=0.3)
+    servers.append(server)
+    print(f"🤖 LLM stub at {url} (use as OPENROUTER_URL / GROQ_URL)")
+    server, url, realtime_url = start_assemblyai_stub(port=8767)
+    servers.append(server)
+    print(f"🎙️ AssemblyAI stub at {url} (ASSEMBLYAI_URL), realtime at {realtime_url} (ASSEMBLYAI_REALTIME_URL)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
@@ -2,24 +2,77 @@
 import re
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 from wordfreq import word_frequency
 
+from definition_cache import DefinitionCache
+from dict_index import open_index
+from detection import engine as detection_engine
+from config import (
+    DEFINITION_CACHE_PATH,
+    DEFINITION_CACHE_SIZE,
+    DEFINITION_TTL_DAYS,
+    DEFINITION_NEGATIVE_TTL_HOURS,
+    DICTIONARY_API_URL,
+    DEFINITION_WORKERS,
+    DEFINITION_DEADLINE_S,
+    DICTIONARY_INDEX_PATH,
+)
+
+# One keep-alive session and a small pool shared by all lookups.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=DEFINITION_WORKERS))
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=DEFINITION_WORKERS))
+_lookup_pool = ThreadPoolExecutor(max_workers=DEFINITION_WORKERS, thread_name_prefix="dictionary")
+
 def is_potentially_difficult(word):
     if not word.isalpha():
         return False
     return word_frequency(word.lower(), "en") < 5e-6
 
-def get_definition(word):
+def fetch_definition(word):
+    # Returns None when the dictionary has no entry; raises on network/server errors so
+    # the cache only remembers real misses.
+    response = _session.get(f"{DICTIONARY_API_URL}/{word}", timeout=5)
+    if response.status_code == 200:
+        data = response.json()
+        return data[0]["meanings"][0]["definitions"][0]["definition"]
+    if response.status_code == 404:
+        logging.warning(f"⚠️ No definition found for: {word} (status: {response.status_code})")
+        return None
+    response.raise_for_status()
+    raise requests.HTTPError(f"Unexpected status {response.status_code} for: {word}")
+
+def _fetch_definition_logged(word):
     try:
-        response = requests.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            return data[0]["meanings"][0]["definitions"][0]["definition"]
-        else:
-            logging.warning(f"⚠️ No definition found for: {word} (status: {response.status_code})")
-    except Exception as e:
+        return fetch_definition(word)
+    except Exception:
         logging.exception(f"❌ Error fetching definition for: {word}")
-    return None
+        raise
+
+# Shared by every caller of get_definition / extract_difficult_definitions.
+definition_cache = DefinitionCache(
+    DEFINITION_CACHE_PATH or None,
+    max_entries=DEFINITION_CACHE_SIZE,
+    ttl_s=DEFINITION_TTL_DAYS * 86400,
+    negative_ttl_s=DEFINITION_NEGATIVE_TTL_HOURS * 3600,
+)
+
+# Local, memory-mapped dictionary; None until one has been built.
+dictionary_index = open_index(DICTIONARY_INDEX_PATH)
+
+def lookup_offline(word):
+    return dictionary_index.lookup(word) if dictionary_index is not None else None
+
+def get_definition_online(word):
+    return definition_cache.get_or_fetch(word, _fetch_definition_logged)
+
+def get_definition(word):
+    return lookup_offline(word) or get_definition_online(word)
+
+def prewarm_definitions(words):
+    return definition_cache.prewarm(words, _fetch_definition_logged)
 
 def extract_named_entities(doc):
     return ", ".join(ent.text for ent in doc.ents)
@@ -42,43 +95,32 @@ def extract_clean_concepts(doc):
                 concepts.add(lemma)
     return ", ".join(sorted(concepts))
 
-def extract_difficult_definitions(txt):
-    words = re.findall(r"\b\w+\b", txt)
+def extract_difficult_definitions(txt, deadline_s=DEFINITION_DEADLINE_S):
+    words = list(dict.fromkeys(re.findall(r"\b\w+\b", txt)))
     found_defs = []
     try:
-        for word in set(words):
-            if is_potentially_difficult(word):
-                definition = get_definition(word)
-                if definition:
-                    found_defs.append(f"{word}: {definition}")
+        difficult = [word for word in words if is_potentially_difficult(word)]
+        # Offline hits are answered inline; only the misses go online through the lookup pool.
+        offline = {word: lookup_offline(word) for word in difficult}
+        futures = {word: _lookup_pool.submit(get_definition_online, word) for word in difficult if not offline[word]}
+        done, not_done = wait(futures.values(), timeout=deadline_s)
+        if not_done:
+            # Late lookups keep running and land in the cache for the next mention.
+            logging.warning(f"⚠️ {len(not_done)} definition lookups missed the {deadline_s}s deadline")
+        for word in difficult:
+            future = futures.get(word)
+            definition = offline[word] or (future.result() if future in done else None)
+            if definition:
+                found_defs.append(f"{word}: {definition}")
         return "\n\n".join(found_defs) if found_defs else "—"
     except Exception as e:
         logging.exception(f"❌ Failed to extract difficult word definitions for: {txt}")
         return "❌ Error extracting definitions"
 
 def detect_ambiguity(utterance: str) -> bool:
-    utterance = utterance.lower().strip()
-    if len(utterance.split()) < 4:
-        return False
-    ambiguity_signals = [
-        r"\bi (don’t|can't|cannot)?\s?(remember|get|know|recall)\b.*\b(name|term|word|thing|what)\b",
-        r"\bwhat('?s| is) it called\b",
-        r"\bnot sure\b",
-        r"\bi'm drawing a blank\b",
-        r"\bthe word for it\b",
-        r"\btip of (my|the) tongue\b",
-        r"\bit'?s (kind of|something|sort of) like\b",
-        r"\bthe thing that\b",
-        r"\bsimilar to\b",
-    ]
-    return any(re.search(pat, utterance) for pat in ambiguity_signals)
+    ambiguous, _, _ = detection_engine.detect([utterance.strip()])
+    return ambiguous
 
 def detect_hesitation(utterance: str) -> bool:
-    utterance = utterance.lower()
-    hesitation_signals = [
-        r"\buh+\b", r"\bum+\b", r"\ber+\b",
-        r"\blike\b", r"\byou know\b", r"\bwell,\b",
-        r"\bkind of\b", r"\bso like\b", r"\.\.\."
-    ]
-    hits = sum(bool(re.search(pattern, utterance)) for pattern in hesitation_signals)
-    return hits >= 2
+    _, hesitant, _ = detection_engine.detect([utterance])
+    return hesitant
@@ -0,0 +1,263 @@
+# tracing.py
+# Per-chunk traces with timed spans, plus the metrics they feed:
+#   - Prometheus text exposition on http://127.0.0.1:METRICS_PORT/metrics
+#   - one JSON line per finished trace in TRACE_FILE (optional)
+#   - rolling p50/p95 per stage for the on-screen stats panel
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_PORT, TRACE_FILE
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Thread-safe histograms, counters and callback gauges, keyed by name + labels."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=200):
+        self.buckets = buckets
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._recent = {}      # (name, labels) -> deque of recent values
+        self._counters = {}
+        self._gauges = {}      # name -> fn() returning a number
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 2)
+                self._recent[key] = deque(maxlen=self.window)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+            self._recent[key].append(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, fn):
+        self._gauges[name] = fn
+
+    def percentiles(self, name, pcts=(50, 95), **labels):
+        # From the last `window` observations; None when there are none yet.
+        with self._lock:
+            values = sorted(self._recent.get((name, tuple(sorted(labels.items()))), ()))
+        if not values:
+            return None
+        return [values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] for p in pcts]
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), hist in histograms:
+            header(name, "histogram")
+            for bound, count in zip(self.buckets, hist):
+                lines.append(f"{name}_bucket{_label_str(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_label_str(labels + (('le', '+Inf'),))} {hist[-1]}")
+            lines.append(f"{name}_sum{_label_str(labels)} {hist[-2]:.6f}")
+            lines.append(f"{name}_count{_label_str(labels)} {hist[-1]}")
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_label_str(labels)} {value}")
+        for name, fn in sorted(self._gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            header(name, "gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("speech_stage_seconds", "Time spent in each pipeline stage per chunk")
+metrics.describe("speech_trace_seconds", "Chunk cut to last table cell filled")
+metrics.describe("speech_stage_errors_total", "Pipeline stages that raised")
+metrics.describe("speech_traces_total", "Finished chunk traces by outcome")
+metrics.describe("llm_provider_seconds", "LLM provider call latency by provider and outcome")
+
+
+class TraceWriter:
+    # Appends one JSON object per finished trace; a line is flushed as soon as it's written.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def write(self, record):
+        if self._file is None:
+            return
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+trace_writer = TraceWriter(TRACE_FILE)
+
+
+class Trace:
+    """One chunk's trip capture → transcription → NLP → render → definitions → LLM.
+
+    Spans are timed with perf_counter and recorded into `metrics` as they end. The trace
+    itself finishes once every holder has released it: it starts with one reference (the
+    pipeline), and each async table cell holds another until it's filled.
+    """
+
+    def __init__(self, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.delivered_at = None
+        self._refs = 1
+        self._lock = threading.Lock()
+        self.finished = False
+
+    @staticmethod
+    def now():
+        return time.perf_counter()
+
+    def mark_delivered(self):
+        # Handed to the GUI thread; the "render" span runs from here to the row being on screen.
+        self.delivered_at = time.perf_counter()
+
+    def add_span(self, name, start, end, **attrs):
+        duration = end - start
+        with self._lock:
+            self.spans.append({"name": name, "offset_s": round(start - self.start, 4),
+                               "duration_s": round(duration, 4), **attrs})
+        metrics.observe("speech_stage_seconds", duration, stage=name)
+        if attrs.get("error"):
+            metrics.inc("speech_stage_errors_total", stage=name)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        # The yielded dict can be filled with attributes (provider, cache_hit, ...) inside the block.
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = str(e)
+            raise
+        finally:
+            self.add_span(name, start, time.perf_counter(), **attrs)
+
+    def hold(self):
+        with self._lock:
+            self._refs += 1
+
+    def release(self, status="ok"):
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0 or self.finished:
+                return
+            self.finished = True
+        duration = time.perf_counter() - self.start
+        metrics.observe("speech_trace_seconds", duration, status=status)
+        metrics.inc("speech_traces_total", status=status)
+        trace_writer.write({
+            "trace_id": self.trace_id,
+            "started_at": round(self.started_at, 3),
+            "duration_s": round(duration, 4),
+            "status": status,
+            **self.attrs,
+            "spans": self.spans,
+        })
+
+
+def new_trace(**attrs):
+    return Trace(**attrs)
+
+
+@contextmanager
+def maybe_span(trace, name, **attrs):
+    # Lets instrumented code run unchanged when no trace is passed in.
+    if trace is None:
+        yield attrs
+    else:
+        with trace.span(name, **attrs) as span_attrs:
+            yield span_attrs
+
+
+STAGE_SUMMARY = ("transcription", "nlp", "definitions", "llm.suggestion", "llm.support", "llm.combined")
+
+
+def stats_line():
+    # One-line live summary for the GUI: p50/p95 per stage and for the whole row.
+    parts = []
+    for stage in STAGE_SUMMARY:
+        pct = metrics.percentiles("speech_stage_seconds", stage=stage)
+        if pct:
+            parts.append(f"{stage} {pct[0] * 1000:.0f}/{pct[1] * 1000:.0f}")
+    total = metrics.percentiles("speech_trace_seconds", status="ok")
+    if total:
+        parts.append(f"row {total[0]:.2f}/{total[1]:.2f}s")
+    return "p50/p95 ms · " + " · ".join(parts) if parts else "No timings yet"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    # Returns the server, or None when disabled (port 0) or the port is taken.
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on port {port}:", e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return server
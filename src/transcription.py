@@ -1,47 +1,139 @@
 # transcription.py
-from faster_whisper import WhisperModel
+import struct
+import threading
+
+import numpy as np
+
+from config import SAMPLE_RATE, WHISPER_BATCH_SIZE, WHISPER_BATCH_WAIT_MS, WHISPER_LANGUAGE, WHISPER_NUM_WORKERS
+from models import get_model, get_whisper_model
+from pipeline import MicroBatcher
+
+def as_float32_mono(audio):
+    # Flatten (frames, 1) capture blocks without copying; file paths pass through untouched.
+    if isinstance(audio, np.ndarray):
+        audio = audio.reshape(-1)
+        if audio.dtype == np.int16:
+            return audio.astype(np.float32) / 32768.0
+        if audio.dtype != np.float32:
+            return audio.astype(np.float32)
+    return audio
+
+def _transcribe_one(audio):
+    segments, _ = get_whisper_model().transcribe(audio, language=WHISPER_LANGUAGE or None)
+    return " ".join([seg.text.strip() for seg in segments])
+
+WHISPER_WINDOW_S = 30  # Whisper's input length; the batched pipeline never decodes across it
+
+def transcribe_whisper_batch(chunks):
+    # Returns one transcript per chunk, in order. Chunk k is placed at k * 30 s on a silent
+    # timeline and passed as its own clip, so every chunk is one padded row of the batch and
+    # no decoding window (or segment) can hold audio from two chunks, i.e. two callers.
+    # A segment belongs to the chunk whose window it starts in.
+    chunks = [as_float32_mono(chunk) for chunk in chunks]
+    window = WHISPER_WINDOW_S * SAMPLE_RATE
+    texts = [None] * len(chunks)
+    rows = []
+    for i, chunk in enumerate(chunks):
+        if isinstance(chunk, np.ndarray) and 0 < len(chunk) <= window:
+            rows.append(i)
+        else:
+            texts[i] = _transcribe_one(chunk)  # file paths, empty or over-long chunks
+    batched = None
+    if len(rows) > 1:
+        try:
+            batched = get_model("whisper_batched")
+        except Exception:
+            pass  # faster-whisper older than 1.2
+    if batched is None:
+        for i in rows:
+            texts[i] = _transcribe_one(chunks[i])
+        return texts
 
-try:
-    whisper_model = WhisperModel("tiny", compute_type="auto")
-    print("✅ WhisperModel loaded")
-except Exception as e:
-    print("❌ Failed to load WhisperModel:", e)
-    whisper_model = None
+    timeline = np.zeros(window * len(rows), dtype=np.float32)
+    clips = []
+    for k, i in enumerate(rows):
+        timeline[k * window:k * window + len(chunks[i])] = chunks[i]
+        clips.append({"start": k * WHISPER_WINDOW_S, "end": k * WHISPER_WINDOW_S + len(chunks[i]) / SAMPLE_RATE})
+    segments, _ = batched.transcribe(
+        timeline, clip_timestamps=clips, batch_size=len(rows),
+        language=WHISPER_LANGUAGE or None, multilingual=not WHISPER_LANGUAGE,
+    )
+    parts = [[] for _ in rows]
+    for seg in segments:
+        parts[min(int(seg.start // WHISPER_WINDOW_S), len(rows) - 1)].append(seg.text.strip())
+    for k, i in enumerate(rows):
+        texts[i] = " ".join(parts[k])
+    return texts
 
-def transcribe_with_whisper(audio_path):
+# Every Whisper caller (pipeline workers, server sessions, benchmarks) goes through one queue:
+# chunks that arrive within WHISPER_BATCH_WAIT_MS of each other share a forward pass. One batch
+# (or lone chunk) runs per model worker, so WHISPER_NUM_WORKERS still sets the concurrency.
+whisper_batcher = MicroBatcher(transcribe_whisper_batch, max_batch=WHISPER_BATCH_SIZE,
+                               max_wait_s=WHISPER_BATCH_WAIT_MS / 1000, name="whisper-batcher",
+                               workers=WHISPER_NUM_WORKERS)
+
+def transcribe_with_whisper(audio):
     try:
-        segments, _ = whisper_model.transcribe(audio_path)
-        return " ".join([seg.text.strip() for seg in segments])
+        if WHISPER_BATCH_SIZE > 1:
+            return whisper_batcher(audio)
+        return _transcribe_one(as_float32_mono(audio))
     except Exception as e:
         print("❌ Whisper failed:", e)
         return ""
 
-import threading
-import requests
-from config import ASSEMBLYAI_API_KEY
+def wav_header(num_samples, sample_rate=SAMPLE_RATE):
+    data_size = num_samples * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size,
+    )
+
+def iter_wav_bytes(audio, sample_rate=SAMPLE_RATE, block_samples=32768):
+    # Encodes 16-bit PCM WAV block by block so uploads never hold a second full copy of the chunk.
+    samples = np.asarray(audio).reshape(-1)
+    yield wav_header(len(samples), sample_rate)
+    for start in range(0, len(samples), block_samples):
+        block = samples[start:start + block_samples]
+        if block.dtype != np.int16:
+            block = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+        yield block.astype("<i2", copy=False).tobytes()
+
+from config import (
+    ASSEMBLYAI_API_KEY,
+    ASSEMBLYAI_URL,
+    ASSEMBLYAI_DEADLINE_S,
+    ASSEMBLYAI_POLL_INITIAL_S,
+    ASSEMBLYAI_POLL_MAX_S,
+)
+
+_assemblyai = None
+_assemblyai_lock = threading.Lock()
+
+def get_assemblyai_client():
+    # Pipeline workers and server sessions call this concurrently; all of them share one
+    # client (and its connection pool), created under the lock like models.get_model.
+    global _assemblyai
+    if _assemblyai is not None:
+        return _assemblyai
+    with _assemblyai_lock:
+        if _assemblyai is None:
+            from assemblyai_client import AssemblyAIClient
+            _assemblyai = AssemblyAIClient(
+                ASSEMBLYAI_API_KEY,
+                base_url=ASSEMBLYAI_URL,
+                poll_initial_s=ASSEMBLYAI_POLL_INITIAL_S,
+                poll_max_s=ASSEMBLYAI_POLL_MAX_S,
+            )
+        return _assemblyai
 
-def transcribe_with_assemblyai(audio_path):
+def transcribe_with_assemblyai(audio, cancel_event=None):
     if not ASSEMBLYAI_API_KEY:
         print("❌ ASSEMBLYAI_API_KEY is missing")
         return ""
-    headers = {"authorization": ASSEMBLYAI_API_KEY, "content-type": "application/json"}
     try:
-        with open(audio_path, "rb") as f:
-            upload_response = requests.post("https://api.assemblyai.com/v2/upload", headers=headers, data=f)
-        audio_url = upload_response.json()["upload_url"]
-        transcript_request = {"audio_url": audio_url, "language_code": "en"}
-        response = requests.post("https://api.assemblyai.com/v2/transcript", json=transcript_request, headers=headers)
-        transcript_id = response.json()["id"]
-        polling_endpoint = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
-        while True:
-            polling_response = requests.get(polling_endpoint, headers=headers)
-            status = polling_response.json()["status"]
-            if status == "completed":
-                return polling_response.json()["text"]
-            elif status == "error":
-                print("❌ AssemblyAI returned an error")
-                return ""
-            threading.Event().wait(1)
+        return get_assemblyai_client().transcribe(audio, deadline_s=ASSEMBLYAI_DEADLINE_S, cancel_event=cancel_event)
     except Exception as e:
         print("❌ AssemblyAI failed:", e)
         return ""
@@ -0,0 +1,107 @@
+# vad.py
+import numpy as np
+
+from config import (
+    SAMPLE_RATE,
+    VAD_FRAME_MS,
+    VAD_MIN_UTTERANCE_S,
+    VAD_MAX_UTTERANCE_S,
+    VAD_SILENCE_TIMEOUT_S,
+    VAD_ENERGY_MARGIN_DB,
+    VAD_MIN_ENERGY_DB,
+    VAD_ZCR_MAX,
+)
+
+FRAME_SAMPLES = SAMPLE_RATE * VAD_FRAME_MS // 1000
+
+
+def frame_features(audio, frame_samples=FRAME_SAMPLES):
+    # Per-frame energy (dBFS) and zero-crossing rate; trailing partial frame is ignored.
+    # int16 PCM is scaled to [-1, 1) first, or every frame would read ~90 dB too loud.
+    audio = np.asarray(audio)
+    n_frames = len(audio) // frame_samples
+    frames = audio[:n_frames * frame_samples].astype(np.float32).reshape(n_frames, frame_samples)
+    if audio.dtype == np.int16:
+        frames /= 32768.0
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_samples
+    return energy_db, zcr
+
+
+def speech_mask(energy_db, zcr, noise_floor_db=VAD_MIN_ENERGY_DB - VAD_ENERGY_MARGIN_DB):
+    threshold = max(VAD_MIN_ENERGY_DB, noise_floor_db + VAD_ENERGY_MARGIN_DB)
+    # Quiet hiss crosses zero constantly; loud frames count as speech regardless (fricatives).
+    return (energy_db > threshold) & ((zcr < VAD_ZCR_MAX) | (energy_db > threshold + 10))
+
+
+def contains_speech(audio, min_speech_s=VAD_MIN_UTTERANCE_S):
+    energy_db, zcr = frame_features(audio)
+    voiced = np.count_nonzero(speech_mask(energy_db, zcr))
+    return voiced * FRAME_SAMPLES >= min_speech_s * SAMPLE_RATE
+
+
+class VoiceActivitySegmenter:
+    """Cuts a live sample stream into utterances at trailing silence.
+
+    feed() takes consecutive audio blocks tagged with their absolute start position and
+    returns (start, end) sample ranges of finished utterances, so the caller can copy
+    them out of the capture RingBuffer. Too-short blips and pure silence never surface.
+    """
+
+    def __init__(self, min_utterance_s=VAD_MIN_UTTERANCE_S, max_utterance_s=VAD_MAX_UTTERANCE_S,
+                 silence_timeout_s=VAD_SILENCE_TIMEOUT_S, padding_s=0.2):
+        self.min_samples = int(min_utterance_s * SAMPLE_RATE)
+        self.max_samples = int(max_utterance_s * SAMPLE_RATE)
+        self.silence_samples = int(silence_timeout_s * SAMPLE_RATE)
+        self.padding = int(padding_s * SAMPLE_RATE)
+        self.noise_floor_db = VAD_MIN_ENERGY_DB - VAD_ENERGY_MARGIN_DB
+        self.reset()
+
+    def reset(self):
+        self.start = None       # absolute start of the open utterance
+        self.last_voiced = None  # absolute end of its latest voiced frame
+        self.voiced = 0          # voiced samples inside the open utterance
+        self.scanned = 0         # absolute end of the audio seen so far
+
+    def feed(self, audio, position):
+        energy_db, zcr = frame_features(audio)
+        mask = speech_mask(energy_db, zcr, self.noise_floor_db)
+        if np.any(~mask):
+            # Track the noise floor slowly so a fan or room tone doesn't read as speech.
+            self.noise_floor_db = 0.9 * self.noise_floor_db + 0.1 * float(np.median(energy_db[~mask]))
+
+        segments = []
+        for i, is_speech in enumerate(mask):
+            frame_end = position + (i + 1) * FRAME_SAMPLES
+            if is_speech:
+                if self.start is None:
+                    self.start = max(frame_end - FRAME_SAMPLES - self.padding, 0)
+                self.last_voiced = frame_end
+                self.voiced += FRAME_SAMPLES
+                if frame_end - self.start >= self.max_samples:
+                    segments.extend(self._close(frame_end))
+                    self.start = frame_end
+                    self.last_voiced = frame_end
+            elif self.start is not None and frame_end - self.last_voiced >= self.silence_samples:
+                segments.extend(self._close(min(self.last_voiced + self.padding, frame_end)))
+        self.scanned = position + len(mask) * FRAME_SAMPLES
+        return segments
+
+    def flush(self):
+        if self.start is None:
+            return []
+        return self._close(min(self.last_voiced + self.padding, self.scanned))
+
+    def keep_from(self):
+        # Oldest sample the segmenter may still ask for; everything before can be released.
+        if self.start is not None:
+            return self.start
+        return max(self.scanned - self.padding - FRAME_SAMPLES, 0)
+
+    def _close(self, end):
+        segment = [(self.start, end)] if self.voiced >= self.min_samples else []
+        self.start = None
+        self.last_voiced = None
+        self.voiced = 0
+        return segment
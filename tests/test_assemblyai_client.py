@@ -0,0 +1,101 @@
+# test_assemblyai_client.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import assemblyai_client
+import transcription
+from assemblyai_client import AssemblyAIClient, RealtimeSession, TranscriptionCancelled, TranscriptionTimeout
+from stub_servers import start_assemblyai_stub
+
+TEXT = "so the latency budget was mostly spent waiting on the network"
+AUDIO = np.zeros(8000, dtype=np.float32)
+
+
+@pytest.fixture
+def assemblyai():
+    # start(processing_s) -> (base_url, realtime_url) of a fresh mock AssemblyAI server.
+    servers = []
+
+    def start(processing_s=0.3):
+        server, url, realtime_url = start_assemblyai_stub(processing_s=processing_s, transcript_text=TEXT)
+        servers.append(server)
+        return url, realtime_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_polling_starts_fast_and_backs_off(assemblyai):
+    url, _ = assemblyai(processing_s=0.3)
+    client = AssemblyAIClient("test", base_url=url, poll_initial_s=0.02, poll_max_s=0.1, poll_backoff=2)
+    started = time.perf_counter()
+    assert client.transcribe(AUDIO, deadline_s=5) == TEXT
+    elapsed = time.perf_counter() - started
+    # 20, 40, 80, 100, 100 ms ... : far fewer polls than a fixed 20 ms interval, and the
+    # result is picked up within one max interval of being ready.
+    assert 3 <= client.polls <= 8
+    assert elapsed < 0.3 + 0.1 + 0.1
+
+
+def test_deadline_stops_waiting(assemblyai):
+    url, _ = assemblyai(processing_s=5)
+    client = AssemblyAIClient("test", base_url=url, poll_initial_s=0.05, poll_max_s=0.1)
+    started = time.perf_counter()
+    with pytest.raises(TranscriptionTimeout):
+        client.transcribe(AUDIO, deadline_s=0.3)
+    assert time.perf_counter() - started < 0.6
+
+
+def test_cancel_event_interrupts_polling(assemblyai):
+    url, _ = assemblyai(processing_s=5)
+    client = AssemblyAIClient("test", base_url=url, poll_initial_s=1.0, poll_max_s=1.0)
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    started = time.perf_counter()
+    with pytest.raises(TranscriptionCancelled):
+        client.transcribe(AUDIO, deadline_s=5, cancel_event=cancel)
+    # Cancelled mid-wait, not at the end of the 1 s poll interval.
+    assert time.perf_counter() - started < 0.6
+    with pytest.raises(TranscriptionCancelled):
+        client.transcribe(AUDIO, deadline_s=5, cancel_event=cancel)
+    assert client.polls == 1
+
+
+def test_realtime_session_reports_partials_and_final_turns(assemblyai):
+    _, realtime_url = assemblyai()
+    partials, finals = [], []
+    session = RealtimeSession("test", realtime_url, 16000, partials.append, finals.append).connect()
+    # One word per 0.5 s of audio; the stub closes a turn after six words.
+    block = np.zeros(1600, dtype=np.float32)
+    for _ in range(35):
+        session.send_audio(block)
+    time.sleep(0.2)
+    session.close()
+    assert session.error is None
+    assert partials[:2] == ["so", "so the"]
+    assert finals == ["So the latency budget was mostly.", "Spent."]
+
+
+def test_client_is_created_once_under_concurrent_first_use(monkeypatch):
+    created = []
+
+    class SlowClient:
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(assemblyai_client, "AssemblyAIClient", SlowClient)
+    monkeypatch.setattr(transcription, "_assemblyai", None)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(transcription.get_assemblyai_client()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
@@ -0,0 +1,101 @@
+# test_batch.py
+import json
+import re
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+import batch
+import models
+import rowlogic
+from benchmark import synthetic_audio, SAMPLE_RATE
+from context_window import ContextWindow
+from stub_servers import start_assemblyai_stub
+
+TEXTS = ["So I was talking to Maria.", "um you know the one", "It was fast."]
+
+
+def write_wav(path, audio):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return str(path)
+
+
+@pytest.mark.parametrize("engine, with_nlp, expected", [
+    ("Whisper", True, ["spacy", "whisper"]),
+    ("Whisper", False, ["whisper"]),
+    ("AssemblyAI", True, ["spacy"]),
+    ("AssemblyAI", False, []),
+])
+def test_init_worker_loads_only_the_models_it_needs(monkeypatch, engine, with_nlp, expected):
+    loaded = []
+    monkeypatch.setattr(models, "get_model", loaded.append)
+    batch.init_worker(engine, with_nlp)
+    assert loaded == expected
+
+
+def test_enrich_fills_the_cells_plan_row_picks(monkeypatch):
+    monkeypatch.setattr(rowlogic, "extract_difficult_definitions", lambda text: f"defs:{text}")
+    monkeypatch.setattr(rowlogic, "get_llm_suggestion", lambda context: "suggestion")
+    monkeypatch.setattr(rowlogic, "get_llm_combined_response", lambda *args: ("combined suggestion", "support"))
+    monkeypatch.setattr(rowlogic, "get_support_for_context", lambda *args: "support")
+    window = ContextWindow(400, 80, 20)
+    rows = [batch.enrich(text, window) for text in TEXTS]
+    assert [row["definitions"] for row in rows] == [f"defs:{text}" for text in TEXTS]
+    # The first utterance has no context yet; the hesitant second one gets a support cell.
+    assert rows[0]["suggestion"] is None and rows[0]["support"] is None
+    assert rows[1]["hesitant"] and rows[1]["support"] == "support"
+    assert rows[1]["suggestion"] in ("suggestion", "combined suggestion")
+    assert window.seen == len(TEXTS)
+
+    no_llm = batch.enrich(TEXTS[1], ContextWindow(400, 80, 20), definitions=False, llm=False)
+    assert no_llm == {"definitions": None, "suggestion": None, "support": None,
+                      "ambiguous": False, "hesitant": False}
+
+
+def test_process_file_writes_one_record_per_transcribed_segment(monkeypatch, tmp_path):
+    path = write_wav(tmp_path / "talk.wav", synthetic_audio(3))
+    texts = iter(TEXTS[:2] + [""])
+    monkeypatch.setattr(batch, "transcribe", lambda audio, engine: next(texts))
+    rows, stats = batch.process_file(path, "Whisper", segmentation="vad", with_nlp=False,
+                                     definitions=False, llm=False)
+    assert [row["text"] for row in rows] == TEXTS[:2]
+    assert [row["segment"] for row in rows] == [0, 1]
+    assert all(row["file"] == path and row["engine"] == "Whisper" for row in rows)
+    assert 0 < rows[0]["start_s"] < rows[0]["end_s"] < rows[1]["start_s"] < rows[1]["end_s"]
+    assert set(rows[0]) >= {"concepts", "entities", "definitions", "suggestion", "support", "ambiguous", "hesitant"}
+    assert stats["segments"] == 3 and stats["rows"] == 2
+    assert stats["audio_s"] == pytest.approx(len(synthetic_audio(3)) / SAMPLE_RATE, abs=0.01)
+    assert stats["rtf"] == pytest.approx(stats["processing_s"] / stats["audio_s"])
+
+
+def test_main_writes_jsonl_and_reports_rtf(monkeypatch, tmp_path, capsys):
+    # Real spawned workers, transcribing through the mock AssemblyAI server.
+    server, url, _ = start_assemblyai_stub(processing_s=0.05, transcript_text="stub words")
+    try:
+        monkeypatch.setenv("ASSEMBLYAI_API_KEY", "test")
+        monkeypatch.setenv("ASSEMBLYAI_URL", url)
+        monkeypatch.setenv("ASSEMBLYAI_POLL_INITIAL_S", "0.02")
+        files = [write_wav(tmp_path / f"{name}.wav", synthetic_audio(2, seed=i)) for i, name in enumerate("ab")]
+        out = tmp_path / "rows.jsonl"
+        monkeypatch.setattr(sys, "argv", ["batch.py", str(tmp_path), "-o", str(out), "--engine", "AssemblyAI",
+                                          "--workers", "2", "--no-nlp", "--no-definitions", "--no-llm"])
+        assert batch.main() == 0
+    finally:
+        server.shutdown()
+
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert sorted((row["file"], row["segment"]) for row in rows) == [(f, i) for f in files for i in range(2)]
+    assert all(row["text"] == "stub words" and row["engine"] == "AssemblyAI" for row in rows)
+    report = capsys.readouterr().err
+    assert "✅" in report
+    match = re.search(r"📊 2/2 files, 4 rows, ([\d.]+)s audio in [\d.]+s with 2 workers → RTF ([\d.]+)", report)
+    assert match
+    assert float(match.group(1)) == pytest.approx(sum(len(synthetic_audio(2, seed=i)) for i in range(2)) / SAMPLE_RATE,
+                                                  abs=0.1)
+    assert float(match.group(2)) > 0
@@ -0,0 +1,68 @@
+# test_context_window.py
+import random
+
+import pytest
+
+from context_window import ContextWindow, count_tokens, truncate_tokens
+
+WORDS = ("latency budget retrieval pipeline kubernetes cluster frankfurt dublin residency gradient "
+         "vanishing idempotent ephemeral containers deployment onboarding payment quarterly revenue "
+         "the a of and to so we it is was that um like you know").split()
+
+
+def utterances(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 40))) + "." for _ in range(n)]
+
+
+@pytest.mark.parametrize("budget,summary,max_utterances", [(256, 64, 5), (64, 24, 3), (32, 16, 10), (512, 128, 8)])
+def test_rendered_context_never_exceeds_budget(budget, summary, max_utterances):
+    window = ContextWindow(budget_tokens=budget, summary_tokens=summary, max_utterances=max_utterances)
+    for text in utterances(300, seed=budget):
+        window.add(text)
+        stats = window.stats()
+        assert stats["total_tokens"] <= stats["budget_tokens"]
+        assert stats["summary_tokens"] <= window.summary_tokens
+        assert stats["recent_tokens"] <= window.recent_budget
+        assert len(window.utterances) <= max_utterances
+        assert count_tokens(window.render()) <= budget
+
+
+def test_one_long_utterance_keeps_its_tail():
+    window = ContextWindow(budget_tokens=40, summary_tokens=10)
+    window.add(" ".join(f"word{i}" for i in range(100)))
+    (kept,) = window.utterances
+    assert kept.startswith("…") and kept.endswith("word99")
+    assert window.stats()["recent_tokens"] <= window.recent_budget
+
+
+def test_old_utterances_fold_into_summary():
+    window = ContextWindow(budget_tokens=128, summary_tokens=48, max_utterances=2)
+    for text in utterances(10):
+        window.add(text)
+    assert window.folded == 8
+    assert window.summary
+    assert window.render().startswith("(")
+
+
+def test_reset_clears_windows_and_counters():
+    window = ContextWindow(budget_tokens=64, summary_tokens=24, max_utterances=2)
+    for text in utterances(10):
+        window.add(text)
+    window.reset()
+    assert window.render() == ""
+    assert window.seen == 0
+    stats = window.stats()
+    assert stats["utterances_summarized"] == 0
+    assert stats["input_tokens"] == 0 and stats["tokens_saved"] == 0
+    window.add("first utterance after the reset")
+    assert window.seen == 1
+    assert window.stats()["tokens_saved"] == 0
+
+
+def test_truncate_tokens_respects_limit():
+    text = " ".join(WORDS * 3)
+    for limit in (5, 12, 40):
+        assert count_tokens(truncate_tokens(text, limit)) <= limit
+        assert count_tokens(truncate_tokens(text, limit, keep="tail")) <= limit
+    assert truncate_tokens("short text", 50) == "short text"
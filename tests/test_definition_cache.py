@@ -0,0 +1,51 @@
+# test_definition_cache.py
+import time
+
+from definition_cache import DefinitionCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = DefinitionCache(max_entries=2)
+    cache.put("alpha", "a")
+    cache.put("beta", "b")
+    assert cache.get("alpha") == "a"  # alpha is now the most recent
+    cache.put("gamma", "c")
+    assert cache.get("beta", default="miss") == "miss"
+    assert cache.get("ALPHA") == "a"
+
+
+def test_negative_entries_are_cached_with_their_own_ttl():
+    cache = DefinitionCache(ttl_s=60, negative_ttl_s=0)
+    cache.put("asdfgh", None)
+    cache.put("ephemeral", "lasting a very short time")
+    time.sleep(0.01)
+    assert cache.get("asdfgh", default="miss") == "miss"
+    assert cache.get("ephemeral") == "lasting a very short time"
+
+
+def test_get_or_fetch_caches_results_but_not_failures():
+    cache = DefinitionCache()
+    calls = []
+
+    def fetch(word):
+        calls.append(word)
+        if word == "flaky":
+            raise TimeoutError
+        return None if word == "qwzx" else f"definition of {word}"
+
+    assert cache.get_or_fetch("serendipity", fetch) == "definition of serendipity"
+    assert cache.get_or_fetch("serendipity", fetch) == "definition of serendipity"
+    assert cache.get_or_fetch("qwzx", fetch) is None
+    assert cache.get_or_fetch("qwzx", fetch) is None
+    assert cache.get_or_fetch("flaky", fetch) is None
+    assert cache.get_or_fetch("flaky", fetch) is None
+    assert calls == ["serendipity", "qwzx", "flaky", "flaky"]
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_sqlite_store_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "definitions.sqlite3")
+    DefinitionCache(path).put("quixotic", "exceedingly idealistic")
+    cache = DefinitionCache(path)
+    assert cache.get("quixotic") == "exceedingly idealistic"
+    assert cache.stats()["disk_hits"] == 1
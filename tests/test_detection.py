@@ -0,0 +1,90 @@
+# test_detection.py
+# The compiled engine must give the same verdicts as the per-pattern regex checks it replaced.
+import re
+
+import pytest
+
+from config import DETECTION_PATTERNS_PATH
+from detection import DetectionEngine
+
+OLD_AMBIGUITY = [
+    r"\bi (don’t|can't|cannot)?\s?(remember|get|know|recall)\b.*\b(name|term|word|thing|what)\b",
+    r"\bwhat('?s| is) it called\b",
+    r"\bnot sure\b",
+    r"\bi'm drawing a blank\b",
+    r"\bthe word for it\b",
+    r"\btip of (my|the) tongue\b",
+    r"\bit'?s (kind of|something|sort of) like\b",
+    r"\bthe thing that\b",
+    r"\bsimilar to\b",
+]
+OLD_HESITATION = [
+    r"\buh+\b", r"\bum+\b", r"\ber+\b",
+    r"\blike\b", r"\byou know\b", r"\bwell,\b",
+    r"\bkind of\b", r"\bso like\b", r"\.\.\.",
+]
+
+
+def old_detect_ambiguity(utterance):
+    utterance = utterance.lower().strip()
+    if len(utterance.split()) < 4:
+        return False
+    return any(re.search(pat, utterance) for pat in OLD_AMBIGUITY)
+
+
+def old_detect_hesitation(utterance):
+    utterance = utterance.lower()
+    return sum(bool(re.search(pattern, utterance)) for pattern in OLD_HESITATION) >= 2
+
+
+UTTERANCES = [
+    "So I was talking to Maria at Google about the new retrieval pipeline.",
+    "Um, what's it called, the thing that stores vectors so you can search them quickly?",
+    "I can't remember the word for it, it's kind of like a cache but for whole responses.",
+    "You know, uh, the thing with the gradient that keeps vanishing in deep networks.",
+    "She said the plan was, well, not sure about it.",
+    "It's on the tip of my tongue...",
+    "What is it called again",
+    "Not sure.",
+    "I don’t recall the name of that library.",
+    "I'm drawing a blank on the term here.",
+    "Ummm so like the latency is kind of high, you know...",
+    "Well, it is similar to a bloom filter.",
+    "I like this design a lot.",
+    "Errr hmm uhh okay",
+    "The ephemeral containers are idempotent, so retrying is harmless.",
+    "It's something like a queue, I think.",
+    "Ubiquitous umbrellas were everywhere in the summer.",
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DetectionEngine.from_file(DETECTION_PATTERNS_PATH)
+
+
+@pytest.mark.parametrize("utterance", UTTERANCES)
+def test_matches_old_regex_checks(engine, utterance):
+    ambiguous, hesitant, _ = engine.detect([utterance.strip()])
+    assert ambiguous == old_detect_ambiguity(utterance)
+    assert hesitant == old_detect_hesitation(utterance)
+
+
+def test_overlapping_signals_are_each_reported(engine):
+    hits = engine.scan("so like, it's like that")
+    names = [name for name, _, _ in hits["hesitation"]]
+    assert names.count("like") == 2
+    assert "so_like" in names
+
+
+def test_window_counts_signals_across_utterances(engine):
+    # One hesitation signal per utterance, two in the window.
+    ambiguous, hesitant, signals = engine.detect(["um okay", "you know the one"])
+    assert hesitant and not ambiguous
+    assert signals["hesitation"] == ["um", "you_know"]
+
+
+def test_cached_scan_is_reused(engine):
+    first = engine.scan("uh, not sure what it is")
+    assert engine.scan("uh, not sure what it is") is first
@@ -0,0 +1,51 @@
+# test_dict_index.py
+import pytest
+
+from dict_index import DictionaryIndex, build_index, open_index
+
+TSV = """\
+serendipity\tThe occurrence of events by chance in a happy way.
+quagmire\tA soft boggy area of land; an awkward situation.
+stop\tCease moving or operating.
+Café\tA small restaurant selling light meals.
+ignored line without a tab
+empty\t
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    source = tmp_path / "words.tsv"
+    source.write_text(TSV, encoding="utf-8")
+    path = str(tmp_path / "out" / "dictionary.idx")
+    assert build_index([str(source)], path) == 4
+    index = DictionaryIndex(path)
+    yield index
+    index.close()
+
+
+def test_exact_word_lookup(index):
+    assert len(index) == 4
+    assert index.lookup("serendipity") == "The occurrence of events by chance in a happy way."
+    assert index.lookup("  Serendipity ") == "The occurrence of events by chance in a happy way."
+    assert index.lookup("café") == "A small restaurant selling light meals."
+
+
+def test_inflected_forms_resolve_through_their_lemma(index):
+    assert index.lookup("quagmires") == "A soft boggy area of land; an awkward situation."
+    assert index.lookup("stopped") == "Cease moving or operating."
+    assert index.lookup("stopping") == "Cease moving or operating."
+
+
+def test_miss_returns_none_and_is_counted(index):
+    assert index.lookup("zyzzyva") is None
+    assert index.lookup("empty") is None
+    index.lookup("stop")
+    assert (index.hits, index.misses) == (1, 2)
+
+
+def test_open_index_tolerates_missing_or_foreign_files(tmp_path):
+    assert open_index(str(tmp_path / "missing.idx")) is None
+    bogus = tmp_path / "bogus.idx"
+    bogus.write_bytes(b"not an index at all, just some bytes")
+    assert open_index(str(bogus)) is None
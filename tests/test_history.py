@@ -0,0 +1,54 @@
+# test_history.py
+import sqlite3
+
+import pytest
+
+import history
+from history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), flush_interval_s=0.01)
+    first = store.add("the latency budget is two hundred milliseconds", concepts="latency budget")
+    store.add("we moved the cluster to Dublin", entities="Dublin")
+    store.update(first, definitions="latency: delay before a transfer", suggestion="Ask about p95.")
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_search_matches_text_and_later_cell_updates(store):
+    assert [r["text"] for r in store.search("dublin")] == ["we moved the cluster to Dublin"]
+    rows = store.search("transfer")  # only in the definitions filled in after the row was added
+    assert len(rows) == 1 and rows[0]["suggestion"] == "Ask about p95."
+
+
+def test_last_word_matches_as_prefix_and_punctuation_is_safe(store):
+    assert len(store.search("budg")) == 1
+    assert store.search('what "is" AND (it') == []
+
+
+@pytest.mark.parametrize("query", ["", "   "])
+def test_empty_query_returns_all_rows_newest_first(store, query):
+    rows = store.search(query)
+    assert [r["text"] for r in rows] == ["we moved the cluster to Dublin",
+                                         "the latency budget is two hundred milliseconds"]
+
+
+def test_empty_query_without_fts_behaves_the_same(store, tmp_path):
+    path = str(tmp_path / "plain.sqlite3")
+    db = sqlite3.connect(path)
+    db.executescript(history.SCHEMA)
+    db.execute("INSERT INTO rows (row_key, session_id, created_at, updated_at, text) VALUES ('a', 's', 1, 1, 'older')")
+    db.execute("INSERT INTO rows (row_key, session_id, created_at, updated_at, text) VALUES ('b', 's', 2, 2, 'newer')")
+    db.commit()
+    db.close()
+    assert [r["text"] for r in history.search(path, "  ")] == ["newer", "older"]
+    assert [r["text"] for r in history.search(path, "old")] == ["older"]
+
+
+def test_export_csv_and_jsonl(store, tmp_path):
+    assert store.export(str(tmp_path / "rows.csv")) == 2
+    assert store.export(str(tmp_path / "rows.jsonl")) == 2
+    assert (tmp_path / "rows.csv").read_text(encoding="utf-8").startswith("session_id,")
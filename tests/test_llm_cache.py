@@ -0,0 +1,47 @@
+# test_llm_cache.py
+import time
+
+from llm_cache import ResponseCache, make_cache_key, normalize_context
+
+
+def test_keys_ignore_case_punctuation_spacing_and_stutters():
+    assert normalize_context("The  the Vector DB, um… it’s fast!") == "the vector db um it's fast"
+    assert make_cache_key("The the vector DB?", "suggestion") == make_cache_key("the vector  db", "suggestion")
+    assert make_cache_key("the vector db", "suggestion") != make_cache_key("the vector db", "support")
+    assert make_cache_key("the vector db", "suggestion") != make_cache_key("a vector db", "suggestion")
+
+
+def test_entries_expire_after_max_age():
+    cache = ResponseCache(max_entries=8, max_age_s=0.05)
+    cache.put("key", "reply")
+    assert cache.get("key") == "reply"
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # a is now the most recent
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "llm.sqlite3")
+    first = ResponseCache(max_entries=2, path=path)
+    for key in "abc":
+        first.put(key, f"reply {key}")
+        time.sleep(0.01)
+
+    # A new instance reloads the newest max_entries entries.
+    second = ResponseCache(max_entries=2, path=path)
+    assert second.get("a") is None
+    assert (second.get("b"), second.get("c")) == ("reply b", "reply c")
+
+    # ... and drops persisted entries that are already too old.
+    time.sleep(0.05)
+    assert ResponseCache(max_entries=2, max_age_s=0.03, path=path).stats()["entries"] == 0
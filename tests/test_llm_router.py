@@ -0,0 +1,122 @@
+# test_llm_router.py
+import time
+
+import pytest
+
+import llm_utils
+from llm_cache import ResponseCache
+from llm_router import AllProvidersFailed, OpenAICompatibleProvider, Provider, ProviderRouter
+from stub_servers import start_llm_stub
+
+
+class ScriptedProvider(Provider):
+    # Streams `deltas`, then raises if fail_after is set.
+    def __init__(self, name, deltas, fail_after=False):
+        super().__init__(name, key="test", model="test")
+        self.deltas = deltas
+        self.fail_after = fail_after
+
+    def complete(self, prompt, temperature=0.7, max_tokens=200, json_mode=False):
+        return "".join(self.deltas)
+
+    def stream(self, prompt, temperature=0.7, max_tokens=200):
+        yield from self.deltas
+        if self.fail_after:
+            raise ConnectionError("stream reset")
+
+
+def test_stream_reports_a_reply_cut_off_midway_as_partial():
+    router = ProviderRouter([ScriptedProvider("A", ["so the ", "latency "], fail_after=True)])
+    seen = []
+    text, provider, partial = router.stream("prompt", seen.append)
+    assert (text, provider, partial) == ("so the latency", "A", True)
+    assert seen == ["so the ", "so the latency "]
+
+    router = ProviderRouter([ScriptedProvider("B", ["complete ", "reply"])])
+    assert router.stream("prompt", lambda text: None) == ("complete reply", "B", False)
+
+
+@pytest.mark.parametrize("fail_after", [True, False])
+def test_partial_replies_are_flagged_and_not_cached(monkeypatch, fail_after):
+    monkeypatch.setattr(llm_utils, "router", ProviderRouter([ScriptedProvider("A", ["half ", "a reply"], fail_after)]))
+    monkeypatch.setattr(llm_utils, "response_cache", ResponseCache(8, 60))
+    monkeypatch.setattr(llm_utils, "LLM_STREAMING", True)
+    info = {}
+    result = llm_utils._complete("prompt", cache_key="key", info=info, on_partial=lambda text: None)
+    assert result == "half a reply"
+    assert info.get("partial", False) == fail_after
+    assert "error" not in info
+    assert (llm_utils.response_cache.get("key") is None) == fail_after
+
+
+@pytest.fixture
+def stubs():
+    # start(**options) -> (provider, server); every stub is shut down after the test.
+    servers = []
+
+    def start(name, **options):
+        server, url = start_llm_stub(**options)
+        servers.append(server)
+        provider = OpenAICompatibleProvider(name, url, "test", "stub-model", timeout_s=5)
+        provider.stats.prior_latency_s = 0.1
+        return provider, server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_provider_must_implement_complete_and_stream():
+    with pytest.raises(TypeError):
+        Provider("incomplete", "key", "model")
+
+
+def test_slow_provider_gets_hedged(stubs):
+    slow, _ = stubs("slow", latency_s=1.5)
+    fast, _ = stubs("fast")
+    router = ProviderRouter([slow, fast], min_hedge_delay_s=0.1)
+    started = time.perf_counter()
+    text, provider = router.complete("prompt")
+    assert provider == "fast"
+    assert text.startswith("- jargon")
+    assert time.perf_counter() - started < 1.0
+
+
+def test_failing_provider_trips_the_breaker(stubs):
+    flaky, _ = stubs("flaky", failure_rate=1.0)
+    backup, _ = stubs("backup")
+    router = ProviderRouter([flaky, backup], min_hedge_delay_s=0.1, breaker_failures=2, breaker_cooldown_s=30)
+    flaky.stats.prior_latency_s = backup.stats.prior_latency_s = 5.0  # no hedging: failures fail over
+
+    for _ in range(2):
+        # Keep the flaky provider first, so each call tries it and fails over to the backup.
+        flaky.stats.calls.clear()
+        assert router.complete("prompt")[1] == "backup"
+    assert flaky.breaker.state == "open"
+    assert flaky not in router.ranked()
+    assert router.complete("prompt")[1] == "backup"
+    assert len(flaky.stats.calls) == 1  # an open breaker sends no requests
+
+
+def test_breaker_recovers_after_cooldown(stubs):
+    flaky, server = stubs("flaky", failure_rate=1.0)
+    router = ProviderRouter([flaky], min_hedge_delay_s=0.1, breaker_failures=2, breaker_cooldown_s=0.3)
+    for _ in range(2):
+        with pytest.raises(AllProvidersFailed):
+            router.complete("prompt")
+    assert flaky.breaker.state == "open"
+    with pytest.raises(AllProvidersFailed, match="No LLM provider"):
+        router.complete("prompt")
+
+    server.RequestHandlerClass.failure_rate = 0.0
+    time.sleep(0.35)
+    assert flaky.breaker.state == "half-open"
+    assert router.complete("prompt")[1] == "flaky"
+    assert flaky.breaker.state == "closed"
+
+
+def test_all_providers_failing_raises(stubs):
+    down, _ = stubs("down", failure_rate=1.0)
+    router = ProviderRouter([down], min_hedge_delay_s=0.1)
+    with pytest.raises(AllProvidersFailed, match="down"):
+        router.complete("prompt")
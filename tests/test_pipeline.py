@@ -0,0 +1,75 @@
+# test_pipeline.py
+import threading
+import time
+
+import pytest
+
+from pipeline import ChunkPipeline, MicroBatcher
+
+
+def test_chunk_pipeline_delivers_in_submit_order():
+    delivered = []
+    pipeline = ChunkPipeline(work=lambda n: (time.sleep(0.02 * (5 - n)), n)[1], deliver=delivered.append,
+                             workers=4, max_queue=8, policy="block")
+    for n in range(5):
+        pipeline.submit(n)
+    pipeline.close(wait=True)
+    assert delivered == [0, 1, 2, 3, 4]
+
+
+def test_drop_oldest_hands_dropped_items_to_on_drop():
+    release = threading.Event()
+    dropped = []
+    pipeline = ChunkPipeline(work=lambda n: release.wait() and n, deliver=lambda n: None,
+                             workers=1, max_queue=1, on_drop=dropped.append)
+    pipeline.submit("busy")
+    time.sleep(0.05)  # the worker has taken it
+    for item in ("a", "b", "c"):
+        pipeline.submit(item)
+    assert dropped == ["a", "b"]
+    assert pipeline.dropped == 2
+    release.set()
+    pipeline.close(wait=True)
+
+
+def test_micro_batcher_groups_concurrent_calls():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        time.sleep(0.02)
+        return [2 * item for item in items]
+
+    batcher = MicroBatcher(double, max_batch=4, max_wait_s=0.05)
+    futures = [batcher.submit(n) for n in range(8)]
+    assert [f.result() for f in futures] == [2 * n for n in range(8)]
+    assert sizes == [4, 4]
+
+
+def test_micro_batcher_workers_run_batches_concurrently():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow(items):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.pop()
+        return items
+
+    batcher = MicroBatcher(slow, max_batch=1, workers=3)
+    futures = [batcher.submit(n) for n in range(6)]
+    assert [f.result() for f in futures] == list(range(6))
+    assert max(peak) == 3
+    assert batcher.stats()["items"] == 6
+
+
+def test_micro_batcher_fails_every_caller_on_short_result():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch=4, max_wait_s=0.05)
+    futures = [batcher.submit(n) for n in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
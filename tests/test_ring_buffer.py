@@ -0,0 +1,75 @@
+# test_ring_buffer.py
+import threading
+
+import numpy as np
+import pytest
+
+from ring_buffer import RingBuffer
+
+
+def ramp(start, n):
+    return np.arange(start, start + n, dtype=np.float32)
+
+
+def test_read_across_wraparound():
+    ring = RingBuffer(10)
+    ring.write(ramp(0, 7))
+    ring.advance(7)
+    ring.write(ramp(7, 6))  # wraps: samples 10..12 land at the front of the array
+    assert ring.write_pos == 13
+    assert len(ring.views(6, 6)) == 2
+    np.testing.assert_array_equal(ring.read(6, 6), ramp(6, 6))
+    assert ring.overruns == 0
+
+
+def test_overrun_drops_oldest_unconsumed_samples():
+    ring = RingBuffer(10)
+    ring.write(ramp(0, 8))
+    ring.write(ramp(8, 5))
+    assert ring.overruns == 3
+    assert ring.read_pos == 3
+    assert len(ring) == 10
+    np.testing.assert_array_equal(ring.consume(10), ramp(3, 10))
+    assert len(ring) == 0
+
+
+def test_block_larger_than_capacity_keeps_its_tail():
+    ring = RingBuffer(4)
+    ring.write(ramp(0, 10))
+    assert ring.write_pos == 10
+    assert ring.overruns == 6
+    np.testing.assert_array_equal(ring.read(6, 4), ramp(6, 4))
+
+
+def test_window_outside_buffer_raises():
+    ring = RingBuffer(10)
+    ring.write(ramp(0, 15))
+    with pytest.raises(ValueError):
+        ring.read(4, 2)   # already overwritten
+    with pytest.raises(ValueError):
+        ring.read(12, 5)  # not written yet
+
+
+def test_int16_reads_as_scaled_float32():
+    ring = RingBuffer(8, dtype="int16")
+    ring.write(np.array([[16384], [-32768], [0]], dtype=np.int16))  # (frames, 1) like the capture callback
+    out = ring.read(0, 3)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, [0.5, -1.0, 0.0])
+
+
+def test_advance_never_moves_backwards_or_past_write_head():
+    ring = RingBuffer(10)
+    ring.write(ramp(0, 5))
+    ring.advance(3)
+    ring.advance(1)
+    assert ring.read_pos == 3
+    ring.advance(50)
+    assert ring.read_pos == 5
+
+
+def test_wait_for_wakes_on_write():
+    ring = RingBuffer(10)
+    threading.Timer(0.05, ring.write, args=(ramp(0, 4),)).start()
+    assert ring.wait_for(4, timeout=2)
+    assert not ring.wait_until(100, timeout=0.01)
@@ -0,0 +1,106 @@
+# test_server.py
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import rowlogic
+from benchmark import synthetic_audio, SAMPLE_RATE
+from server import Session
+from tracing import new_trace
+from vad import VoiceActivitySegmenter, FRAME_SAMPLES
+
+
+class FakeServer:
+    engine = "Whisper"
+    session_queue = 100
+    enrichment_pool = ThreadPoolExecutor(max_workers=4)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, data):
+        self.messages.append(json.loads(data))
+
+
+def encode(audio, sample_format):
+    if sample_format == "f32le":
+        return audio.astype("<f4").tobytes()
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def session_segments(audio, sample_format, message_bytes=3202):
+    # Odd-sized messages, so samples are split across frames like on a real socket.
+    async def run():
+        session = Session(FakeServer(), None, sample_format)
+        data = encode(audio, sample_format)
+        for offset in range(0, len(data), message_bytes):
+            session.feed(data[offset:offset + message_bytes])
+        session.flush()
+        segments = []
+        while not session.chunks.empty():
+            start, stop, chunk, trace = session.chunks.get_nowait()
+            trace.release()
+            segments.append((start, stop, chunk))
+        return segments
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope="module")
+def audio():
+    return synthetic_audio(8)
+
+
+def test_s16le_and_f32le_cut_the_same_utterances(audio):
+    s16 = session_segments(audio, "s16le")
+    f32 = session_segments(audio, "f32le")
+    assert len(f32) == 8
+    assert [(start, stop) for start, stop, _ in s16] == [(start, stop) for start, stop, _ in f32]
+    assert all((stop - start) / SAMPLE_RATE < 5 for start, stop, _ in s16)
+    for (_, _, a), (_, _, b) in zip(s16, f32):
+        assert a.dtype == np.float32
+        np.testing.assert_allclose(a, b, atol=1e-4)
+
+
+def test_vad_scales_int16_input(audio):
+    usable = len(audio) // FRAME_SAMPLES * FRAME_SAMPLES
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    as_float = VoiceActivitySegmenter()
+    as_int16 = VoiceActivitySegmenter()
+    expected = as_float.feed(audio[:usable], 0) + as_float.flush()
+    assert len(expected) == 8
+    assert as_int16.feed(pcm[:usable], 0) + as_int16.flush() == expected
+
+
+def test_rows_get_the_cells_plan_row_picks(monkeypatch):
+    monkeypatch.setattr(rowlogic, "extract_difficult_definitions", lambda text: f"defs:{text}")
+    monkeypatch.setattr(rowlogic, "get_llm_suggestion", lambda context: "suggestion")
+    monkeypatch.setattr(rowlogic, "get_llm_combined_response", lambda *args: ("suggestion", "support"))
+    monkeypatch.setattr(rowlogic, "get_support_for_context", lambda *args: "support")
+
+    async def run():
+        ws = FakeSocket()
+        session = Session(FakeServer(), ws, "s16le")
+        for text in ["So I was talking to Maria.", "um you know the one"]:
+            trace = new_trace()
+            await session.emit_row(text, "", "", 0, SAMPLE_RATE, trace)
+            trace.release()
+        await asyncio.gather(*session.cells)
+        return ws.messages
+
+    messages = asyncio.run(run())
+    rows = [m for m in messages if m["type"] == "row"]
+    cells = {(m["row"], m["column"]): m["value"] for m in messages if m["type"] == "cell"}
+    assert rows[0]["pending"] == ["definitions"]
+    assert rows[1]["hesitant"] and set(rows[1]["pending"]) == {"definitions", "suggestion", "support"}
+    assert cells == {
+        (0, "definitions"): "defs:So I was talking to Maria.",
+        (1, "definitions"): "defs:um you know the one",
+        (1, "suggestion"): "suggestion",
+        (1, "support"): "support",
+    }
@@ -0,0 +1,82 @@
+# test_streaming_transcription.py
+import numpy as np
+
+from streaming_transcription import StreamingTranscriber
+from config import SAMPLE_RATE
+
+
+class ScriptedWhisper:
+    # Returns the next scripted hypothesis per call: words with (start_s, end_s) relative to the
+    # audio passed in. Records each call's audio length and prompt.
+    def __init__(self, hypotheses):
+        self.hypotheses = iter(hypotheses)
+        self.calls = []
+
+    def __call__(self, audio, prompt=""):
+        self.calls.append((len(audio), prompt))
+        return next(self.hypotheses)
+
+
+def words(*items, step=0.3, offset=0.0):
+    return [(f" {word}", offset + i * step, offset + (i + 1) * step) for i, word in enumerate(items)]
+
+
+def seconds(s):
+    return np.zeros(int(s * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_words_are_committed_once_two_hypotheses_agree():
+    whisper = ScriptedWhisper([
+        words("So", "the", "lat"),
+        words("So", "the", "latency", "budget"),
+        words("So", "the", "latency", "budget", "was"),
+    ])
+    streamer = StreamingTranscriber(transcribe=whisper, max_window_s=30)
+    assert streamer.update(seconds(1.0)) == []
+    assert (streamer.pending_text, streamer.provisional_text) == ("", "So the lat")
+    assert streamer.update(seconds(1.3)) == []
+    assert (streamer.pending_text, streamer.provisional_text) == ("So the", "latency budget")
+    assert streamer.committed_end == int(0.6 * SAMPLE_RATE)
+    assert streamer.update(seconds(1.6)) == []
+    assert (streamer.pending_text, streamer.provisional_text) == ("So the latency budget", "was")
+    # Committed text is fed back as the prompt for the next pass.
+    assert [prompt for _, prompt in whisper.calls] == ["", "", " So the"]
+    assert streamer.flush() == ["So the latency budget was"]
+
+
+def test_unstable_tail_stays_provisional_until_it_settles():
+    whisper = ScriptedWhisper([
+        words("I", "think", "four"),
+        words("I", "think", "for", "real"),
+        words("I", "think", "for", "real."),
+    ])
+    streamer = StreamingTranscriber(transcribe=whisper, max_window_s=30)
+    streamer.update(seconds(1.0))
+    streamer.update(seconds(1.3))
+    # "four" became "for": only the agreed prefix is committed.
+    assert (streamer.pending_text, streamer.provisional_text) == ("I think", "for real")
+    # Agreement ignores punctuation; the sentence end then closes the utterance, and its
+    # audio is no longer needed.
+    assert streamer.update(seconds(1.3)) == ["I think for real."]
+    assert streamer.pending_text == "" and streamer.provisional_text == ""
+    assert streamer.buffer_start == int(1.2 * SAMPLE_RATE)
+
+
+def test_window_is_trimmed_to_the_last_commit():
+    whisper = ScriptedWhisper([words("one", "two", "three"), words("one", "two", "four")])
+    streamer = StreamingTranscriber(transcribe=whisper, max_window_s=1.0)
+    streamer.update(seconds(0.9))
+    streamer.update(seconds(1.2))
+    assert streamer.pending_text == "one two"
+    assert streamer.buffer_start == int(0.6 * SAMPLE_RATE)
+
+
+def test_window_without_agreement_drops_its_oldest_half():
+    whisper = ScriptedWhisper([words("alpha"), words("beta"), words("gamma")])
+    streamer = StreamingTranscriber(transcribe=whisper, max_window_s=1.0)
+    streamer.update(seconds(0.6))
+    streamer.update(seconds(0.9))
+    assert streamer.buffer_start == 0
+    streamer.update(seconds(1.2))
+    assert streamer.pending_text == "" and streamer.provisional_text == ""
+    assert streamer.buffer_start == int(1.2 * SAMPLE_RATE) - int(1.0 * SAMPLE_RATE) // 2
@@ -0,0 +1,67 @@
+# test_text_utils.py
+import time
+
+import pytest
+
+import text_utils
+from definition_cache import DefinitionCache
+from stub_servers import start_dictionary_stub, SAMPLE_DEFINITIONS
+
+WORDS = ["ephemeral", "heuristic", "idempotent", "quixotic"]
+
+
+class CountingIndex:
+    def __init__(self, entries):
+        self.entries = entries
+        self.lookups = []
+
+    def lookup(self, word):
+        self.lookups.append(word)
+        return self.entries.get(word)
+
+
+@pytest.fixture
+def dictionary(monkeypatch):
+    # start(latency_s, offline) points the lookups at a fresh dictionary stub with an empty cache
+    # and at an offline index holding `offline`; returns the index.
+    servers = []
+
+    def start(latency_s=0.0, offline=None):
+        server, url = start_dictionary_stub(latency_s=latency_s)
+        servers.append(server)
+        monkeypatch.setattr(text_utils, "DICTIONARY_API_URL", url)
+        monkeypatch.setattr(text_utils, "definition_cache", DefinitionCache())
+        index = CountingIndex(offline or {})
+        monkeypatch.setattr(text_utils, "dictionary_index", index)
+        return index
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_lookups_fan_out_concurrently(dictionary):
+    dictionary(latency_s=0.3)
+    started = time.perf_counter()
+    result = text_utils.extract_difficult_definitions(f"An {' and '.join(WORDS)} plan", deadline_s=5)
+    assert time.perf_counter() - started < 0.3 * 2
+    assert result.split("\n\n") == [f"{word}: {SAMPLE_DEFINITIONS[word]}" for word in WORDS]
+
+
+def test_deadline_bounds_the_cell_and_late_lookups_still_land_in_the_cache(dictionary):
+    dictionary(latency_s=0.6)
+    started = time.perf_counter()
+    assert text_utils.extract_difficult_definitions("An ephemeral plan", deadline_s=0.1) == "—"
+    assert time.perf_counter() - started < 0.4
+    time.sleep(0.7)
+    assert text_utils.definition_cache.get("ephemeral") == SAMPLE_DEFINITIONS["ephemeral"]
+    assert text_utils.extract_difficult_definitions("An ephemeral plan", deadline_s=0.1) == \
+        f"ephemeral: {SAMPLE_DEFINITIONS['ephemeral']}"
+
+
+def test_offline_hits_are_returned_when_online_lookups_miss_the_deadline(dictionary):
+    index = dictionary(latency_s=0.6, offline={"quixotic": "offline definition"})
+    result = text_utils.extract_difficult_definitions("A quixotic and ephemeral plan", deadline_s=0.1)
+    assert result == "quixotic: offline definition"
+    # Each difficult word hits the offline index once; the miss goes straight online.
+    assert sorted(index.lookups) == ["ephemeral", "quixotic"]
@@ -0,0 +1,83 @@
+# test_tracing.py
+import json
+import threading
+import time
+
+import pytest
+
+import tracing
+from pipeline import ChunkPipeline
+from tracing import Metrics, TraceWriter, new_trace
+
+
+@pytest.fixture
+def traces(monkeypatch, tmp_path):
+    # Fresh metrics and a trace file per test; returns a function reading the finished traces.
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "metrics", Metrics())
+    monkeypatch.setattr(tracing, "trace_writer", TraceWriter(str(path)))
+    return lambda: [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_trace_finishes_when_the_last_holder_releases(traces):
+    trace = new_trace(engine="Whisper")
+    with trace.span("transcription", audio_s=1.5):
+        pass
+    trace.hold()  # definitions cell
+    trace.hold()  # LLM cell
+    trace.release()  # the pipeline's reference
+    trace.release()
+    assert not trace.finished and traces() == []
+    trace.release()
+    assert trace.finished
+    trace.release()  # a stray extra release doesn't finish it twice
+
+    [record] = traces()
+    assert record["status"] == "ok" and record["engine"] == "Whisper"
+    assert [(span["name"], span["audio_s"]) for span in record["spans"]] == [("transcription", 1.5)]
+    assert 'speech_traces_total{status="ok"} 1' in tracing.metrics.render_prometheus()
+
+
+def test_dropped_chunks_finish_their_traces_through_on_drop(traces):
+    release = threading.Event()
+    pipeline = ChunkPipeline(work=lambda job: release.wait() and job, deliver=lambda job: job[1].release(),
+                             workers=1, max_queue=1, on_drop=lambda job: job[1].release(status="dropped"))
+    jobs = [(n, new_trace(chunk=n)) for n in range(4)]
+    pipeline.submit(jobs[0])
+    time.sleep(0.05)  # the worker has taken it
+    for job in jobs[1:]:
+        pipeline.submit(job)
+    release.set()
+    pipeline.close(wait=True)
+
+    statuses = {record["chunk"]: record["status"] for record in traces()}
+    assert statuses == {0: "ok", 1: "dropped", 2: "dropped", 3: "ok"}
+    output = tracing.metrics.render_prometheus()
+    assert 'speech_traces_total{status="dropped"} 2' in output
+    assert 'speech_trace_seconds_count{status="dropped"} 2' in output
+
+
+def test_render_prometheus_histograms_counters_and_gauges():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.describe("stage_seconds", "Time per stage")
+    for value in (0.05, 0.5, 2.0):
+        metrics.observe("stage_seconds", value, stage="asr")
+    metrics.inc("errors_total", stage="asr")
+    metrics.inc("errors_total", 2, stage="asr")
+    metrics.gauge("queue_depth", lambda: 3)
+    metrics.gauge("not_ready", lambda: None)
+    metrics.gauge("broken", lambda: 1 / 0)
+    assert metrics.render_prometheus() == "\n".join([
+        "# HELP stage_seconds Time per stage",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="asr",le="0.1"} 1',
+        'stage_seconds_bucket{stage="asr",le="1.0"} 2',
+        'stage_seconds_bucket{stage="asr",le="+Inf"} 3',
+        'stage_seconds_sum{stage="asr"} 2.550000',
+        'stage_seconds_count{stage="asr"} 3',
+        "# TYPE errors_total counter",
+        'errors_total{stage="asr"} 3',
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+    ]) + "\n"
+    assert metrics.percentiles("stage_seconds", stage="asr") == [0.5, 2.0]
@@ -0,0 +1,89 @@
+# test_transcription.py
+# Segment → chunk mapping of transcribe_whisper_batch, against stand-ins for faster-whisper's
+# BatchedInferencePipeline (clip_timestamps in seconds, segment times on the passed timeline).
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import models
+import transcription
+from config import SAMPLE_RATE
+
+
+def level(audio, start_s, end_s):
+    # Each test chunk is a constant; its value stands in for "what was said".
+    return f"{float(np.abs(audio[int(start_s * SAMPLE_RATE):int(end_s * SAMPLE_RATE)]).max()):.2f}"
+
+
+class PerClipPipeline:
+    # faster-whisper >= 1.2: one row per clip, two segments per clip.
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, clip_timestamps, batch_size, language, multilingual):
+        self.calls.append(batch_size)
+        segments = []
+        for clip in clip_timestamps:
+            middle = (clip["start"] + clip["end"]) / 2
+            segments.append(SimpleNamespace(text=" " + level(audio, clip["start"], clip["end"]),
+                                            start=round(clip["start"], 3), end=round(middle, 3)))
+            segments.append(SimpleNamespace(text=" end", start=round(middle, 3), end=round(clip["end"], 3)))
+        return iter(segments), None
+
+
+class MergingPipeline:
+    # Worst case: clips are packed into windows of up to 30 s (like collect_chunks) and each
+    # window comes back as a single segment, crossing clip boundaries if it holds several clips.
+    def transcribe(self, audio, clip_timestamps, batch_size, language, multilingual):
+        windows = []
+        for clip in clip_timestamps:
+            if windows and clip["end"] - windows[-1][0]["start"] <= 30:
+                windows[-1].append(clip)
+            else:
+                windows.append([clip])
+        segments = [
+            SimpleNamespace(text=" " + " ".join(level(audio, c["start"], c["end"]) for c in window),
+                            start=round(window[0]["start"], 3), end=round(window[-1]["end"], 3))
+            for window in windows
+        ]
+        return iter(segments), None
+
+
+class FakeWhisper:
+    def transcribe(self, audio, language=None):
+        return iter([SimpleNamespace(text=f" single {level(audio, 0, len(audio) / SAMPLE_RATE)}")]), None
+
+
+def chunks_with_levels(*specs):
+    return [np.full(n, value, dtype=np.float32) for n, value in specs]
+
+
+@pytest.fixture
+def whisper(monkeypatch):
+    monkeypatch.setitem(models._models, "whisper", FakeWhisper())
+
+
+def test_segments_map_back_to_their_chunks(monkeypatch, whisper):
+    pipeline = PerClipPipeline()
+    monkeypatch.setitem(models._models, "whisper_batched", pipeline)
+    chunks = chunks_with_levels((8000, 0.1), (12345, 0.2), (SAMPLE_RATE * 9, 0.3))
+    chunks.append((np.full((7001, 1), 0.4) * 32768).astype(np.int16))  # int16 capture block
+    assert transcription.transcribe_whisper_batch(chunks) == ["0.10 end", "0.20 end", "0.30 end", "0.40 end"]
+    assert pipeline.calls == [4]
+
+
+def test_windows_never_hold_two_chunks(monkeypatch, whisper):
+    # Short utterances from different callers would fit one 30 s window if laid end to end.
+    monkeypatch.setitem(models._models, "whisper_batched", MergingPipeline())
+    chunks = chunks_with_levels((8000, 0.1), (8000, 0.2), (SAMPLE_RATE * 2, 0.3), (8000, 0.4))
+    assert transcription.transcribe_whisper_batch(chunks) == ["0.10", "0.20", "0.30", "0.40"]
+
+
+def test_lone_and_over_long_chunks_use_plain_transcribe(monkeypatch, whisper):
+    pipeline = PerClipPipeline()
+    monkeypatch.setitem(models._models, "whisper_batched", pipeline)
+    assert transcription.transcribe_whisper_batch(chunks_with_levels((8000, 0.5))) == ["single 0.50"]
+    long_and_short = chunks_with_levels((SAMPLE_RATE * 31, 0.6), (8000, 0.7), (8000, 0.8))
+    assert transcription.transcribe_whisper_batch(long_and_short) == ["single 0.60", "0.70 end", "0.80 end"]
+    assert pipeline.calls == [2]